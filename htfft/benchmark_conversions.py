@@ -0,0 +1,60 @@
+"""
+Compares the speed of the per-sample conversions against the vectorized
+conversions used to pack and unpack the FFT data buses.
+
+    python benchmark_conversions.py --spcc 16 --width 32
+"""
+import argparse
+import timeit
+from random import Random
+
+import numpy
+
+from htfft import helper, conversions
+
+
+def benchmark(spcc, width, n_vectors, repeats=3):
+    rnd = Random(0)
+    vectors = [[helper.random_complex(rnd, width) for index in range(spcc)]
+               for vector_index in range(n_vectors)]
+    as_array = numpy.array(vectors)
+    slvs = conversions.complex_array_to_slv(as_array, width)
+
+    def scalar_to_slv():
+        return [conversions.list_of_complex_to_slv(vector, width) for vector in vectors]
+
+    def scalar_from_slv():
+        return [conversions.list_of_complex_from_slv(slv, width, spcc) for slv in slvs]
+
+    def array_to_slv():
+        return conversions.complex_array_to_slv(as_array, width)
+
+    def array_from_slv():
+        return conversions.complex_array_from_slv(slvs, width, spcc)
+
+    timings = {}
+    for name, function in (('scalar_to_slv', scalar_to_slv),
+                           ('scalar_from_slv', scalar_from_slv),
+                           ('array_to_slv', array_to_slv),
+                           ('array_from_slv', array_from_slv)):
+        timings[name] = min(timeit.repeat(function, number=1, repeat=repeats))/n_vectors
+    return timings
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--spcc', dest='spcc', type=int, default=16)
+    parser.add_argument('--width', dest='width', type=int, default=32)
+    parser.add_argument('--n_vectors', dest='n_vectors', type=int, default=10000)
+    args = parser.parse_args()
+    timings = benchmark(spcc=args.spcc, width=args.width, n_vectors=args.n_vectors)
+    print('spcc={} width={} (microseconds per bus word)'.format(args.spcc, args.width))
+    for direction in ('to_slv', 'from_slv'):
+        scalar = timings['scalar_' + direction]
+        vectorized = timings['array_' + direction]
+        print('{:>10}: scalar {:8.2f}  vectorized {:8.2f}  speedup {:6.1f}x'.format(
+            direction, scalar*1e6, vectorized*1e6, scalar/vectorized))
+
+
+if __name__ == '__main__':
+    main()
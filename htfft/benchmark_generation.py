@@ -0,0 +1,110 @@
+"""
+Measures the time and peak memory used to generate a stage for a range of N.
+
+Each stage is generated in a fresh process so the peak resident set size
+is just for that N.
+
+    python benchmark_generation.py --min_logn 10 --max_logn 20
+
+Add --compress_twiddles to generate stages that only store a quarter wave
+of twiddles and --twiddles_in_file to write the twiddles to a file rather
+than into the VHDL.  With --analyze GHDL is also timed analyzing and
+elaborating each stage (`ghdl -m`) and starting a simulation of it
+(`ghdl -r`), which is when a twiddle file is read.
+"""
+import os
+import sys
+import json
+import time
+import argparse
+import resource
+import tempfile
+import subprocess
+from random import Random
+
+from htfft import stage_gen, htfft_gen, helper, prebuilt
+
+basedir = os.path.abspath(os.path.dirname(__file__))
+
+
+def measure_stage(n, size, width, compress_twiddles=False, twiddles_in_file=False):
+    start_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    start_time = time.time()
+    filenames = stage_gen.generate_stage(n, size, width, suffix='_benchmark',
+                                         pipelines=htfft_gen.random_pipeline(Random(0), size),
+                                         make_pipeline_pkg=True,
+                                         compress_twiddles=compress_twiddles,
+                                         twiddles_in_file=twiddles_in_file)
+    duration = time.time() - start_time
+    peak_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return filenames, {
+        'n': n,
+        'seconds': duration,
+        # ru_maxrss is in kilobytes on linux.
+        'start_rss_mb': start_rss/1024,
+        'peak_rss_mb': peak_rss/1024,
+        'file_mb': os.path.getsize(filenames[-1])/pow(2, 20),
+        }
+
+
+def measure_analysis(n, filenames):
+    """
+    Returns the seconds GHDL takes to analyze and elaborate a generated stage
+    and then to start simulating it.
+    """
+    top_name = 'stage_{}_benchmark'.format(n)
+    static_filenames = [os.path.join(basedir, name) for name in prebuilt.get_static_hashes()]
+    vhdl_filenames = [filename for filename in filenames if not helper.is_data_file(filename)]
+    subprocess.check_call(['ghdl', '-i'] + static_filenames + vhdl_filenames)
+    start_time = time.time()
+    subprocess.check_call(['ghdl', '-m', top_name])
+    analysis_seconds = time.time() - start_time
+    start_time = time.time()
+    subprocess.check_call(['ghdl', '-r', top_name, '--stop-time=0ns'])
+    run_seconds = time.time() - start_time
+    return {
+        'analysis_seconds': analysis_seconds,
+        'run_seconds': run_seconds,
+        }
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--min_logn', dest='min_logn', type=int, default=10)
+    parser.add_argument('--max_logn', dest='max_logn', type=int, default=20)
+    parser.add_argument('--size', dest='size', type=int, default=16)
+    parser.add_argument('--input_width', dest='input_width', type=int, default=16)
+    parser.add_argument('--single_n', dest='single_n', type=int, default=None)
+    parser.add_argument('--compress_twiddles', dest='compress_twiddles', action='store_true')
+    parser.add_argument('--twiddles_in_file', dest='twiddles_in_file', action='store_true')
+    parser.add_argument('--analyze', dest='analyze', action='store_true')
+    args = parser.parse_args()
+    if args.single_n is not None:
+        width = args.input_width + 2*(args.single_n.bit_length()-2)
+        filenames, result = measure_stage(args.single_n, args.size, width,
+                                          args.compress_twiddles, args.twiddles_in_file)
+        if args.analyze:
+            result.update(measure_analysis(args.single_n, filenames))
+        print(json.dumps(result))
+        return
+    line_format = '{n:>8} {seconds:>8.2f} {start_rss_mb:>10.1f} {peak_rss_mb:>10.1f} {file_mb:>10.1f}'
+    header = '{:>8} {:>8} {:>10} {:>10} {:>10}'.format('N', 'seconds', 'start MB', 'peak MB', 'file MB')
+    if args.analyze:
+        line_format += ' {analysis_seconds:>10.2f} {run_seconds:>10.2f}'
+        header += ' {:>10} {:>10}'.format('ghdl -m', 'ghdl -r')
+    print(header)
+    extra_args = [
+        '--' + name for name in ('compress_twiddles', 'twiddles_in_file', 'analyze')
+        if getattr(args, name)]
+    with tempfile.TemporaryDirectory() as directory:
+        for logn in range(args.min_logn, args.max_logn+1):
+            output = subprocess.check_output(
+                [sys.executable, os.path.abspath(__file__), '--single_n', str(pow(2, logn)),
+                 '--size', str(args.size), '--input_width', str(args.input_width)] + extra_args,
+                cwd=directory)
+            result = json.loads(output.splitlines()[-1])
+            print(line_format.format(**result))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,164 @@
+library ieee;
+use ieee.std_logic_1164.all;
+use ieee.numeric_std.all;
+
+use work.htfft_pkg.all;
+
+-- Block floating point normalization of the vectors coming out of the
+-- initial memory.  This is input-normalized scaling: the exponent is only
+-- chosen here, from the input, and isn't adjusted by the stages.
+--
+-- The exponent of a vector is found from the data going into the initial
+-- memory (i_beforefirst and i_data).  Since the initial memory holds a
+-- complete vector it is known before the vector comes out (j_beforefirst and
+-- j_data).  Each vector is shifted up by its exponent, which is the largest
+-- shift that leaves every component fitting in WIDTH/2-1 bits.  That bit of
+-- headroom means the following butterflies can't overflow when they're
+-- followed by removing an LSB (see helper.get_block_floating_point_schedule).
+--
+-- o_exponent is the exponent of the vector being output.  It changes in
+-- the o_beforefirst cycle and is held until the next one.
+entity block_normalize is
+  generic (
+    -- The number of bits used for each complex sample.
+    WIDTH: positive;
+    -- Number of samples processed per clock cycle.
+    SPCC: positive;
+    -- The number of samples in an FFT.
+    N: positive;
+    EXPONENT_WIDTH: positive;
+    -- The latency of the initial memory from i_beforefirst to j_beforefirst.
+    LATENCY: positive
+    );
+  port (
+    clk: in std_logic;
+    i_beforefirst: in std_logic;
+    i_data: in std_logic_vector(WIDTH*SPCC-1 downto 0);
+    j_beforefirst: in std_logic;
+    j_data: in std_logic_vector(WIDTH*SPCC-1 downto 0);
+    o_beforefirst: out std_logic;
+    o_data: out std_logic_vector(WIDTH*SPCC-1 downto 0);
+    o_exponent: out std_logic_vector(EXPONENT_WIDTH-1 downto 0)
+    );
+end entity;
+
+architecture arch of block_normalize is
+
+  constant M: positive := N/SPCC;
+  constant COMPONENT_WIDTH: positive := WIDTH/2;
+
+  subtype t_bits is std_logic_vector(COMPONENT_WIDTH-2 downto 0);
+  type array_of_bits is array(natural range <>) of t_bits;
+
+  -- The bits of a component that differ from its sign bit.  A component
+  -- fits in k bits if none of bits k-1 and up are set.
+  function get_bits(component: std_logic_vector) return t_bits is
+    constant normalized: std_logic_vector(COMPONENT_WIDTH-1 downto 0) := component;
+    variable bits: t_bits;
+  begin
+    for bit_index in 0 to COMPONENT_WIDTH-2 loop
+      bits(bit_index) := normalized(bit_index) xor normalized(COMPONENT_WIDTH-1);
+    end loop;
+    return bits;
+  end function;
+
+  function get_exponent(bits: t_bits) return unsigned is
+    variable bit_length: natural := 0;
+  begin
+    for bit_index in 0 to COMPONENT_WIDTH-2 loop
+      if bits(bit_index) = '1' then
+        bit_length := bit_index+1;
+      end if;
+    end loop;
+    if bit_length >= COMPONENT_WIDTH-2 then
+      return to_unsigned(0, EXPONENT_WIDTH);
+    else
+      return to_unsigned(COMPONENT_WIDTH-2-bit_length, EXPONENT_WIDTH);
+    end if;
+  end function;
+
+  signal i_index: unsigned(logceil(M)-1 downto 0) := (others => '0');
+  signal i_componentbits: array_of_bits(2*SPCC-1 downto 0);
+  signal i_bits: t_bits;
+  signal i_acc: t_bits := (others => '0');
+  signal i_exponent: std_logic_vector(EXPONENT_WIDTH-1 downto 0) := (others => '0');
+
+  signal d_exponent: std_logic_vector(EXPONENT_WIDTH-1 downto 0);
+  signal j_exponent: unsigned(EXPONENT_WIDTH-1 downto 0) := (others => '0');
+
+begin
+
+  assert LATENCY > M severity failure;
+
+  loop_components: for component_index in 0 to 2*SPCC-1 generate
+    i_componentbits(component_index) <= get_bits(
+      i_data((component_index+1)*COMPONENT_WIDTH-1 downto component_index*COMPONENT_WIDTH));
+  end generate;
+
+  process(i_componentbits)
+    variable bits: t_bits;
+  begin
+    bits := (others => '0');
+    for component_index in 0 to 2*SPCC-1 loop
+      bits := bits or i_componentbits(component_index);
+    end loop;
+    i_bits <= bits;
+  end process;
+
+  process(clk)
+  begin
+    if rising_edge(clk) then
+      if i_beforefirst = '1' then
+        i_index <= (others => '0');
+      else
+        i_index <= i_index + 1;
+      end if;
+      if i_index = M-1 then
+        i_exponent <= std_logic_vector(get_exponent(i_acc or i_bits));
+      end if;
+      if (i_index = M-1) or (i_beforefirst = '1') then
+        i_acc <= (others => '0');
+      else
+        i_acc <= i_acc or i_bits;
+      end if;
+    end if;
+  end process;
+
+  -- The exponent is ready the clock cycle after the last word of the
+  -- vector goes in.  Delay it so that it's ready with j_beforefirst.
+  delay_exponent: entity work.shift_register
+    generic map (
+      WIDTH => EXPONENT_WIDTH,
+      LENGTH => LATENCY-M-1
+      )
+    port map (
+      clk => clk,
+      i_data => i_exponent,
+      o_data => d_exponent
+      );
+
+  process(clk)
+  begin
+    if rising_edge(clk) then
+      if j_beforefirst = '1' then
+        j_exponent <= unsigned(d_exponent);
+      end if;
+      o_beforefirst <= j_beforefirst;
+    end if;
+  end process;
+
+  loop_shift: for component_index in 0 to 2*SPCC-1 generate
+    process(clk)
+    begin
+      if rising_edge(clk) then
+        o_data((component_index+1)*COMPONENT_WIDTH-1 downto component_index*COMPONENT_WIDTH) <=
+          std_logic_vector(shift_left(signed(
+            j_data((component_index+1)*COMPONENT_WIDTH-1 downto component_index*COMPONENT_WIDTH)),
+                                      to_integer(j_exponent)));
+      end if;
+    end process;
+  end generate;
+
+  o_exponent <= std_logic_vector(j_exponent);
+
+end architecture;
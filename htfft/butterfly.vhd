@@ -2,6 +2,20 @@ library ieee;
 use ieee.std_logic_1164.all;
 use ieee.numeric_std.all;
 
+use work.htfft_pkg.all;
+
+-- With GAUSS the product of b and the twiddle c+js is done with three
+-- multiplications rather than four.
+--   m1 = c*(b_real+b_imag)
+--   m2 = b_imag*(c+s)
+--   m3 = b_real*(s-c)
+--   bt_real = m1 - m2
+--   bt_imag = m1 + m3
+-- The twiddle holds c, s-c and c+s (in that order from the MSB) so that
+-- only the addition of the b components is done at runtime.  The products
+-- are combined at full precision before they are truncated so the result
+-- is b*t truncated once, rather than each of the four products being
+-- truncated.
 entity butterfly is
   generic (
     WIDTH: positive;
@@ -10,13 +24,14 @@ entity butterfly is
     REG_I_P: boolean;
     REG_Q_R: boolean;
     REG_R_S: boolean;
-    REG_S_O: boolean
+    REG_S_O: boolean;
+    GAUSS: boolean := false
     );
   port (
     clk: in std_logic;
     i_a: in std_logic_vector(WIDTH-1 downto 0);
     i_b: in std_logic_vector(WIDTH-1 downto 0);
-    i_t: in std_logic_vector(TWIDDLE_WIDTH-1 downto 0);
+    i_t: in std_logic_vector(twiddle_slv_width(TWIDDLE_WIDTH, GAUSS)-1 downto 0);
     o_c: out std_logic_vector(WIDTH+2-1 downto 0);
     o_d: out std_logic_vector(WIDTH+2-1 downto 0)
   );
@@ -51,7 +66,7 @@ architecture arch of butterfly is
                                     MULT_LATENCY;
 
   signal p_b: std_logic_vector(WIDTH-1 downto 0);
-  signal p_t: std_logic_vector(TWIDDLE_WIDTH-1 downto 0);
+  signal p_t: std_logic_vector(twiddle_slv_width(TWIDDLE_WIDTH, GAUSS)-1 downto 0);
   signal p_b_real: signed(WIDTH/2-1 downto 0);
   signal p_b_imag: signed(WIDTH/2-1 downto 0);
   signal p_t_real: signed(TWIDDLE_WIDTH/2-1 downto 0);
@@ -104,90 +119,176 @@ begin
 
   p_b_real <= signed(p_b(WIDTH-1 downto WIDTH/2));
   p_b_imag <= signed(p_b(WIDTH/2-1 downto 0));
-  p_t_real <= signed(p_t(TWIDDLE_WIDTH-1 downto TWIDDLE_WIDTH/2));
-  p_t_imag <= signed(p_t(TWIDDLE_WIDTH/2-1 downto 0));
-    
-  real_real_mult: entity work.mult
-    generic map (
-      A_WIDTH => WIDTH/2,
-      B_WIDTH => TWIDDLE_WIDTH/2,
-      PIPELINE_LENGTH => MULT_LATENCY
-      )
-    port map (
-      clk => clk,
-      i_a => p_b_real,
-      i_b => p_t_real,
-      o_c => q_bt_real_real_expanded
-      );
-  real_imag_mult: entity work.mult
-    generic map (
-      A_WIDTH => WIDTH/2,
-      B_WIDTH => TWIDDLE_WIDTH/2,
-      PIPELINE_LENGTH => MULT_LATENCY
-      )
-    port map (
-      clk => clk,
-      i_a => p_b_real,
-      i_b => p_t_imag,
-      o_c => q_bt_real_imag_expanded
-      );
-  imag_real_mult: entity work.mult
-    generic map (
-      A_WIDTH => WIDTH/2,
-      B_WIDTH => TWIDDLE_WIDTH/2,
-      PIPELINE_LENGTH => MULT_LATENCY
-      )
-    port map (
-      clk => clk,
-      i_a => p_b_imag,
-      i_b => p_t_real,
-      o_c => q_bt_imag_real_expanded
-      );
-  imag_imag_mult: entity work.mult
-    generic map (
-      A_WIDTH => WIDTH/2,
-      B_WIDTH => TWIDDLE_WIDTH/2,
-      PIPELINE_LENGTH => MULT_LATENCY
-      )
-    port map (
-      clk => clk,
-      i_a => p_b_imag,
-      i_b => p_t_imag,
-      o_c => q_bt_imag_imag_expanded
-      );
-      
-  -- Here we're truncating it directly downto WIDTH.
-  -- FIXME: Might be better to keep afew more bits until after a few more additions.
-  -- FIXME: Probably should do better rounding rather than just truncation as well.
-  -- Uppermost bit of expanded can be ignored since it's the result of
-  -- multiplying two signed numbers but we still added the widths together.
-  q_bt_real_real <= trim(q_bt_real_real_expanded);
-  q_bt_real_imag <= trim(q_bt_real_imag_expanded);
-  q_bt_imag_real <= trim(q_bt_imag_real_expanded);
-  q_bt_imag_imag <= trim(q_bt_imag_imag_expanded);
-
-  yes_reg_q_r: if REG_Q_R generate
-    process(clk)
-    begin
-      if rising_edge(clk) then
-        r_bt_real_real <= q_bt_real_real;
-        r_bt_real_imag <= q_bt_real_imag;
-        r_bt_imag_real <= q_bt_imag_real;
-        r_bt_imag_imag <= q_bt_imag_imag;
-      end if;
-    end process;
-  end generate;
-  no_reg_q_r: if not REG_Q_R generate
-    r_bt_real_real <= q_bt_real_real;
-    r_bt_real_imag <= q_bt_real_imag;
-    r_bt_imag_real <= q_bt_imag_real;
-    r_bt_imag_imag <= q_bt_imag_imag;
+
+  four_mults: if not GAUSS generate
+    p_t_real <= signed(p_t(TWIDDLE_WIDTH-1 downto TWIDDLE_WIDTH/2));
+    p_t_imag <= signed(p_t(TWIDDLE_WIDTH/2-1 downto 0));
+
+    real_real_mult: entity work.mult
+      generic map (
+        A_WIDTH => WIDTH/2,
+        B_WIDTH => TWIDDLE_WIDTH/2,
+        PIPELINE_LENGTH => MULT_LATENCY
+        )
+      port map (
+        clk => clk,
+        i_a => p_b_real,
+        i_b => p_t_real,
+        o_c => q_bt_real_real_expanded
+        );
+    real_imag_mult: entity work.mult
+      generic map (
+        A_WIDTH => WIDTH/2,
+        B_WIDTH => TWIDDLE_WIDTH/2,
+        PIPELINE_LENGTH => MULT_LATENCY
+        )
+      port map (
+        clk => clk,
+        i_a => p_b_real,
+        i_b => p_t_imag,
+        o_c => q_bt_real_imag_expanded
+        );
+    imag_real_mult: entity work.mult
+      generic map (
+        A_WIDTH => WIDTH/2,
+        B_WIDTH => TWIDDLE_WIDTH/2,
+        PIPELINE_LENGTH => MULT_LATENCY
+        )
+      port map (
+        clk => clk,
+        i_a => p_b_imag,
+        i_b => p_t_real,
+        o_c => q_bt_imag_real_expanded
+        );
+    imag_imag_mult: entity work.mult
+      generic map (
+        A_WIDTH => WIDTH/2,
+        B_WIDTH => TWIDDLE_WIDTH/2,
+        PIPELINE_LENGTH => MULT_LATENCY
+        )
+      port map (
+        clk => clk,
+        i_a => p_b_imag,
+        i_b => p_t_imag,
+        o_c => q_bt_imag_imag_expanded
+        );
+
+    -- Here we're truncating it directly downto WIDTH.
+    -- FIXME: Might be better to keep afew more bits until after a few more additions.
+    -- FIXME: Probably should do better rounding rather than just truncation as well.
+    -- Uppermost bit of expanded can be ignored since it's the result of
+    -- multiplying two signed numbers but we still added the widths together.
+    q_bt_real_real <= trim(q_bt_real_real_expanded);
+    q_bt_real_imag <= trim(q_bt_real_imag_expanded);
+    q_bt_imag_real <= trim(q_bt_imag_real_expanded);
+    q_bt_imag_imag <= trim(q_bt_imag_imag_expanded);
+
+    yes_reg_q_r: if REG_Q_R generate
+      process(clk)
+      begin
+        if rising_edge(clk) then
+          r_bt_real_real <= q_bt_real_real;
+          r_bt_real_imag <= q_bt_real_imag;
+          r_bt_imag_real <= q_bt_imag_real;
+          r_bt_imag_imag <= q_bt_imag_imag;
+        end if;
+      end process;
+    end generate;
+    no_reg_q_r: if not REG_Q_R generate
+      r_bt_real_real <= q_bt_real_real;
+      r_bt_real_imag <= q_bt_real_imag;
+      r_bt_imag_real <= q_bt_imag_real;
+      r_bt_imag_imag <= q_bt_imag_imag;
+    end generate;
+
+    -- We're assuming that i_a and i_b both have magnitude <= 1 so that these additions
+    -- can't overflow even if we don't extend width.
+    r_bt_real <= r_bt_real_real - r_bt_imag_imag;
+    r_bt_imag <= r_bt_real_imag + r_bt_imag_real;
   end generate;
 
-  -- We're assuming that i_a and i_b both have magnitude <= 1 so that these additions
-  -- can't overflow even if we don't extend width. 
-  r_bt_real <= r_bt_real_real - r_bt_imag_imag;
-  r_bt_imag <= r_bt_real_imag + r_bt_imag_real;
+  three_mults: if GAUSS generate
+    constant T_WIDTH: positive := TWIDDLE_WIDTH/2+1;
+    constant EXPANDED_WIDTH: positive := WIDTH/2+1+T_WIDTH;
+    signal p_t_c: signed(T_WIDTH-1 downto 0);
+    signal p_t_s_minus_c: signed(T_WIDTH-1 downto 0);
+    signal p_t_c_plus_s: signed(T_WIDTH-1 downto 0);
+    signal p_b_sum: signed(WIDTH/2+1-1 downto 0);
+    signal q_m1: signed(EXPANDED_WIDTH-1 downto 0);
+    signal q_m2: signed(EXPANDED_WIDTH-1-1 downto 0);
+    signal q_m3: signed(EXPANDED_WIDTH-1-1 downto 0);
+    signal r_m1: signed(EXPANDED_WIDTH-1 downto 0);
+    signal r_m2: signed(EXPANDED_WIDTH-1-1 downto 0);
+    signal r_m3: signed(EXPANDED_WIDTH-1-1 downto 0);
+    signal r_bt_real_expanded: signed(EXPANDED_WIDTH-1 downto 0);
+    signal r_bt_imag_expanded: signed(EXPANDED_WIDTH-1 downto 0);
+  begin
+    p_t_c <= signed(p_t(3*T_WIDTH-1 downto 2*T_WIDTH));
+    p_t_s_minus_c <= signed(p_t(2*T_WIDTH-1 downto T_WIDTH));
+    p_t_c_plus_s <= signed(p_t(T_WIDTH-1 downto 0));
+    -- This addition can be absorbed into the pre-adder of a DSP.
+    p_b_sum <= resize(p_b_real, WIDTH/2+1) + resize(p_b_imag, WIDTH/2+1);
+
+    m1_mult: entity work.mult
+      generic map (
+        A_WIDTH => WIDTH/2+1,
+        B_WIDTH => T_WIDTH,
+        PIPELINE_LENGTH => MULT_LATENCY
+        )
+      port map (
+        clk => clk,
+        i_a => p_b_sum,
+        i_b => p_t_c,
+        o_c => q_m1
+        );
+    m2_mult: entity work.mult
+      generic map (
+        A_WIDTH => WIDTH/2,
+        B_WIDTH => T_WIDTH,
+        PIPELINE_LENGTH => MULT_LATENCY
+        )
+      port map (
+        clk => clk,
+        i_a => p_b_imag,
+        i_b => p_t_c_plus_s,
+        o_c => q_m2
+        );
+    m3_mult: entity work.mult
+      generic map (
+        A_WIDTH => WIDTH/2,
+        B_WIDTH => T_WIDTH,
+        PIPELINE_LENGTH => MULT_LATENCY
+        )
+      port map (
+        clk => clk,
+        i_a => p_b_real,
+        i_b => p_t_s_minus_c,
+        o_c => q_m3
+        );
+
+    yes_reg_q_r: if REG_Q_R generate
+      process(clk)
+      begin
+        if rising_edge(clk) then
+          r_m1 <= q_m1;
+          r_m2 <= q_m2;
+          r_m3 <= q_m3;
+        end if;
+      end process;
+    end generate;
+    no_reg_q_r: if not REG_Q_R generate
+      r_m1 <= q_m1;
+      r_m2 <= q_m2;
+      r_m3 <= q_m3;
+    end generate;
+
+    -- The exact values fit in the expanded width so these can't overflow.
+    r_bt_real_expanded <= r_m1 - resize(r_m2, EXPANDED_WIDTH);
+    r_bt_imag_expanded <= r_m1 + resize(r_m3, EXPANDED_WIDTH);
+    -- Truncate in the same way as the trim function.
+    r_bt_real <= r_bt_real_expanded(WIDTH/2+TWIDDLE_WIDTH/2-2-1 downto TWIDDLE_WIDTH/2-2);
+    r_bt_imag <= r_bt_imag_expanded(WIDTH/2+TWIDDLE_WIDTH/2-2-1 downto TWIDDLE_WIDTH/2-2);
+  end generate;
 
   yes_reg_r_s: if REG_R_S generate
     process(clk)
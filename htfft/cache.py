@@ -0,0 +1,173 @@
+"""
+A content-addressed cache for the file lists that fusesoc produces.
+
+The key is a hash of the core file (which contains the generation parameters
+and the pipeline dictionary), the core name and the contents of the
+templates, sources and generators in this directory.  An entry holds a copy
+of the files that fusesoc resolved for the core along with a manifest
+recording their order.
+
+The cache is bounded in size and the least recently used entries are
+evicted first.  It is configured with the environment variables
+HTFFT_CACHE_DIR, HTFFT_CACHE_MAX_BYTES and HTFFT_CACHE_DISABLE.
+"""
+import os
+import json
+import shutil
+import hashlib
+import tempfile
+
+basedir = os.path.abspath(os.path.dirname(__file__))
+
+DEFAULT_CACHE_DIR = os.path.join(os.path.expanduser('~'), '.cache', 'htfft')
+DEFAULT_MAX_BYTES = pow(2, 30)
+SOURCE_SUFFIXES = ('.vhd', '.core', '.j2', '.py', '.conf')
+MANIFEST_FILENAME = 'manifest.json'
+
+
+def get_cache_dir():
+    return os.environ.get('HTFFT_CACHE_DIR', DEFAULT_CACHE_DIR)
+
+
+def get_max_bytes():
+    return int(os.environ.get('HTFFT_CACHE_MAX_BYTES', DEFAULT_MAX_BYTES))
+
+
+def is_enabled():
+    return os.environ.get('HTFFT_CACHE_DISABLE', '0') in ('', '0')
+
+
+def find_core_filename(core_name):
+    """
+    Look for the core file in the places that `make_*_core` and the
+    static cores put them.
+    """
+    for directory in (basedir, os.path.join(basedir, 'generated')):
+        core_filename = os.path.join(directory, '{}.core'.format(core_name))
+        if os.path.exists(core_filename):
+            return core_filename
+    return None
+
+
+def hash_sources(hasher):
+    for name in sorted(os.listdir(basedir)):
+        if name.startswith('test_') or not name.endswith(SOURCE_SUFFIXES):
+            continue
+        with open(os.path.join(basedir, name), 'rb') as f:
+            hasher.update(name.encode())
+            hasher.update(f.read())
+
+
+def get_key(core_name, core_filename=None, config_filename=None):
+    """
+    Returns the cache key for a core or None if the core can't be cached.
+    """
+    if not is_enabled():
+        return None
+    if core_filename is None:
+        core_filename = find_core_filename(core_name)
+    if core_filename is None:
+        return None
+    hasher = hashlib.sha256()
+    hasher.update(core_name.encode())
+    for filename in (core_filename, config_filename):
+        if filename is not None:
+            with open(filename, 'rb') as f:
+                hasher.update(f.read())
+    hash_sources(hasher)
+    return hasher.hexdigest()
+
+
+def lookup(key, working_directory):
+    """
+    Copies the cached files for `key` into the working directory and returns
+    their filenames in order.  Returns None on a miss.
+
+    The files are copied so that an entry can be evicted while another
+    process is still simulating with it.
+    """
+    entry_directory = os.path.join(get_cache_dir(), key)
+    manifest_filename = os.path.join(entry_directory, MANIFEST_FILENAME)
+    try:
+        with open(manifest_filename, 'r') as f:
+            basenames = json.load(f)
+        output_directory = os.path.join(working_directory, 'cached_src')
+        if os.path.exists(output_directory):
+            shutil.rmtree(output_directory)
+        os.makedirs(output_directory)
+        filenames = []
+        for basename in basenames:
+            filename = os.path.join(output_directory, basename)
+            shutil.copy2(os.path.join(entry_directory, basename), filename)
+            filenames.append(filename)
+        # The manifest modification time is used for the LRU ordering.
+        os.utime(manifest_filename)
+    except (FileNotFoundError, ValueError):
+        return None
+    return filenames
+
+
+def store(key, filenames):
+    """
+    Adds the files for `key` to the cache and then evicts old entries.
+    """
+    basenames = [os.path.basename(filename) for filename in filenames]
+    if len(set(basenames)) != len(basenames):
+        # The entry would be ambiguous so we just don't cache it.
+        return
+    cache_dir = get_cache_dir()
+    if not os.path.exists(cache_dir):
+        os.makedirs(cache_dir, exist_ok=True)
+    # Fill a temporary directory and rename it so that other processes
+    # never see a partially written entry.
+    temp_directory = tempfile.mkdtemp(prefix='.tmp', dir=cache_dir)
+    for filename in filenames:
+        shutil.copy2(filename, temp_directory)
+    with open(os.path.join(temp_directory, MANIFEST_FILENAME), 'w') as f:
+        json.dump(basenames, f)
+    try:
+        os.rename(temp_directory, os.path.join(cache_dir, key))
+    except OSError:
+        # Another process stored the same entry first.
+        shutil.rmtree(temp_directory)
+    evict(get_max_bytes())
+
+
+def get_entries():
+    """
+    Returns a list of (last_used, n_bytes, directory) for the cache entries.
+    """
+    cache_dir = get_cache_dir()
+    if not os.path.exists(cache_dir):
+        return []
+    entries = []
+    for name in os.listdir(cache_dir):
+        directory = os.path.join(cache_dir, name)
+        if name.startswith('.') or not os.path.isdir(directory):
+            continue
+        try:
+            last_used = os.path.getmtime(os.path.join(directory, MANIFEST_FILENAME))
+            n_bytes = sum(os.path.getsize(os.path.join(directory, filename))
+                          for filename in os.listdir(directory))
+        except FileNotFoundError:
+            continue
+        entries.append((last_used, n_bytes, directory))
+    return entries
+
+
+def evict(max_bytes):
+    """
+    Removes the least recently used entries until the cache is no larger
+    than `max_bytes`.
+    """
+    entries = sorted(get_entries())
+    total_bytes = sum(n_bytes for last_used, n_bytes, directory in entries)
+    for last_used, n_bytes, directory in entries:
+        if total_bytes <= max_bytes:
+            break
+        shutil.rmtree(directory, ignore_errors=True)
+        total_bytes -= n_bytes
+
+
+def clear():
+    evict(0)
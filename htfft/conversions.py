@@ -1,3 +1,8 @@
+import numpy
+
+from htfft import floats
+
+
 def int_to_str(value, width):
     """
     Outputs a string of the binary of the value with
@@ -113,6 +118,123 @@ def list_of_uints_from_slv(slv, width, size):
     return values
 
 
+def signed_array_to_slv(values, width):
+    """
+    Vectorized version of `signed_to_slv`.
+    Takes an array of values between -1 and 1 inclusive and maps
+    them into unsigned integers of `width` bits.
+    """
+    values = numpy.asarray(values, dtype=float)
+    assert width < 64
+    assert numpy.all(numpy.abs(values) <= 1)
+    max_mag = pow(2, width-2)
+    # numpy.round rounds half to even just like python's round.
+    scaled = numpy.round(values * max_mag).astype(numpy.int64)
+    return scaled % pow(2, width)
+
+
+def slv_array_to_signed(values, width):
+    """
+    Vectorized version of `slv_to_signed`.
+    """
+    values = numpy.asarray(values, dtype=numpy.int64)
+    assert width < 64
+    max_mag = pow(2, width-2)
+    values = numpy.where(values >= pow(2, width-1), values - pow(2, width), values)
+    scaled = values / max_mag
+    assert numpy.all(scaled <= 1)
+    return scaled
+
+
+def uint_array_to_slv(values, width):
+    """
+    Vectorized version of `list_of_uints_to_slv`.
+    `values` has shape [vectors, size] and a list with an integer for
+    each vector is returned.
+    """
+    values = numpy.asarray(values, dtype=numpy.int64)
+    assert width < 64
+    assert numpy.all(values >= 0)
+    assert numpy.all(values < pow(2, width))
+    n_vectors = values.shape[0]
+    shifts = numpy.arange(width, dtype=numpy.int64)
+    bits = ((values[..., numpy.newaxis] >> shifts) & 1).astype(numpy.uint8)
+    bits = bits.reshape(n_vectors, -1)
+    packed = numpy.packbits(bits, axis=1, bitorder='little')
+    return [int.from_bytes(row.tobytes(), 'little') for row in packed]
+
+
+def uint_array_from_slv(slvs, width, size):
+    """
+    Vectorized version of `list_of_uints_from_slv`.
+    Takes a list of integers and returns an array of shape [len(slvs), size].
+    """
+    assert width < 64
+    n_bits = width * size
+    n_bytes = (n_bits + 7)//8
+    as_bytes = b''.join(slv.to_bytes(n_bytes, 'little') for slv in slvs)
+    packed = numpy.frombuffer(as_bytes, dtype=numpy.uint8).reshape(len(slvs), n_bytes)
+    bits = numpy.unpackbits(packed, axis=1, count=n_bits, bitorder='little')
+    bits = bits.reshape(len(slvs), size, width).astype(numpy.int64)
+    weights = numpy.left_shift(1, numpy.arange(width, dtype=numpy.int64))
+    return (bits * weights).sum(axis=-1)
+
+
+def complex_array_to_slv(values, width):
+    """
+    Vectorized version of `list_of_complex_to_slv`.
+    `values` is a complex array of shape [vectors, size].  A list with an
+    integer for each vector is returned.
+    """
+    values = numpy.asarray(values, dtype=complex)
+    assert width % 2 == 0
+    assert numpy.all(numpy.abs(values) <= 1)
+    n_vectors, size = values.shape
+    mapped_real = signed_array_to_slv(values.real, width//2)
+    mapped_imag = signed_array_to_slv(values.imag, width//2)
+    # The imaginary part goes in the lower bits.
+    components = numpy.stack([mapped_imag, mapped_real], axis=-1).reshape(n_vectors, 2*size)
+    return uint_array_to_slv(components, width//2)
+
+
+def complex_array_from_slv(slvs, width, size):
+    """
+    Vectorized version of `list_of_complex_from_slv`.
+    Takes a list of integers and returns a complex array of shape [len(slvs), size].
+    """
+    assert width % 2 == 0
+    components = uint_array_from_slv(slvs, width//2, 2*size).reshape(len(slvs), size, 2)
+    imag_float = slv_array_to_signed(components[..., 0], width//2)
+    real_float = slv_array_to_signed(components[..., 1], width//2)
+    return real_float + (0+1j) * imag_float
+
+
+def float_array_to_slv(values, float_format):
+    """
+    Packs complex values of shape [vectors, size] as pairs of floats (see
+    floats.py) with the real part in the upper bits of each sample.
+    A list with an integer for each vector is returned.
+    """
+    values = numpy.asarray(values, dtype=complex)
+    n_vectors, size = values.shape
+    mapped_real = floats.from_floats(values.real, float_format)
+    mapped_imag = floats.from_floats(values.imag, float_format)
+    components = numpy.stack([mapped_imag, mapped_real], axis=-1).reshape(n_vectors, 2*size)
+    return uint_array_to_slv(components, floats.get_width(float_format))
+
+
+def float_array_from_slv(slvs, float_format, size):
+    """
+    Unpacks a list of integers holding `size` samples of pairs of floats into
+    a complex array of shape [len(slvs), size].
+    """
+    width = floats.get_width(float_format)
+    components = uint_array_from_slv(slvs, width, 2*size).reshape(len(slvs), size, 2)
+    imag = floats.to_floats(components[..., 0], float_format)
+    real = floats.to_floats(components[..., 1], float_format)
+    return real + (0+1j) * imag
+
+
 if __name__ == '__main__':
     import doctest
     doctest.testmod()
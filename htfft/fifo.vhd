@@ -0,0 +1,124 @@
+library ieee;
+use ieee.std_logic_1164.all;
+use ieee.numeric_std.all;
+
+use work.htfft_pkg.all;
+
+-- A first-word-fall-through FIFO for a valid/ready stream.
+--
+-- The words are stored in a memory which has a clock cycle of read latency
+-- so up to four words are read ahead into registers.  The reads only
+-- depend on registers so there is no combinatorial path from o_ready to
+-- the memory, and a word can pass every clock cycle.
+entity fifo is
+  generic (
+    WIDTH: positive;
+    -- Must be a power of two.
+    DEPTH: positive;
+    STYLE: string := "auto"
+    );
+  port (
+    clk: in std_logic;
+    reset: in std_logic;
+    i_valid: in std_logic;
+    i_ready: out std_logic;
+    i_data: in std_logic_vector(WIDTH-1 downto 0);
+    o_valid: out std_logic;
+    o_ready: in std_logic;
+    o_data: out std_logic_vector(WIDTH-1 downto 0)
+    );
+end entity;
+
+architecture arch of fifo is
+
+  constant ADDRESS_WIDTH: positive := logceil(DEPTH);
+  constant QUEUE_LENGTH: positive := 4;
+
+  -- The pointers have an extra bit to tell a full memory from an empty one.
+  signal write_pointer: unsigned(ADDRESS_WIDTH downto 0) := (others => '0');
+  signal read_pointer: unsigned(ADDRESS_WIDTH downto 0) := (others => '0');
+  signal ready: std_logic;
+  signal write_valid: std_logic;
+  signal toread_valid: std_logic;
+  signal fromread_valid: std_logic := '0';
+  signal fromread_data: std_logic_vector(WIDTH-1 downto 0);
+
+  subtype t_data is std_logic_vector(WIDTH-1 downto 0);
+  type array_of_data is array(natural range <>) of t_data;
+  signal queue: array_of_data(QUEUE_LENGTH-1 downto 0);
+  signal queue_write: unsigned(logceil(QUEUE_LENGTH)-1 downto 0) := (others => '0');
+  signal queue_read: unsigned(logceil(QUEUE_LENGTH)-1 downto 0) := (others => '0');
+  signal queue_count: unsigned(logceil(QUEUE_LENGTH) downto 0) := (others => '0');
+  signal valid: std_logic;
+  signal pop: std_logic;
+
+begin
+
+  assert DEPTH = 2**ADDRESS_WIDTH severity failure;
+
+  ready <= '0' when write_pointer - read_pointer = DEPTH else '1';
+  write_valid <= i_valid and ready;
+  -- Read ahead if there's space in the queue for the word, counting the
+  -- one that might still be coming out of the memory.
+  toread_valid <= '1' when (write_pointer /= read_pointer) and
+                  ((queue_count < QUEUE_LENGTH-1) or
+                   ((queue_count = QUEUE_LENGTH-1) and (fromread_valid = '0'))) else
+                  '0';
+  valid <= '0' when queue_count = 0 else '1';
+  pop <= valid and o_ready;
+
+  mem: entity work.memory
+    generic map (
+      WIDTH => WIDTH,
+      DEPTH => DEPTH,
+      ADDRESS_CLASH => "OLD",
+      STYLE => STYLE
+      )
+    port map (
+      clk => clk,
+      write_valid => write_valid,
+      write_address => write_pointer(ADDRESS_WIDTH-1 downto 0),
+      write_data => i_data,
+      toread_valid => toread_valid,
+      toread_address => read_pointer(ADDRESS_WIDTH-1 downto 0),
+      fromread_data => fromread_data
+      );
+
+  process(clk)
+  begin
+    if rising_edge(clk) then
+      if write_valid = '1' then
+        write_pointer <= write_pointer + 1;
+      end if;
+      if toread_valid = '1' then
+        read_pointer <= read_pointer + 1;
+      end if;
+      fromread_valid <= toread_valid;
+      if fromread_valid = '1' then
+        queue(to_integer(queue_write)) <= fromread_data;
+        queue_write <= queue_write + 1;
+      end if;
+      if pop = '1' then
+        queue_read <= queue_read + 1;
+      end if;
+      if (fromread_valid = '1') and (pop = '0') then
+        queue_count <= queue_count + 1;
+      elsif (fromread_valid = '0') and (pop = '1') then
+        queue_count <= queue_count - 1;
+      end if;
+      if reset = '1' then
+        write_pointer <= (others => '0');
+        read_pointer <= (others => '0');
+        fromread_valid <= '0';
+        queue_write <= (others => '0');
+        queue_read <= (others => '0');
+        queue_count <= (others => '0');
+      end if;
+    end if;
+  end process;
+
+  i_ready <= ready;
+  o_valid <= valid;
+  o_data <= queue(to_integer(queue_read));
+
+end architecture;
@@ -17,6 +17,10 @@ entity final_memory is
     i_beforefirst: in std_logic;
     i_data_a: in std_logic_vector(WIDTH*SPCC/2-1 downto 0);
     i_data_b: in std_logic_vector(WIDTH*SPCC/2-1 downto 0);
+    -- log2 of the size of the FFT which can be less than N.  It must only
+    -- change when there are no vectors in the memory.
+    i_log2n: in std_logic_vector(log2n_width(N)-1 downto 0) :=
+      std_logic_vector(to_unsigned(logceil(N), log2n_width(N)));
     o_beforefirst: out std_logic;
     o_data: out std_logic_vector(WIDTH*SPCC-1 downto 0)
     );
@@ -24,6 +28,25 @@ end entity;
 
 architecture arch of final_memory is
 
+  constant LOG2N: natural := logceil(N);
+  constant LOG2_SPCC: natural := logceil(SPCC);
+  constant MIN_LOG2N: natural := LOG2_SPCC+1;
+
+  -- Half the number of words in a vector of size 2**log2n.
+  function get_half_words(log2n: std_logic_vector) return unsigned is
+    variable half_words: unsigned(logceil(N/SPCC)-1 downto 0) :=
+      to_unsigned(N/SPCC/2, logceil(N/SPCC));
+  begin
+    for candidate in MIN_LOG2N to LOG2N-1 loop
+      if unsigned(log2n) = candidate then
+        half_words := to_unsigned(2**(candidate-LOG2_SPCC-1), logceil(N/SPCC));
+      end if;
+    end loop;
+    return half_words;
+  end function;
+
+  signal half_words: unsigned(logceil(N/SPCC)-1 downto 0);
+
   signal i_index: unsigned(logceil(N/SPCC)-1 downto 0);
   signal i_write_address_1: unsigned(logceil(N/SPCC)-1 downto 0);
   signal i_write_address_2: unsigned(logceil(N/SPCC)-1 downto 0);
@@ -45,22 +68,28 @@ architecture arch of final_memory is
 
 begin
 
+  half_words <= get_half_words(i_log2n);
+
   process(clk)
   begin
     if rising_edge(clk) then
       fromread_new <= '0';
-      if (i_index = N/SPCC/2-1) then
+      if (i_index = half_words-1) and (s_running = '1') then
         toread_index <= (others => '0');
         fromread_beforefirst <= '1';
       else
         toread_index <= toread_index + 1;
         fromread_beforefirst <= '0';
       end if;
-      if (i_index = N/SPCC-1) then
+      if (i_index = 2*half_words-1) then
         s_running <= '0';
         fromread_new <= '1';
       end if;
-      fromread_swap <= toread_index(logceil(N/SPCC)-1);
+      if toread_index >= half_words then
+        fromread_swap <= '1';
+      else
+        fromread_swap <= '0';
+      end if;
       if i_beforefirst = '1' then
         i_index <= (others => '0');
         s_running <= '1';
@@ -72,8 +101,8 @@ begin
 
 
   i_write_address_1 <= i_index/2 when i_index(0) = '0' else
-                       i_index/2 + N/SPCC/2;
-  i_write_address_2 <= i_index/2 + N/SPCC/2 when i_index(0) = '0' else
+                       i_index/2 + half_words;
+  i_write_address_2 <= i_index/2 + half_words when i_index(0) = '0' else
                        i_index/2;
   i_swap <= i_index(0); 
   i_data_1 <= i_data_a when i_swap = '0' else
@@ -0,0 +1,257 @@
+library ieee;
+use ieee.std_logic_1164.all;
+use ieee.numeric_std.all;
+
+use work.htfft_pkg.all;
+use work.htfft_float_pkg.all;
+
+-- A butterfly on floating point samples (see htfft_float_pkg).
+-- Each component of a sample and of the twiddle is a float with
+-- EXPONENT_WIDTH exponent bits and FRACTION_WIDTH fraction bits.  The real
+-- part is in the upper half like the fixed point samples.
+--   bt_real = b_real*t_real - b_imag*t_imag
+--   bt_imag = b_real*t_imag + b_imag*t_real
+--   c = a + bt
+--   d = a - bt
+-- Unlike the fixed point butterfly the output is the same width as the
+-- input.
+--
+-- The multiplications are split into the product of the mantissas, which is
+-- followed by MULT_LATENCY registers for the DSPs, and the rounding, which
+-- is followed by REG_Q_R.  The additions are split into the alignment and
+-- sum of the mantissas, followed by (ADD_LATENCY+1)/2 registers, and the
+-- normalization and rounding, followed by ADD_LATENCY/2 registers.
+entity float_butterfly is
+  generic (
+    EXPONENT_WIDTH: positive;
+    FRACTION_WIDTH: positive;
+    MULT_LATENCY: natural;
+    ADD_LATENCY: natural;
+    REG_I_P: boolean;
+    REG_Q_R: boolean;
+    REG_R_S: boolean;
+    REG_S_O: boolean
+    );
+  port (
+    clk: in std_logic;
+    i_a: in std_logic_vector(2*(1+EXPONENT_WIDTH+FRACTION_WIDTH)-1 downto 0);
+    i_b: in std_logic_vector(2*(1+EXPONENT_WIDTH+FRACTION_WIDTH)-1 downto 0);
+    i_t: in std_logic_vector(2*(1+EXPONENT_WIDTH+FRACTION_WIDTH)-1 downto 0);
+    o_c: out std_logic_vector(2*(1+EXPONENT_WIDTH+FRACTION_WIDTH)-1 downto 0);
+    o_d: out std_logic_vector(2*(1+EXPONENT_WIDTH+FRACTION_WIDTH)-1 downto 0)
+  );
+end entity;
+
+architecture arch of float_butterfly is
+
+  constant E: positive := EXPONENT_WIDTH;
+  constant F: positive := FRACTION_WIDTH;
+  -- The width of a float component.
+  constant FW: positive := 1+E+F;
+  constant WIDTH: positive := 2*FW;
+
+  -- The widths of the values between the steps of a multiplication and of
+  -- an addition.
+  constant PW: positive := float_product_width(E, F);
+  constant SW: positive := float_sum_width(E, F);
+  constant ALIGN_LATENCY: natural := (ADD_LATENCY+1)/2;
+  constant NORMALIZE_LATENCY: natural := ADD_LATENCY/2;
+
+  constant LATENCY_TO_S: natural := boolean_to_int(REG_I_P) + boolean_to_int(REG_Q_R) +
+                                    boolean_to_int(REG_R_S) + MULT_LATENCY + ADD_LATENCY;
+
+  subtype t_float is std_logic_vector(FW-1 downto 0);
+
+  signal p_b: std_logic_vector(WIDTH-1 downto 0);
+  signal p_t: std_logic_vector(WIDTH-1 downto 0);
+  signal p_b_real: t_float;
+  signal p_b_imag: t_float;
+  signal p_t_real: t_float;
+  signal p_t_imag: t_float;
+
+  -- The four products packed together so they can share a shift register.
+  signal p_products: std_logic_vector(4*PW-1 downto 0);
+  signal q_products: std_logic_vector(4*PW-1 downto 0);
+  signal q_rounded: std_logic_vector(4*FW-1 downto 0);
+  signal r_products: std_logic_vector(4*FW-1 downto 0);
+  signal r_bt_real_real: t_float;
+  signal r_bt_real_imag: t_float;
+  signal r_bt_imag_real: t_float;
+  signal r_bt_imag_imag: t_float;
+  signal r_bt_sums: std_logic_vector(2*SW-1 downto 0);
+  signal r_bt_aligned: std_logic_vector(2*SW-1 downto 0);
+  signal r_bt: std_logic_vector(WIDTH-1 downto 0);
+  signal rr_bt: std_logic_vector(WIDTH-1 downto 0);
+
+  signal s_bt: std_logic_vector(WIDTH-1 downto 0);
+  signal s_bt_real: t_float;
+  signal s_bt_imag: t_float;
+  signal s_a: std_logic_vector(WIDTH-1 downto 0);
+  signal s_a_real: t_float;
+  signal s_a_imag: t_float;
+  signal s_cd_sums: std_logic_vector(4*SW-1 downto 0);
+  signal s_cd_aligned: std_logic_vector(4*SW-1 downto 0);
+  signal s_cd: std_logic_vector(2*WIDTH-1 downto 0);
+  signal ss_cd: std_logic_vector(2*WIDTH-1 downto 0);
+begin
+
+  yes_reg_i_p: if REG_I_P generate
+    process(clk)
+    begin
+      if rising_edge(clk) then
+        p_b <= i_b;
+        p_t <= i_t;
+      end if;
+    end process;
+  end generate;
+  no_reg_i_p: if not REG_I_P generate
+    p_b <= i_b;
+    p_t <= i_t;
+  end generate;
+
+  p_b_real <= p_b(WIDTH-1 downto FW);
+  p_b_imag <= p_b(FW-1 downto 0);
+  p_t_real <= p_t(WIDTH-1 downto FW);
+  p_t_imag <= p_t(FW-1 downto 0);
+
+  p_products <= float_mult_product(p_b_real, p_t_real, E, F) &
+                float_mult_product(p_b_real, p_t_imag, E, F) &
+                float_mult_product(p_b_imag, p_t_real, E, F) &
+                float_mult_product(p_b_imag, p_t_imag, E, F);
+
+  mult_pipeline: entity work.shift_register
+    generic map (
+      WIDTH => 4*PW,
+      LENGTH => MULT_LATENCY
+      )
+    port map (
+      clk => clk,
+      i_data => p_products,
+      o_data => q_products
+      );
+
+  round_products: for product_index in 0 to 3 generate
+    q_rounded((product_index+1)*FW-1 downto product_index*FW) <=
+      float_mult_round(q_products((product_index+1)*PW-1 downto product_index*PW), E, F);
+  end generate;
+
+  yes_reg_q_r: if REG_Q_R generate
+    process(clk)
+    begin
+      if rising_edge(clk) then
+        r_products <= q_rounded;
+      end if;
+    end process;
+  end generate;
+  no_reg_q_r: if not REG_Q_R generate
+    r_products <= q_rounded;
+  end generate;
+
+  r_bt_real_real <= r_products(4*FW-1 downto 3*FW);
+  r_bt_real_imag <= r_products(3*FW-1 downto 2*FW);
+  r_bt_imag_real <= r_products(2*FW-1 downto FW);
+  r_bt_imag_imag <= r_products(FW-1 downto 0);
+
+  r_bt_sums <= float_add_align(r_bt_real_real, float_negate(r_bt_imag_imag), E, F) &
+               float_add_align(r_bt_real_imag, r_bt_imag_real, E, F);
+
+  bt_align_pipeline: entity work.shift_register
+    generic map (
+      WIDTH => 2*SW,
+      LENGTH => ALIGN_LATENCY
+      )
+    port map (
+      clk => clk,
+      i_data => r_bt_sums,
+      o_data => r_bt_aligned
+      );
+
+  r_bt <= float_add_normalize(r_bt_aligned(2*SW-1 downto SW), E, F) &
+          float_add_normalize(r_bt_aligned(SW-1 downto 0), E, F);
+
+  bt_pipeline: entity work.shift_register
+    generic map (
+      WIDTH => WIDTH,
+      LENGTH => NORMALIZE_LATENCY
+      )
+    port map (
+      clk => clk,
+      i_data => r_bt,
+      o_data => rr_bt
+      );
+
+  yes_reg_r_s: if REG_R_S generate
+    process(clk)
+    begin
+      if rising_edge(clk) then
+        s_bt <= rr_bt;
+      end if;
+    end process;
+  end generate;
+  no_reg_r_s: if not REG_R_S generate
+    s_bt <= rr_bt;
+  end generate;
+
+  delay_a: entity work.shift_register
+    generic map (
+      WIDTH => WIDTH,
+      LENGTH => LATENCY_TO_S
+      )
+    port map (
+      clk => clk,
+      i_data => i_a,
+      o_data => s_a
+      );
+
+  s_a_real <= s_a(WIDTH-1 downto FW);
+  s_a_imag <= s_a(FW-1 downto 0);
+  s_bt_real <= s_bt(WIDTH-1 downto FW);
+  s_bt_imag <= s_bt(FW-1 downto 0);
+
+  s_cd_sums <= float_add_align(s_a_real, s_bt_real, E, F) &
+               float_add_align(s_a_imag, s_bt_imag, E, F) &
+               float_add_align(s_a_real, float_negate(s_bt_real), E, F) &
+               float_add_align(s_a_imag, float_negate(s_bt_imag), E, F);
+
+  cd_align_pipeline: entity work.shift_register
+    generic map (
+      WIDTH => 4*SW,
+      LENGTH => ALIGN_LATENCY
+      )
+    port map (
+      clk => clk,
+      i_data => s_cd_sums,
+      o_data => s_cd_aligned
+      );
+
+  normalize_cd: for sum_index in 0 to 3 generate
+    s_cd((sum_index+1)*FW-1 downto sum_index*FW) <=
+      float_add_normalize(s_cd_aligned((sum_index+1)*SW-1 downto sum_index*SW), E, F);
+  end generate;
+
+  cd_pipeline: entity work.shift_register
+    generic map (
+      WIDTH => 2*WIDTH,
+      LENGTH => NORMALIZE_LATENCY
+      )
+    port map (
+      clk => clk,
+      i_data => s_cd,
+      o_data => ss_cd
+      );
+
+  yes_reg_s_o: if REG_S_O generate
+    process(clk)
+    begin
+      if rising_edge(clk) then
+        o_c <= ss_cd(2*WIDTH-1 downto WIDTH);
+        o_d <= ss_cd(WIDTH-1 downto 0);
+      end if;
+    end process;
+  end generate;
+  no_reg_s_o: if not REG_S_O generate
+    o_c <= ss_cd(2*WIDTH-1 downto WIDTH);
+    o_d <= ss_cd(WIDTH-1 downto 0);
+  end generate;
+
+end architecture;
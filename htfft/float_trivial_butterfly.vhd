@@ -0,0 +1,155 @@
+library ieee;
+use ieee.std_logic_1164.all;
+use ieee.numeric_std.all;
+
+use work.htfft_pkg.all;
+use work.htfft_float_pkg.all;
+
+-- A floating point butterfly for twiddle factors that are always 1 or -j.
+-- It has the same generics, ports and latency as the float_butterfly entity
+-- and gives the same output for those twiddle factors, but it doesn't
+-- multiply.  The float twiddles are exact at 1 and -j so multiplying by
+-- them in float_butterfly is exact and the sums of the products with zero
+-- give the other product unchanged.
+-- The twiddle is -j when the sign bit of its imaginary part is set and 1
+-- otherwise.
+entity float_trivial_butterfly is
+  generic (
+    EXPONENT_WIDTH: positive;
+    FRACTION_WIDTH: positive;
+    MULT_LATENCY: natural;
+    ADD_LATENCY: natural;
+    REG_I_P: boolean;
+    REG_Q_R: boolean;
+    REG_R_S: boolean;
+    REG_S_O: boolean
+    );
+  port (
+    clk: in std_logic;
+    i_a: in std_logic_vector(2*(1+EXPONENT_WIDTH+FRACTION_WIDTH)-1 downto 0);
+    i_b: in std_logic_vector(2*(1+EXPONENT_WIDTH+FRACTION_WIDTH)-1 downto 0);
+    i_t: in std_logic_vector(2*(1+EXPONENT_WIDTH+FRACTION_WIDTH)-1 downto 0);
+    o_c: out std_logic_vector(2*(1+EXPONENT_WIDTH+FRACTION_WIDTH)-1 downto 0);
+    o_d: out std_logic_vector(2*(1+EXPONENT_WIDTH+FRACTION_WIDTH)-1 downto 0)
+  );
+end entity;
+
+architecture arch of float_trivial_butterfly is
+
+  constant E: positive := EXPONENT_WIDTH;
+  constant F: positive := FRACTION_WIDTH;
+  -- The width of a float component.
+  constant FW: positive := 1+E+F;
+  constant WIDTH: positive := 2*FW;
+  constant SW: positive := float_sum_width(E, F);
+  constant ALIGN_LATENCY: natural := (ADD_LATENCY+1)/2;
+  constant NORMALIZE_LATENCY: natural := ADD_LATENCY/2;
+
+  constant LATENCY_TO_S: natural := boolean_to_int(REG_I_P) + boolean_to_int(REG_Q_R) +
+                                    boolean_to_int(REG_R_S) + MULT_LATENCY + ADD_LATENCY;
+
+  subtype t_float is std_logic_vector(FW-1 downto 0);
+
+  signal i_b_real: t_float;
+  signal i_b_imag: t_float;
+  signal i_minus_j: std_logic;
+  signal i_bt_real: t_float;
+  signal i_bt_imag: t_float;
+  signal i_bt: std_logic_vector(WIDTH-1 downto 0);
+
+  signal s_bt: std_logic_vector(WIDTH-1 downto 0);
+  signal s_bt_real: t_float;
+  signal s_bt_imag: t_float;
+  signal s_a: std_logic_vector(WIDTH-1 downto 0);
+  signal s_a_real: t_float;
+  signal s_a_imag: t_float;
+  signal s_cd_sums: std_logic_vector(4*SW-1 downto 0);
+  signal s_cd_aligned: std_logic_vector(4*SW-1 downto 0);
+  signal s_cd: std_logic_vector(2*WIDTH-1 downto 0);
+  signal ss_cd: std_logic_vector(2*WIDTH-1 downto 0);
+begin
+
+  i_b_real <= i_b(WIDTH-1 downto FW);
+  i_b_imag <= i_b(FW-1 downto 0);
+  i_minus_j <= i_t(FW-1);
+
+  -- Multiplying by -j swaps the components and negates the new imaginary
+  -- part.
+  i_bt_real <= i_b_imag when i_minus_j = '1' else i_b_real;
+  i_bt_imag <= float_negate(i_b_real) when i_minus_j = '1' else i_b_imag;
+  i_bt <= i_bt_real & i_bt_imag;
+
+  delay_bt: entity work.shift_register
+    generic map (
+      WIDTH => WIDTH,
+      LENGTH => LATENCY_TO_S
+      )
+    port map (
+      clk => clk,
+      i_data => i_bt,
+      o_data => s_bt
+      );
+
+  delay_a: entity work.shift_register
+    generic map (
+      WIDTH => WIDTH,
+      LENGTH => LATENCY_TO_S
+      )
+    port map (
+      clk => clk,
+      i_data => i_a,
+      o_data => s_a
+      );
+
+  s_a_real <= s_a(WIDTH-1 downto FW);
+  s_a_imag <= s_a(FW-1 downto 0);
+  s_bt_real <= s_bt(WIDTH-1 downto FW);
+  s_bt_imag <= s_bt(FW-1 downto 0);
+
+  s_cd_sums <= float_add_align(s_a_real, s_bt_real, E, F) &
+               float_add_align(s_a_imag, s_bt_imag, E, F) &
+               float_add_align(s_a_real, float_negate(s_bt_real), E, F) &
+               float_add_align(s_a_imag, float_negate(s_bt_imag), E, F);
+
+  cd_align_pipeline: entity work.shift_register
+    generic map (
+      WIDTH => 4*SW,
+      LENGTH => ALIGN_LATENCY
+      )
+    port map (
+      clk => clk,
+      i_data => s_cd_sums,
+      o_data => s_cd_aligned
+      );
+
+  normalize_cd: for sum_index in 0 to 3 generate
+    s_cd((sum_index+1)*FW-1 downto sum_index*FW) <=
+      float_add_normalize(s_cd_aligned((sum_index+1)*SW-1 downto sum_index*SW), E, F);
+  end generate;
+
+  cd_pipeline: entity work.shift_register
+    generic map (
+      WIDTH => 2*WIDTH,
+      LENGTH => NORMALIZE_LATENCY
+      )
+    port map (
+      clk => clk,
+      i_data => s_cd,
+      o_data => ss_cd
+      );
+
+  yes_reg_s_o: if REG_S_O generate
+    process(clk)
+    begin
+      if rising_edge(clk) then
+        o_c <= ss_cd(2*WIDTH-1 downto WIDTH);
+        o_d <= ss_cd(WIDTH-1 downto 0);
+      end if;
+    end process;
+  end generate;
+  no_reg_s_o: if not REG_S_O generate
+    o_c <= ss_cd(2*WIDTH-1 downto WIDTH);
+    o_d <= ss_cd(WIDTH-1 downto 0);
+  end generate;
+
+end architecture;
@@ -0,0 +1,147 @@
+"""
+The floating point formats used by the floating point HTFFT and a model of
+the arithmetic in htfft_float_pkg.vhd.
+
+The formats have the layout of IEEE half and single precision (a sign bit,
+then the exponent, then the fraction) but the arithmetic is simpler:
+  - A value with an exponent field of 0 is zero.  There are no subnormals.
+  - There are no infinities or NaNs.  Results that are too large saturate
+    to the largest magnitude and results that are too small flush to zero.
+  - Results are rounded half away from zero.  Addition aligns the smaller
+    operand with 3 guard bits and no sticky bit.
+Values are handled as unsigned integers holding the bits of the format.
+"""
+import numpy
+
+# The (exponent width, fraction width) of each format.
+FORMATS = {
+    'float16': (5, 10),
+    'float32': (8, 23),
+    }
+
+# The number of bits kept below the fraction when aligning for addition.
+GUARD_BITS = 3
+
+
+def get_format(float_format):
+    assert float_format in FORMATS, 'Unknown float format {}'.format(float_format)
+    return FORMATS[float_format]
+
+
+def get_width(float_format):
+    exponent_width, fraction_width = get_format(float_format)
+    return 1 + exponent_width + fraction_width
+
+
+def split(values, float_format):
+    exponent_width, fraction_width = get_format(float_format)
+    values = numpy.asarray(values, dtype=numpy.int64)
+    sign = (values >> (exponent_width + fraction_width)) & 1
+    exponent = (values >> fraction_width) & (pow(2, exponent_width)-1)
+    fraction = values & (pow(2, fraction_width)-1)
+    return sign, exponent, fraction
+
+
+def pack(sign, exponent, mantissa, float_format):
+    """
+    Packs a sign, a biased exponent and a mantissa in [2^F, 2^(F+1)],
+    flushing to zero and saturating like float_pack.
+    """
+    exponent_width, fraction_width = get_format(float_format)
+    max_exponent = pow(2, exponent_width)-1
+    overflowed = mantissa >= pow(2, fraction_width+1)
+    mantissa = numpy.where(overflowed, mantissa >> 1, mantissa)
+    exponent = numpy.where(overflowed, exponent + 1, exponent)
+    fraction = mantissa & (pow(2, fraction_width)-1)
+    saturated = exponent > max_exponent
+    exponent = numpy.where(saturated, max_exponent, exponent)
+    fraction = numpy.where(saturated, pow(2, fraction_width)-1, fraction)
+    packed = (sign << (exponent_width + fraction_width)) | (exponent << fraction_width) | fraction
+    return numpy.where(exponent <= 0, 0, packed)
+
+
+def from_floats(values, float_format):
+    """
+    Quantizes floats to the format.
+    """
+    exponent_width, fraction_width = get_format(float_format)
+    values = numpy.asarray(values, dtype=float)
+    sign = (values < 0).astype(numpy.int64)
+    fractions, exponents = numpy.frexp(numpy.abs(values))
+    # frexp gives a fraction in [0.5, 1) so the mantissa is in [2^F, 2^(F+1)].
+    mantissa = numpy.floor(fractions * pow(2, fraction_width+1) + 0.5).astype(numpy.int64)
+    exponent = exponents.astype(numpy.int64) - 1 + pow(2, exponent_width-1)-1
+    return numpy.where(values == 0, 0, pack(sign, exponent, mantissa, float_format))
+
+
+def to_floats(values, float_format):
+    exponent_width, fraction_width = get_format(float_format)
+    sign, exponent, fraction = split(values, float_format)
+    bias = pow(2, exponent_width-1)-1
+    magnitude = numpy.ldexp((fraction + pow(2, fraction_width)).astype(float),
+                            exponent - bias - fraction_width)
+    return numpy.where(exponent == 0, 0.0, numpy.where(sign == 1, -magnitude, magnitude))
+
+
+def negate(values, float_format):
+    """
+    Flips the sign bit like float_negate.
+    """
+    return numpy.asarray(values, dtype=numpy.int64) ^ pow(2, get_width(float_format)-1)
+
+
+def mult(a, b, float_format):
+    """
+    Models float_mult.
+    """
+    exponent_width, fraction_width = get_format(float_format)
+    a_sign, a_exponent, a_fraction = split(a, float_format)
+    b_sign, b_exponent, b_fraction = split(b, float_format)
+    product = (a_fraction + pow(2, fraction_width)) * (b_fraction + pow(2, fraction_width))
+    exponent = a_exponent + b_exponent - (pow(2, exponent_width-1)-1)
+    # The product is in [2^(2F), 2^(2F+2)).
+    high = (product >> (2*fraction_width+1)) & 1
+    shift = fraction_width + high
+    mantissa = (product >> shift) + ((product >> (shift-1)) & 1)
+    result = pack(a_sign ^ b_sign, exponent + high, mantissa, float_format)
+    return numpy.where((a_exponent == 0) | (b_exponent == 0), 0, result)
+
+
+def bit_length(values, max_bits):
+    lengths = numpy.zeros(numpy.shape(values), dtype=numpy.int64)
+    for bit_index in range(max_bits):
+        lengths = numpy.where((values >> bit_index) & 1 == 1, bit_index+1, lengths)
+    return lengths
+
+
+def add(a, b, float_format):
+    """
+    Models float_add.
+    """
+    exponent_width, fraction_width = get_format(float_format)
+    a = numpy.asarray(a, dtype=numpy.int64)
+    b = numpy.asarray(b, dtype=numpy.int64)
+    a, b = numpy.broadcast_arrays(a, b)
+    magnitude_mask = pow(2, exponent_width+fraction_width)-1
+    a_is_big = (a & magnitude_mask) >= (b & magnitude_mask)
+    big = numpy.where(a_is_big, a, b)
+    small = numpy.where(a_is_big, b, a)
+    big_sign, big_exponent, big_fraction = split(big, float_format)
+    small_sign, small_exponent, small_fraction = split(small, float_format)
+    top = fraction_width + GUARD_BITS
+    big_mantissa = (big_fraction + pow(2, fraction_width)) << GUARD_BITS
+    small_mantissa = (small_fraction + pow(2, fraction_width)) << GUARD_BITS
+    difference = big_exponent - small_exponent
+    small_mantissa = numpy.where(difference > top, 0, small_mantissa >> numpy.minimum(difference, top+1))
+    total = numpy.where(big_sign == small_sign, big_mantissa + small_mantissa,
+                        big_mantissa - small_mantissa)
+    # Normalize so that the leading one is at bit `top`.
+    leading = bit_length(total, top+2) - 1
+    normalized = numpy.where(leading > top, total >> 1, total << numpy.maximum(top - leading, 0))
+    exponent = big_exponent + leading - top
+    mantissa = (normalized >> GUARD_BITS) + ((normalized >> (GUARD_BITS-1)) & 1)
+    result = pack(big_sign, exponent, mantissa, float_format)
+    result = numpy.where(total == 0, 0, result)
+    # Adding zero gives the other operand.
+    result = numpy.where(small_exponent == 0, big, result)
+    return numpy.where(big_exponent == 0, 0, result)
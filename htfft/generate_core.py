@@ -1,4 +1,5 @@
 import os
+import json
 import argparse
 import shutil
 
@@ -13,13 +14,8 @@ def make_barrel_shifter_pipeline(spcc):
             pipeline[index] = '1'
     return ''.join(pipeline)
 
-def generate_core(n, spcc, width):
-    suffix = '_n{}_spcc{}_width{}'.format(n, spcc, width)
-    core_name = 'htfft{}'.format(suffix)
-    directory = os.path.abspath('htfft{}'.format(suffix))
-    os.makedirs(directory)
-    # Make the core file that fusesoc will find and use.
-    pipelines = {
+def make_pipelines(spcc):
+    return {
         'barrel_shifter': make_barrel_shifter_pipeline(spcc),
         'butterfly': {
             'mult_latency': 3,
@@ -34,8 +30,24 @@ def generate_core(n, spcc, width):
             },
         'reg_s_': True,
         }
-    htfft_gen.make_htfft_core(directory, suffix, n, spcc, width, pipelines)
-    filenames = helper.get_files(core_name, directory, verbose=False, config_filename=None)
+
+def generate_core(n, spcc, width, width_schedule=None, gauss=False, compress_twiddles=False,
+                  twiddles_in_file=False, memory_thresholds=None, natural_order=True,
+                  inverse=False, real=False, block_floating_point=False, float_format=None,
+                  min_n=None, n_channels=None, axi_stream=False, radix22=False):
+    suffix = '_n{}_spcc{}_width{}'.format(n, spcc, width)
+    core_name = 'htfft{}'.format(suffix)
+    directory = os.path.abspath('htfft{}'.format(suffix))
+    os.makedirs(directory)
+    # Make the core file that fusesoc will find and use.
+    pipelines = make_pipelines(spcc)
+    htfft_gen.make_htfft_core(directory, suffix, n, spcc, width, pipelines, width_schedule, gauss,
+                              compress_twiddles, twiddles_in_file, memory_thresholds, natural_order,
+                              inverse, real, block_floating_point, float_format, min_n,
+                              n_channels, axi_stream, radix22)
+    core_filename = os.path.join(directory, '{}.core'.format(core_name))
+    filenames = helper.get_files(core_name, directory, verbose=False, config_filename=None,
+                                 core_filename=core_filename)
     for filename in filenames:
         shutil.copy2(filename, os.path.join(directory, os.path.basename(filename)))
 
@@ -44,8 +56,55 @@ def main():
     parser.add_argument('--n', dest='n', type=int, required=True)
     parser.add_argument('--spcc', dest='spcc', type=int, required=True)
     parser.add_argument('--width', dest='width', type=int, required=True)
+    # A JSON list with an entry for each stage e.g. '[null, {"lsbs": 1, "rounding": "round"}]'
+    parser.add_argument('--width_schedule', dest='width_schedule', type=json.loads, default=None)
+    # Use 3 multiplications rather than 4 in the butterflies.
+    parser.add_argument('--gauss', dest='gauss', action='store_true')
+    # Only store a quarter wave of twiddles in the stages.
+    parser.add_argument('--compress_twiddles', dest='compress_twiddles', action='store_true')
+    # Write the twiddles to .mem files that are read when the design is elaborated.
+    parser.add_argument('--twiddles_in_file', dest='twiddles_in_file', action='store_true')
+    # A JSON dictionary overriding helper.DEFAULT_MEMORY_THRESHOLDS e.g. '{"distributed_max_bits": 16384}'
+    parser.add_argument('--memory_thresholds', dest='memory_thresholds', type=json.loads, default=None)
+    # Skip the final memory and leave the output in the order given by model.output_order.
+    parser.add_argument('--permuted_output', dest='natural_order', action='store_false')
+    # Do an inverse FFT.
+    parser.add_argument('--inverse', dest='inverse', action='store_true')
+    # Also generate htfft{suffix}_real which transforms two real streams.
+    parser.add_argument('--real', dest='real', action='store_true')
+    # Normalize each vector by a shared exponent and keep the stage widths constant.
+    parser.add_argument('--block_floating_point', dest='block_floating_point', action='store_true')
+    # Use floating point samples and butterflies ('float16' or 'float32').  The width must be twice
+    # the width of the format.
+    parser.add_argument('--float_format', dest='float_format', default=None)
+    # Add an i_log2n input selecting the size of the FFT at run time from min_n up to n.
+    parser.add_argument('--min_n', dest='min_n', type=int, default=None)
+    # Add i_channel and o_channel tags for interleaving vectors from this many channels.
+    parser.add_argument('--n_channels', dest='n_channels', type=int, default=None)
+    # Also generate htfft{suffix}_axis which wraps the HTFFT in AXI4-Stream interfaces.
+    parser.add_argument('--axi_stream', dest='axi_stream', action='store_true')
+    # Replace pairs of stages with radix-2^2 stages which use fewer multipliers and more memory.
+    parser.add_argument('--radix22', dest='radix22', action='store_true')
     args = parser.parse_args()
-    generate_core(n=args.n, spcc=args.spcc, width=args.width)
+    generate_core(n=args.n, spcc=args.spcc, width=args.width, width_schedule=args.width_schedule,
+                  gauss=args.gauss, compress_twiddles=args.compress_twiddles,
+                  twiddles_in_file=args.twiddles_in_file, memory_thresholds=args.memory_thresholds,
+                  natural_order=args.natural_order, inverse=args.inverse, real=args.real,
+                  block_floating_point=args.block_floating_point, float_format=args.float_format,
+                  min_n=args.min_n, n_channels=args.n_channels, axi_stream=args.axi_stream,
+                  radix22=args.radix22)
+    width_schedule = args.width_schedule
+    if args.block_floating_point:
+        width_schedule = helper.get_block_floating_point_schedule(args.n, args.spcc)
+    print(htfft_gen.format_width_report(htfft_gen.get_width_report(
+        args.n, args.spcc, args.width, width_schedule, args.gauss, float_format=args.float_format,
+        radix22=args.radix22)))
+    print(htfft_gen.format_memory_report(htfft_gen.get_memory_report(
+        args.n, args.spcc, args.width, width_schedule, args.memory_thresholds, args.float_format,
+        args.radix22)))
+    if args.float_format:
+        print(htfft_gen.format_float_report(htfft_gen.get_float_report(
+            args.n, args.spcc, make_pipelines(args.spcc), float_format=args.float_format)))
 
 if __name__ == '__main__':
     main()
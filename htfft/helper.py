@@ -1,12 +1,18 @@
 import os
 import math
 import cmath
+import shutil
 import subprocess
 import json
 
+import numpy
 import yaml
+import cocotb
+from cocotb.regression import TestFactory
 from cocotb_test.run import run
 
+from htfft import cache, prebuilt
+
 basedir = os.path.abspath(os.path.dirname(__file__))
 
 
@@ -31,6 +37,148 @@ def reverse_bits(value, n_bits):
     return new_value
 
 
+def normalize_width_schedule(width_schedule, n_stages):
+    """
+    Fills in the defaults of a width schedule.
+
+    A width schedule has an entry for the input of each stage.  An entry is
+    either None (the width isn't changed) or a dictionary with
+      'lsbs': The number of bits removed from the bottom of each
+              component.  This keeps the scaling the same.
+      'msbs': The number of bits removed from the top of each component with
+              saturation.  Each bit removed multiplies the values by two.
+      'rounding': 'truncate' or 'round' (round half up) for removing LSBs.
+    """
+    if width_schedule is None:
+        width_schedule = [None] * n_stages
+    assert len(width_schedule) == n_stages
+    normalized = []
+    for entry in width_schedule:
+        entry = dict(entry or {})
+        reduction = {
+            'msbs': entry.pop('msbs', 0),
+            'lsbs': entry.pop('lsbs', 0),
+            'rounding': entry.pop('rounding', 'truncate'),
+            }
+        assert not entry, 'Unknown width schedule keys {}'.format(list(entry.keys()))
+        assert reduction['msbs'] >= 0
+        assert reduction['lsbs'] >= 0
+        assert reduction['rounding'] in ('truncate', 'round')
+        normalized.append(reduction)
+    return normalized
+
+
+def get_stage_widths(n, spcc, input_width, width_schedule=None, float_format=None):
+    """
+    Works out the widths through the HTFFT for a width schedule.
+    Returns a list with the (unreduced_width, reduced_width) of the input of
+    each stage, the output width and the base 2 log of the factor that the
+    output is scaled by from removing MSBs.
+    With a `float_format` the width doesn't grow through the butterflies.
+    """
+    n_stages = logceil(n//spcc)
+    schedule = normalize_width_schedule(width_schedule, n_stages)
+    growth = 0 if float_format else 2
+    width = input_width + growth*logceil(spcc)
+    stage_widths = []
+    log_gain = 0
+    for reduction in schedule:
+        reduced_width = width - 2*(reduction['msbs'] + reduction['lsbs'])
+        assert reduced_width >= 4
+        stage_widths.append((width, reduced_width))
+        log_gain += reduction['msbs']
+        width = reduced_width + growth
+    return stage_widths, width, log_gain
+
+
+def get_radix22_pairs(n_stages):
+    """
+    The indices of the stages that are done together with the next stage
+    by a radix-2^2 stage.  With an odd number of stages the first stays
+    radix-2 since it is the smallest.
+    """
+    return list(range(n_stages % 2, n_stages, 2))
+
+
+def get_block_floating_point_schedule(n, spcc):
+    """
+    The width schedule used with block floating point.  One LSB is rounded
+    away from each component before every stage but the first so all the
+    stages have the same width.  The LSB is dropped whether or not the stage
+    needed the headroom, so this costs precision compared with a per-stage
+    exponent (see the README).
+    """
+    n_stages = logceil(n//spcc)
+    reduction = {'lsbs': 1, 'rounding': 'round'}
+    return [None] + [reduction] * (n_stages-1)
+
+
+def get_smallest_n(spcc):
+    """
+    The smallest FFT size a HTFFT with `spcc` samples per clock cycle can
+    do.  The initial memory needs n >= spcc^2 and there must be a stage.
+    """
+    return max(spcc*spcc, 2*spcc)
+
+
+def get_channel_width(n_channels):
+    """
+    The width of the channel tags for `n_channels` interleaved channels.
+    """
+    return max(1, logceil(n_channels or 1))
+
+
+def get_exponent_width(input_width):
+    """
+    The width of the block floating point exponent.  The input can be
+    shifted up by at most `input_width`/2-2 bits.
+    """
+    return max(1, logceil(input_width//2-1))
+
+
+# The memory styles in the order they're considered, with the vivado
+# ram_style each one maps to.
+MEMORY_STYLES = ('registers', 'distributed', 'block', 'ultra')
+
+DEFAULT_MEMORY_THRESHOLDS = {
+    # Memories this deep or shallower use flip-flops.  A stage with L=2 has
+    # memories with a depth of 1.
+    'registers_max_depth': 1,
+    # Memories with up to this many bits (depth*width) use LUTRAM.  This is
+    # a bit less than a 36Kb block RAM.
+    'distributed_max_bits': 32768,
+    # Memories with up to this many bits use block RAM and bigger ones use
+    # UltraRAM.  This is four 288Kb UltraRAMs.
+    'block_max_bits': 1179648,
+    }
+
+
+def normalize_memory_thresholds(memory_thresholds):
+    thresholds = dict(DEFAULT_MEMORY_THRESHOLDS)
+    if memory_thresholds:
+        unknown = set(memory_thresholds) - set(thresholds)
+        assert not unknown, 'Unknown memory threshold keys {}'.format(sorted(unknown))
+        thresholds.update(memory_thresholds)
+    return thresholds
+
+
+def get_memory_style(depth, width, memory_thresholds=None):
+    """
+    Chooses how a memory of `depth` words of `width` bits should be
+    implemented.  `memory_thresholds` overrides entries in
+    DEFAULT_MEMORY_THRESHOLDS.
+    """
+    thresholds = normalize_memory_thresholds(memory_thresholds)
+    if depth <= thresholds['registers_max_depth']:
+        return 'registers'
+    elif depth*width <= thresholds['distributed_max_bits']:
+        return 'distributed'
+    elif depth*width <= thresholds['block_max_bits']:
+        return 'block'
+    else:
+        return 'ultra'
+
+
 def random_complex(rnd, width, exact=False):
     """
     Get a random complex number with amplitude less than or
@@ -53,7 +201,94 @@ def random_complex(rnd, width, exact=False):
     return comp
 
 
-def get_files(core_name, working_directory, verbose=False, config_filename=None):
+def random_complex_array(rng, width, shape, exact=False):
+    """
+    A numpy version of `random_complex` that returns an array of random
+    complex numbers with amplitude less than or equal to 1.
+    `rng` is a numpy random Generator so blocks are reproducible from a seed.
+    """
+    count = int(numpy.prod(shape))
+    accepted = []
+    n_accepted = 0
+    while n_accepted < count:
+        # A bit over 3/4 of the samples in the square are within the unit
+        # circle so draw enough that we usually only need one pass.
+        n_draw = (count - n_accepted) * 4 // 3 + 16
+        if exact:
+            max_mag = pow(2, width//2 - 2)
+            parts = rng.integers(-max_mag, max_mag, size=(2, n_draw), endpoint=True)/max_mag
+        else:
+            parts = rng.random((2, n_draw))*2-1
+        comps = parts[0] + (0+1j)*parts[1]
+        comps = comps[numpy.abs(comps) <= 1]
+        accepted.append(comps)
+        n_accepted += len(comps)
+    return numpy.concatenate(accepted)[:count].reshape(shape)
+
+
+def random_complex_blocks(seed, width, n, block_size, exact=False):
+    """
+    Yields blocks of `block_size` random complex vectors of length `n`.
+    """
+    rng = numpy.random.default_rng(seed)
+    while True:
+        yield random_complex_array(rng, width, (block_size, n), exact=exact)
+
+
+def write_twiddle_file(filename, twiddles):
+    """
+    Writes twiddles (strings of bits) to a file with one on each line.  The
+    generated VHDL reads these files with textio when it is elaborated.
+    """
+    with open(filename, 'w') as f:
+        for twiddle in twiddles:
+            f.write(twiddle)
+            f.write('\n')
+
+
+def is_data_file(filename):
+    """
+    Whether a file is read by the VHDL (the twiddle files) rather than being
+    a source to analyze.
+    """
+    return filename.endswith('.mem')
+
+
+def add_generated_files(generator, filenames):
+    """
+    Adds the files made by a fusesoc generator to its core.  Data files are
+    copied into the tool's working directory so the relative filenames in
+    the VHDL find them.
+    """
+    generator.add_files([filename for filename in filenames if not is_data_file(filename)],
+                        file_type='vhdlSource')
+    data_filenames = [filename for filename in filenames if is_data_file(filename)]
+    if data_filenames:
+        generator.add_files([{filename: {'copyto': os.path.basename(filename)}}
+                             for filename in data_filenames],
+                            fileset='data', file_type='user')
+
+
+def get_files(core_name, working_directory, verbose=False, config_filename=None,
+              core_filename=None):
+    """
+    Returns the files that fusesoc resolves for a core.  The results are
+    cached (see cache.py) so fusesoc is only called when the core, the
+    templates or the sources have changed.
+    """
+    key = cache.get_key(core_name, core_filename=core_filename,
+                        config_filename=config_filename)
+    if key is not None:
+        filenames = cache.lookup(key, working_directory)
+        if filenames is not None:
+            return filenames
+    filenames = run_fusesoc_setup(core_name, working_directory, verbose, config_filename)
+    if key is not None:
+        cache.store(key, filenames)
+    return filenames
+
+
+def run_fusesoc_setup(core_name, working_directory, verbose=False, config_filename=None):
     cmd = ['fusesoc']
     if verbose:
         cmd += ['--verbose']
@@ -89,6 +324,31 @@ def get_test_params():
     return params
 
 
+def get_seeds(rnd, seed, n_seeds):
+    """
+    Seeds for the stimulus sets that are run on one elaborated design.
+    The first is `seed` so that a single seed matches the original test.
+    """
+    return [seed] + [rnd.randint(0, pow(2, 31)) for index in range(n_seeds-1)]
+
+
+def generate_seed_tests(test_function):
+    """
+    Adds a cocotb test to the module of `test_function` for each of the
+    seeds in the test parameters.  They are run one after another in the
+    same simulation so the simulator startup is only paid once, and cocotb
+    reports the result of each seed separately.  Configurations with
+    different generics still need a simulation each.
+    `test_function` should take `dut` and `seed` and reset the design.
+    Does nothing when the module is imported outside of a simulation.
+    """
+    if cocotb.top is None:
+        return
+    factory = TestFactory(test_function)
+    factory.add_option('seed', get_test_params()['seeds'])
+    factory.generate_tests()
+
+
 def run_with_cocotb(working_directory, filenames, top_name, test_module_name, wave=False,
                     generics={}, extra_env={}, test_params=None):
     os.environ['SIM'] = 'ghdl'
@@ -104,10 +364,20 @@ def run_with_cocotb(working_directory, filenames, top_name, test_module_name, wa
         with open(test_params_filename, 'w') as f:
             f.write(json.dumps(test_params))
     os.environ['HTFFT_TEST_PARAMS_FILENAME'] = test_params_filename
+    data_filenames = [filename for filename in filenames if is_data_file(filename)]
+    filenames = [filename for filename in filenames if not is_data_file(filename)]
+    # Reuse a pre-analyzed library for the static sources.
+    vhdl_sources = prebuilt.prepare(working_directory, filenames, top_name)
+    # GHDL runs in the sim_build directory so that is where the VHDL looks
+    # for the data files.
+    sim_build = os.path.join(working_directory, prebuilt.SIM_BUILD)
+    os.makedirs(sim_build, exist_ok=True)
+    for filename in data_filenames:
+        shutil.copy2(filename, sim_build)
     pwd = os.getcwd()
     os.chdir(working_directory)
     run(
-        vhdl_sources=filenames,
+        vhdl_sources=vhdl_sources,
         sim_args=simulation_args,
         toplevel=top_name,
         module=test_module_name,
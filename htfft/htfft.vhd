@@ -1,5 +1,6 @@
 library ieee;
 use ieee.std_logic_1164.all;
+use ieee.numeric_std.all;
 
 use work.htfft_pkg.all;
 use work.htfft{{suffix}}_params.all;
@@ -11,20 +12,76 @@ entity htfft{{suffix}} is
    reset: in std_logic;
    -- Indicates this is the first clock cycle of data for this FFT.
    i_first: in std_logic;
+   {% if min_n %}
+   -- log2 of the size of the FFT, from log2(MIN_N) to log2(N).  It is
+   -- sampled with i_first.  A vector of a different size must not start
+   -- until all the vectors of the old size have been output.
+   i_log2n: in std_logic_vector(log2n_width(N)-1 downto 0) :=
+     std_logic_vector(to_unsigned(logceil(N), log2n_width(N)));
+   {% endif %}
+   {% if n_channels %}
+   -- The channel of the vector, sampled with i_first.
+   i_channel: in std_logic_vector(CHANNEL_WIDTH-1 downto 0) := (others => '0');
+   {% endif %}
    i_data: in std_logic_vector(SPCC*INPUT_WIDTH-1 downto 0);
    o_first: out std_logic;
+   {% if n_channels %}
+   -- The channel of the vector being output.  It changes with o_first and
+   -- is held until the next one.
+   o_channel: out std_logic_vector(CHANNEL_WIDTH-1 downto 0);
+   {% endif %}
+   {% if block_floating_point %}
+   -- The output is the FFT divided by N and multiplied by 2^o_exponent.
+   o_exponent: out std_logic_vector(EXPONENT_WIDTH-1 downto 0);
+   {% endif %}
    o_data: out std_logic_vector(SPCC*OUTPUT_WIDTH-1 downto 0)
    );
 end entity;
 
 architecture arch of htfft{{suffix}} is
 
+  {% if float_format %}
+  -- Floating point samples don't grow through the butterflies.
+  constant R_WIDTH: positive := INPUT_WIDTH;
+  {% else %}
   constant R_WIDTH: positive := INPUT_WIDTH + 2*logceil(SPCC);
+  {% endif %}
 
   constant UNROLLED_FFT_LATENCY: natural := BUTTERFLY_LATENCY * logceil(SPCC);
 
   signal p_data: std_logic_vector(INPUT_WIDTH*SPCC-1 downto 0);
+  {% if min_n %}
+  signal p_log2n: std_logic_vector(log2n_width(N)-1 downto 0) :=
+    std_logic_vector(to_unsigned(logceil(N), log2n_width(N)));
+  {% endif %}
 
+  {% if block_floating_point %}
+  -- The latency of initial_memory.
+  constant INITIAL_MEMORY_LATENCY: positive :=
+    count_pipeline_length(BARREL_SHIFTER_PIPELINE)*2+1+N/SPCC;
+  -- Enough space for the exponents of all the vectors in the HTFFT.
+  -- logceil rounds down so one is added to get a power of two above the
+  -- count.
+  constant N_EXPONENTS: positive := 2**(logceil(LATENCY_BOUND/(N/SPCC) + 2) + 1);
+  type array_of_exponents is array(natural range <>) of std_logic_vector(EXPONENT_WIDTH-1 downto 0);
+  signal exponents: array_of_exponents(N_EXPONENTS-1 downto 0);
+  signal exponent_write: unsigned(logceil(N_EXPONENTS)-1 downto 0) := (others => '0');
+  signal exponent_read: unsigned(logceil(N_EXPONENTS)-1 downto 0) := (others => '0');
+
+  signal n_beforefirst: std_logic;
+  signal n_data: std_logic_vector(INPUT_WIDTH*SPCC-1 downto 0);
+  signal q_exponent: std_logic_vector(EXPONENT_WIDTH-1 downto 0);
+  signal s_exponent: std_logic_vector(EXPONENT_WIDTH-1 downto 0);
+  {% endif %}
+  {% if n_channels %}
+  -- Enough space for the tags of all the vectors in the HTFFT.
+  constant N_CHANNEL_TAGS: positive := 2**(logceil(LATENCY_BOUND/(N/SPCC) + 2) + 1);
+  type array_of_channels is array(natural range <>) of std_logic_vector(CHANNEL_WIDTH-1 downto 0);
+  signal channels: array_of_channels(N_CHANNEL_TAGS-1 downto 0);
+  signal channel_write: unsigned(logceil(N_CHANNEL_TAGS)-1 downto 0) := (others => '0');
+  signal channel_read: unsigned(logceil(N_CHANNEL_TAGS)-1 downto 0) := (others => '0');
+  signal s_channel: std_logic_vector(CHANNEL_WIDTH-1 downto 0);
+  {% endif %}
   signal q_beforefirst: std_logic;
   signal q_beforefirstslv: std_logic_vector(0 downto 0);
   signal q_data: std_logic_vector(INPUT_WIDTH*SPCC-1 downto 0);
@@ -33,15 +90,29 @@ architecture arch of htfft{{suffix}} is
   signal r_beforefirstslv: std_logic_vector(0 downto 0);
   signal r_data: std_logic_vector(R_WIDTH*SPCC-1 downto 0);
 
-  {% for index in range(n_stages+1) %}
+  {% for stage in stages %}
   signal r{{loop.index0}}_reset: std_logic;
-  signal r{{loop.index0}}_data_a: std_logic_vector((R_WIDTH+2*{{loop.index0}})*SPCC/2-1 downto 0);
-  signal r{{loop.index0}}_data_b: std_logic_vector((R_WIDTH+2*{{loop.index0}})*SPCC/2-1 downto 0);
+  signal r{{loop.index0}}_data_a: std_logic_vector({{stage.unreduced_width}}*SPCC/2-1 downto 0);
+  signal r{{loop.index0}}_data_b: std_logic_vector({{stage.unreduced_width}}*SPCC/2-1 downto 0);
+  signal r{{loop.index0}}_reduced_a: std_logic_vector({{stage.width}}*SPCC/2-1 downto 0);
+  signal r{{loop.index0}}_reduced_b: std_logic_vector({{stage.width}}*SPCC/2-1 downto 0);
   {% endfor %}
+  signal r{{n_stages}}_reset: std_logic;
+  signal r{{n_stages}}_data_a: std_logic_vector(OUTPUT_WIDTH*SPCC/2-1 downto 0);
+  signal r{{n_stages}}_data_b: std_logic_vector(OUTPUT_WIDTH*SPCC/2-1 downto 0);
+  {% if min_n %}
+  signal u_reset: std_logic;
+  signal u_data_a: std_logic_vector(OUTPUT_WIDTH*SPCC/2-1 downto 0);
+  signal u_data_b: std_logic_vector(OUTPUT_WIDTH*SPCC/2-1 downto 0);
+  {% set last = 'u' %}
+  {% else %}
+  {% set last = 'r' ~ n_stages %}
+  {% endif %}
 
   signal s_beforefirst: std_logic;
   signal s_first: std_logic;
   signal s_data: std_logic_vector(SPCC*OUTPUT_WIDTH-1 downto 0);
+  signal s_output: std_logic_vector(SPCC*OUTPUT_WIDTH-1 downto 0);
 
 begin
 
@@ -51,7 +122,18 @@ begin
       -- We're mostly have this delay in so that i_first can arrive
       -- one clock cycle ahead so it can act like a reset to prepare
       -- for the new vector.
-      p_data <= i_data;
+      -- For an inverse FFT the real and imaginary parts are swapped here and
+      -- at the output, since swap(fft(swap(x))) = N*ifft(x).
+      if INVERSE then
+        p_data <= swap_components(i_data, INPUT_WIDTH);
+      else
+        p_data <= i_data;
+      end if;
+      {% if min_n %}
+      if i_first = '1' then
+        p_log2n <= i_log2n;
+      end if;
+      {% endif %}
     end if;
   end process;
 
@@ -68,9 +150,58 @@ begin
       reset => reset,
       i_beforefirst => i_first,
       i_data => p_data,
+      {% if min_n %}
+      i_log2n => p_log2n,
+      {% endif %}
+      {% if block_floating_point %}
+      o_beforefirst => n_beforefirst,
+      o_data => n_data
+      {% else %}
       o_beforefirst => q_beforefirst,
       o_data => q_data
+      {% endif %}
       );
+  {% if block_floating_point %}
+
+  -- Shift each vector up by a shared exponent to use the full width.
+  normalize: entity work.block_normalize
+    generic map (
+      WIDTH => INPUT_WIDTH,
+      SPCC => SPCC,
+      N => N,
+      EXPONENT_WIDTH => EXPONENT_WIDTH,
+      LATENCY => INITIAL_MEMORY_LATENCY
+      )
+    port map (
+      clk => clk,
+      i_beforefirst => i_first,
+      i_data => p_data,
+      j_beforefirst => n_beforefirst,
+      j_data => n_data,
+      o_beforefirst => q_beforefirst,
+      o_data => q_data,
+      o_exponent => q_exponent
+      );
+
+  -- The exponents wait in a small FIFO until their vectors reach the output.
+  process(clk)
+  begin
+    if rising_edge(clk) then
+      if q_beforefirst = '1' then
+        exponents(to_integer(exponent_write)) <= q_exponent;
+        exponent_write <= exponent_write + 1;
+      end if;
+      if s_beforefirst = '1' then
+        s_exponent <= exponents(to_integer(exponent_read));
+        exponent_read <= exponent_read + 1;
+      end if;
+      if reset = '1' then
+        exponent_write <= (others => '0');
+        exponent_read <= (others => '0');
+      end if;
+    end if;
+  end process;
+  {% endif %}
   -- Process the data with an unrolled FFT the size of which matches
   -- the number samples arriving per clock cycle.
   unrolled: entity work.unrolled_fft_inner_{{spcc}}{{suffix}}
@@ -97,18 +228,87 @@ begin
   r0_reset <= r_beforefirstslv(0);
   r0_data_a <= r_data(R_WIDTH*SPCC/2-1 downto 0);
   r0_data_b <= r_data(R_WIDTH*SPCC-1 downto R_WIDTH*SPCC/2);
-  {% for stage_n in stage_ns %}
-    stage_{{stage_n}}_inst: entity work.stage_{{stage_n}}{{suffix}}
+  {% for stage in stages %}
+  {% if not stage.skip %}
+  {% if stage.reduce %}
+  -- Reduce the width before the stage as set by the width schedule.
+  reduce_{{stage.n}}_a: entity work.reduce_width
+    generic map (
+      SIZE => SPCC/2,
+      INPUT_WIDTH => {{stage.unreduced_width}},
+      OUTPUT_WIDTH => {{stage.width}},
+      LSBS => {{stage.lsbs}},
+      ROUND => {{'true' if stage.round else 'false'}}
+      )
+    port map (
+      i_data => r{{loop.index0}}_data_a,
+      o_data => r{{loop.index0}}_reduced_a
+      );
+  reduce_{{stage.n}}_b: entity work.reduce_width
+    generic map (
+      SIZE => SPCC/2,
+      INPUT_WIDTH => {{stage.unreduced_width}},
+      OUTPUT_WIDTH => {{stage.width}},
+      LSBS => {{stage.lsbs}},
+      ROUND => {{'true' if stage.round else 'false'}}
+      )
+    port map (
+      i_data => r{{loop.index0}}_data_b,
+      o_data => r{{loop.index0}}_reduced_b
+      );
+  {% else %}
+  r{{loop.index0}}_reduced_a <= r{{loop.index0}}_data_a;
+  r{{loop.index0}}_reduced_b <= r{{loop.index0}}_data_b;
+  {% endif %}
+  {% if stage.radix22 %}
+  -- A radix-2^2 stage does the work of this stage and the next.
+  stage_r22_{{stage.radix22_n}}_inst: entity work.stage_r22_{{stage.radix22_n}}{{suffix}}
     port map (
       clk => clk,
       i_reset => r{{loop.index0}}_reset,
-      i_data_a => r{{loop.index0}}_data_a,
-      i_data_b => r{{loop.index0}}_data_b,
+      i_data_a => r{{loop.index0}}_reduced_a,
+      i_data_b => r{{loop.index0}}_reduced_b,
+      o_reset => r{{loop.index0+2}}_reset,
+      o_data_a => r{{loop.index0+2}}_data_a,
+      o_data_b => r{{loop.index0+2}}_data_b
+   );
+  {% else %}
+    stage_{{stage.n}}_inst: entity work.stage_{{stage.n}}{{suffix}}
+    port map (
+      clk => clk,
+      i_reset => r{{loop.index0}}_reset,
+      i_data_a => r{{loop.index0}}_reduced_a,
+      i_data_b => r{{loop.index0}}_reduced_b,
       o_reset => r{{loop.index0+1}}_reset, 
       o_data_a => r{{loop.index0+1}}_data_a,
       o_data_b => r{{loop.index0+1}}_data_b
    );
+  {% endif %}
+  {% endif %}
   {% endfor %}
+  {% if min_n %}
+  -- An FFT of size SPCC*2^k only uses the first k stages and bypasses the
+  -- rest.  Its samples are widened to the output width so that the output
+  -- is still the FFT divided by the size.
+  u_reset <=
+    {% for stage_count in bypass_stage_counts %}
+    r{{stage_count}}_reset when unsigned(p_log2n) = {{log2_spcc + stage_count}} else
+    {% endfor %}
+    r{{n_stages}}_reset;
+  u_data_a <=
+    {% for stage_count in bypass_stage_counts %}
+    widen_samples(r{{stage_count}}_data_a, {{stages[stage_count].unreduced_width}}, OUTPUT_WIDTH)
+      when unsigned(p_log2n) = {{log2_spcc + stage_count}} else
+    {% endfor %}
+    r{{n_stages}}_data_a;
+  u_data_b <=
+    {% for stage_count in bypass_stage_counts %}
+    widen_samples(r{{stage_count}}_data_b, {{stages[stage_count].unreduced_width}}, OUTPUT_WIDTH)
+      when unsigned(p_log2n) = {{log2_spcc + stage_count}} else
+    {% endfor %}
+    r{{n_stages}}_data_b;
+  {% endif %}
+  {% if natural_order %}
   -- Do the final reordering of the output data.
   final_mem: entity work.final_memory
     generic map (
@@ -118,25 +318,66 @@ begin
       )
     port map (
       clk => clk,
-      i_beforefirst => r{{n_stages}}_reset,
-      i_data_a => r{{n_stages}}_data_a,
-      i_data_b => r{{n_stages}}_data_b,
+      i_beforefirst => {{last}}_reset,
+      i_data_a => {{last}}_data_a,
+      i_data_b => {{last}}_data_b,
+      {% if min_n %}
+      i_log2n => p_log2n,
+      {% endif %}
       o_beforefirst => s_beforefirst,
       o_data => s_data
       );
+  {% else %}
+  -- The output is left in the order the last stage produces it (see
+  -- model.output_order).  Word i holds bins i*SPCC/2 to (i+1)*SPCC/2-1 in
+  -- the lower half and N/2+i*SPCC/2 to N/2+(i+1)*SPCC/2-1 in the upper half.
+  s_beforefirst <= {{last}}_reset;
+  s_data <= {{last}}_data_b & {{last}}_data_a;
+  {% endif %}
   process(clk)
   begin
     if rising_edge(clk) then
       s_first <= s_beforefirst;
     end if;
   end process;
+  {% if n_channels %}
+
+  -- The size of the FFT is fixed so every vector takes the same path and
+  -- the channels wait in a small FIFO until their vectors reach the output.
+  process(clk)
+  begin
+    if rising_edge(clk) then
+      if i_first = '1' then
+        channels(to_integer(channel_write)) <= i_channel;
+        channel_write <= channel_write + 1;
+      end if;
+      if s_beforefirst = '1' then
+        s_channel <= channels(to_integer(channel_read));
+        channel_read <= channel_read + 1;
+      end if;
+      if reset = '1' then
+        channel_write <= (others => '0');
+        channel_read <= (others => '0');
+      end if;
+    end if;
+  end process;
+  {% endif %}
+
+  s_output <= swap_components(s_data, OUTPUT_WIDTH) when INVERSE else
+              s_data;
 
   yes_reg_s_o: if REG_S_O generate
     process(clk)
     begin
       if rising_edge(clk) then
         o_first <= s_first;
-        o_data <= s_data;
+        o_data <= s_output;
+        {% if block_floating_point %}
+        o_exponent <= s_exponent;
+        {% endif %}
+        {% if n_channels %}
+        o_channel <= s_channel;
+        {% endif %}
         if reset = '1' then
           o_first <= '0';
         end if;
@@ -145,7 +386,13 @@ begin
   end generate;
   no_reg_s_o: if not REG_S_O generate
     o_first <= s_first;
-    o_data <= s_data;
+    o_data <= s_output;
+    {% if block_floating_point %}
+    o_exponent <= s_exponent;
+    {% endif %}
+    {% if n_channels %}
+    o_channel <= s_channel;
+    {% endif %}
   end generate;
   
 end architecture;
@@ -0,0 +1,307 @@
+library ieee;
+use ieee.std_logic_1164.all;
+use ieee.numeric_std.all;
+
+use work.htfft_pkg.all;
+use work.htfft{{suffix}}_params.all;
+use work.htfft{{suffix}}_pipeline.all;
+
+-- An AXI4-Stream wrapper around the HTFFT.
+--
+-- Each transfer carries one word of SPCC samples and a vector is N/SPCC
+-- transfers with tlast on the last one.  m_axis_tuser holds the index of
+-- the word in the vector{% if block_floating_point %} with the exponent of the vector above it{% endif %}.
+--
+-- The HTFFT itself can't be stalled.  A vector is only passed to it once
+-- all its words have arrived, and only when there is space reserved in the
+-- output FIFO for it, so no data is dropped when m_axis_tready is low.
+-- The output FIFO has space for every vector that can be in the HTFFT so
+-- without backpressure a transfer can happen every clock cycle.
+entity htfft{{suffix}}_axis is
+ port (
+   clk: in std_logic;
+   reset: in std_logic;
+   s_axis_tvalid: in std_logic;
+   s_axis_tready: out std_logic;
+   s_axis_tdata: in std_logic_vector(SPCC*INPUT_WIDTH-1 downto 0);
+   -- Only checked in simulation.
+   s_axis_tlast: in std_logic := '0';
+   {% if n_channels %}
+   -- The channel of the vector.  It must be the same for every word of
+   -- a vector.
+   s_axis_tid: in std_logic_vector(CHANNEL_WIDTH-1 downto 0) := (others => '0');
+   {% endif %}
+   m_axis_tvalid: out std_logic;
+   m_axis_tready: in std_logic;
+   m_axis_tdata: out std_logic_vector(SPCC*OUTPUT_WIDTH-1 downto 0);
+   m_axis_tlast: out std_logic;
+   {% if n_channels %}
+   m_axis_tid: out std_logic_vector(CHANNEL_WIDTH-1 downto 0);
+   {% endif %}
+   {% if block_floating_point %}
+   m_axis_tuser: out std_logic_vector(EXPONENT_WIDTH+logceil(N/SPCC)-1 downto 0)
+   {% else %}
+   m_axis_tuser: out std_logic_vector(logceil(N/SPCC)-1 downto 0)
+   {% endif %}
+   );
+end entity;
+
+architecture arch of htfft{{suffix}}_axis is
+
+  constant WORDS: positive := N/SPCC;
+  constant INDEX_WIDTH: positive := logceil(WORDS);
+  {% if block_floating_point %}
+  constant USER_WIDTH: positive := EXPONENT_WIDTH + INDEX_WIDTH;
+  {% else %}
+  constant USER_WIDTH: positive := INDEX_WIDTH;
+  {% endif %}
+  {% if n_channels %}
+  constant S_WIDTH: positive := SPCC*INPUT_WIDTH + CHANNEL_WIDTH;
+  constant M_WIDTH: positive := SPCC*OUTPUT_WIDTH + 1 + USER_WIDTH + CHANNEL_WIDTH;
+  {% else %}
+  constant S_WIDTH: positive := SPCC*INPUT_WIDTH;
+  constant M_WIDTH: positive := SPCC*OUTPUT_WIDTH + 1 + USER_WIDTH;
+  {% endif %}
+
+  -- A bound on the clock cycles from starting a vector in the vector buffer
+  -- to popping its last word from the output FIFO.  LATENCY_BOUND is the
+  -- bound for the HTFFT itself.
+  constant AXIS_LATENCY_BOUND: positive := LATENCY_BOUND + WORDS + 8;
+  -- The number of vectors that can be started without being popped.  Only
+  -- one vector starts every WORDS clock cycles so this is enough to not
+  -- stall without backpressure.  logceil rounds down so one is added to get
+  -- a power of two above the count.
+  constant N_CREDITS: positive := 2**(logceil(AXIS_LATENCY_BOUND/WORDS + 2) + 1);
+  constant FIFO_DEPTH: positive := N_CREDITS*WORDS;
+
+  signal in_ready: std_logic;
+  signal in_data: std_logic_vector(S_WIDTH-1 downto 0);
+  signal in_index: unsigned(INDEX_WIDTH-1 downto 0) := (others => '0');
+
+  signal buffer_valid: std_logic;
+  signal buffer_ready: std_logic;
+  signal buffer_data: std_logic_vector(S_WIDTH-1 downto 0);
+  signal enable: std_logic;
+  signal start: std_logic;
+  signal outstanding: unsigned(logceil(N_CREDITS) downto 0) := (others => '0');
+
+  signal c_first: std_logic;
+  signal c_data: std_logic_vector(S_WIDTH-1 downto 0);
+  signal c_o_first: std_logic;
+  signal c_o_data: std_logic_vector(SPCC*OUTPUT_WIDTH-1 downto 0);
+  {% if block_floating_point %}
+  signal c_o_exponent: std_logic_vector(EXPONENT_WIDTH-1 downto 0);
+  {% endif %}
+  {% if n_channels %}
+  signal c_o_channel: std_logic_vector(CHANNEL_WIDTH-1 downto 0);
+  {% endif %}
+  signal c_index: unsigned(INDEX_WIDTH-1 downto 0) := (others => '0');
+  signal c_running: std_logic := '0';
+
+  signal w_valid: std_logic := '0';
+  signal w_ready: std_logic;
+  signal w_index: unsigned(INDEX_WIDTH-1 downto 0);
+  signal w_last: std_logic;
+  signal w_data: std_logic_vector(SPCC*OUTPUT_WIDTH-1 downto 0);
+  {% if block_floating_point %}
+  signal w_exponent: std_logic_vector(EXPONENT_WIDTH-1 downto 0);
+  {% endif %}
+  {% if n_channels %}
+  signal w_channel: std_logic_vector(CHANNEL_WIDTH-1 downto 0);
+  {% endif %}
+  signal w_word: std_logic_vector(M_WIDTH-1 downto 0);
+
+  signal f_valid: std_logic;
+  signal f_ready: std_logic;
+  signal f_word: std_logic_vector(M_WIDTH-1 downto 0);
+  signal f_last: std_logic;
+  signal pop_last: std_logic;
+
+  signal m_word: std_logic_vector(M_WIDTH-1 downto 0);
+
+begin
+
+  {% if n_channels %}
+  in_data <= s_axis_tid & s_axis_tdata;
+  {% else %}
+  in_data <= s_axis_tdata;
+  {% endif %}
+
+  in_skid: entity work.skid_buffer
+    generic map (
+      WIDTH => S_WIDTH
+      )
+    port map (
+      clk => clk,
+      reset => reset,
+      i_valid => s_axis_tvalid,
+      i_ready => in_ready,
+      i_data => in_data,
+      o_valid => buffer_valid,
+      o_ready => buffer_ready,
+      o_data => buffer_data
+      );
+  s_axis_tready <= in_ready;
+
+  process(clk)
+  begin
+    if rising_edge(clk) then
+      if (s_axis_tvalid = '1') and (in_ready = '1') then
+        assert (s_axis_tlast = '1') = (in_index = WORDS-1)
+          report "s_axis_tlast must be on the last word of each vector." severity error;
+        in_index <= in_index + 1;
+      end if;
+      if reset = '1' then
+        in_index <= (others => '0');
+      end if;
+    end if;
+  end process;
+
+  -- Hold the words until there is a complete vector for the HTFFT.
+  vectors: entity work.vector_buffer
+    generic map (
+      WIDTH => S_WIDTH,
+      WORDS => WORDS,
+      MIN_GAP => WORDS
+      )
+    port map (
+      clk => clk,
+      reset => reset,
+      i_valid => buffer_valid,
+      i_ready => buffer_ready,
+      i_data => buffer_data,
+      i_enable => enable,
+      o_start => start,
+      o_first => c_first,
+      o_data => c_data
+      );
+
+  -- A vector can start when there is space for it in the output FIFO.
+  enable <= '1' when outstanding < N_CREDITS else '0';
+  f_last <= f_word(SPCC*OUTPUT_WIDTH);
+  pop_last <= f_valid and f_ready and f_last;
+
+  process(clk)
+  begin
+    if rising_edge(clk) then
+      if (start = '1') and (pop_last = '0') then
+        outstanding <= outstanding + 1;
+      elsif (start = '0') and (pop_last = '1') then
+        outstanding <= outstanding - 1;
+      end if;
+      if reset = '1' then
+        outstanding <= (others => '0');
+      end if;
+    end if;
+  end process;
+
+  the_htfft: entity work.htfft{{suffix}}
+    port map (
+      clk => clk,
+      reset => reset,
+      i_first => c_first,
+      {% if n_channels %}
+      i_channel => c_data(S_WIDTH-1 downto SPCC*INPUT_WIDTH),
+      {% endif %}
+      i_data => c_data(SPCC*INPUT_WIDTH-1 downto 0),
+      o_first => c_o_first,
+      {% if n_channels %}
+      o_channel => c_o_channel,
+      {% endif %}
+      {% if block_floating_point %}
+      o_exponent => c_o_exponent,
+      {% endif %}
+      o_data => c_o_data
+      );
+
+  -- Mark the words of each output vector with their index.
+  process(clk)
+  begin
+    if rising_edge(clk) then
+      w_valid <= '0';
+      if c_o_first = '1' then
+        w_valid <= '1';
+        w_index <= (others => '0');
+        c_index <= to_unsigned(1, INDEX_WIDTH);
+        c_running <= '1';
+      elsif c_running = '1' then
+        w_valid <= '1';
+        w_index <= c_index;
+        c_index <= c_index + 1;
+        if c_index = WORDS-1 then
+          c_running <= '0';
+        end if;
+      end if;
+      w_data <= c_o_data;
+      {% if block_floating_point %}
+      w_exponent <= c_o_exponent;
+      {% endif %}
+      {% if n_channels %}
+      w_channel <= c_o_channel;
+      {% endif %}
+      if reset = '1' then
+        w_valid <= '0';
+        c_running <= '0';
+      end if;
+    end if;
+  end process;
+
+  w_last <= '1' when w_index = WORDS-1 else '0';
+  -- The FIFO holds the channel, tuser, tlast and tdata from MSB to LSB.
+  w_word <=
+    {% if n_channels %}
+    w_channel &
+    {% endif %}
+    {% if block_floating_point %}
+    w_exponent &
+    {% endif %}
+    std_logic_vector(w_index) & w_last & w_data;
+
+  -- There is always space in the FIFO because of the credits.
+  process(clk)
+  begin
+    if rising_edge(clk) then
+      assert (w_valid = '0') or (w_ready = '1')
+        report "The output FIFO overflowed." severity failure;
+    end if;
+  end process;
+
+  output_fifo: entity work.fifo
+    generic map (
+      WIDTH => M_WIDTH,
+      DEPTH => FIFO_DEPTH
+      )
+    port map (
+      clk => clk,
+      reset => reset,
+      i_valid => w_valid,
+      i_ready => w_ready,
+      i_data => w_word,
+      o_valid => f_valid,
+      o_ready => f_ready,
+      o_data => f_word
+      );
+
+  out_skid: entity work.skid_buffer
+    generic map (
+      WIDTH => M_WIDTH
+      )
+    port map (
+      clk => clk,
+      reset => reset,
+      i_valid => f_valid,
+      i_ready => f_ready,
+      i_data => f_word,
+      o_valid => m_axis_tvalid,
+      o_ready => m_axis_tready,
+      o_data => m_word
+      );
+
+  m_axis_tdata <= m_word(SPCC*OUTPUT_WIDTH-1 downto 0);
+  m_axis_tlast <= m_word(SPCC*OUTPUT_WIDTH);
+  m_axis_tuser <= m_word(SPCC*OUTPUT_WIDTH+USER_WIDTH downto SPCC*OUTPUT_WIDTH+1);
+  {% if n_channels %}
+  m_axis_tid <= m_word(M_WIDTH-1 downto M_WIDTH-CHANNEL_WIDTH);
+  {% endif %}
+
+end architecture;
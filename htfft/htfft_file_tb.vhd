@@ -0,0 +1,104 @@
+library ieee;
+use ieee.std_logic_1164.all;
+
+use std.textio.all;
+
+use work.htfft{{suffix}}_params.all;
+
+-- A testbench that streams input words for the HTFFT from a file and
+-- dumps the output words to a file.
+-- Each line of the input file is a word of i_data written as bits, most
+-- significant first.  i_first is asserted on the first word of each vector.
+-- Each line of the output file is o_first, a space and then o_data.
+-- Writing starts from the first o_first.
+entity htfft{{suffix}}_file_tb is
+  generic (
+    INPUT_FILENAME: string;
+    OUTPUT_FILENAME: string;
+    N_VECTORS: positive
+    );
+  port (
+    -- Goes high once N_VECTORS vectors have been written to the output file.
+    done: out std_logic := '0'
+    );
+end entity;
+
+architecture arch of htfft{{suffix}}_file_tb is
+
+  constant N_WORDS: positive := N/SPCC;
+
+  signal clk: std_logic := '0';
+  signal finished: std_logic := '0';
+  signal reset: std_logic := '1';
+  signal i_first: std_logic := '0';
+  signal i_data: std_logic_vector(SPCC*INPUT_WIDTH-1 downto 0) := (others => '0');
+  signal o_first: std_logic;
+  signal o_data: std_logic_vector(SPCC*OUTPUT_WIDTH-1 downto 0);
+
+begin
+
+  -- Stop the clock when we're done so the simulation ends by itself.
+  clk <= not clk after 1 ns when finished = '0' else '0';
+
+  send: process
+    file input_file: text open read_mode is INPUT_FILENAME;
+    variable input_line: line;
+    variable word: bit_vector(SPCC*INPUT_WIDTH-1 downto 0);
+    variable word_index: natural := 0;
+  begin
+    wait until rising_edge(clk);
+    reset <= '0';
+    loop
+      wait until rising_edge(clk);
+      -- Once the file is empty keep sending zeros so the last vectors
+      -- are flushed through.
+      if endfile(input_file) then
+        word := (others => '0');
+      else
+        readline(input_file, input_line);
+        read(input_line, word);
+      end if;
+      i_data <= to_stdlogicvector(word);
+      if word_index = 0 then
+        i_first <= '1';
+      else
+        i_first <= '0';
+      end if;
+      word_index := (word_index + 1) mod N_WORDS;
+    end loop;
+  end process;
+
+  receive: process
+    file output_file: text open write_mode is OUTPUT_FILENAME;
+    variable output_line: line;
+  begin
+    loop
+      wait until rising_edge(clk);
+      exit when o_first = '1';
+    end loop;
+    for word_index in 0 to N_VECTORS*N_WORDS-1 loop
+      if word_index > 0 then
+        wait until rising_edge(clk);
+      end if;
+      write(output_line, to_bit(o_first));
+      write(output_line, string'(" "));
+      write(output_line, to_bitvector(o_data));
+      writeline(output_file, output_line);
+    end loop;
+    file_close(output_file);
+    done <= '1';
+    finished <= '1';
+    wait;
+  end process;
+
+  dut: entity work.htfft{{suffix}}
+    port map (
+      clk => clk,
+      reset => reset,
+      i_first => i_first,
+      i_data => i_data,
+      o_first => o_first,
+      o_data => o_data
+      );
+
+end architecture;
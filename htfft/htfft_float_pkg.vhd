@@ -0,0 +1,251 @@
+library ieee;
+use ieee.std_logic_1164.all;
+use ieee.numeric_std.all;
+
+-- Floating point arithmetic for the floating point butterfly.
+--
+-- The values have a sign bit, then EXPONENT_WIDTH exponent bits, then
+-- FRACTION_WIDTH fraction bits like the IEEE formats but the arithmetic is
+-- simpler (see floats.py which models it):
+--   - A value with an exponent field of 0 is zero.  There are no subnormals.
+--   - There are no infinities or NaNs.  Results that are too large saturate
+--     and results that are too small flush to zero.
+--   - Results are rounded half away from zero.  Addition aligns the smaller
+--     operand with 3 guard bits and no sticky bit.
+-- ieee.float_pkg isn't used since the cores are VHDL-93.
+--
+-- Multiplication and addition are each split into two steps so that they
+-- can be pipelined.  float_mult_product multiplies the mantissas and
+-- float_mult_round rounds the product.  float_add_align aligns and adds the
+-- mantissas and float_add_normalize normalizes and rounds the sum.  The
+-- values between the steps are packed into a std_logic_vector of width
+-- float_product_width or float_sum_width.
+package htfft_float_pkg is
+  function float_negate(a: std_logic_vector) return std_logic_vector;
+  function float_product_width(exponent_width: positive; fraction_width: positive)
+    return positive;
+  function float_sum_width(exponent_width: positive; fraction_width: positive)
+    return positive;
+  function float_mult_product(a: std_logic_vector; b: std_logic_vector;
+                              exponent_width: positive; fraction_width: positive)
+    return std_logic_vector;
+  function float_mult_round(product: std_logic_vector;
+                            exponent_width: positive; fraction_width: positive)
+    return std_logic_vector;
+  function float_add_align(a: std_logic_vector; b: std_logic_vector;
+                           exponent_width: positive; fraction_width: positive)
+    return std_logic_vector;
+  function float_add_normalize(sum: std_logic_vector;
+                               exponent_width: positive; fraction_width: positive)
+    return std_logic_vector;
+  function float_mult(a: std_logic_vector; b: std_logic_vector;
+                      exponent_width: positive; fraction_width: positive)
+    return std_logic_vector;
+  function float_add(a: std_logic_vector; b: std_logic_vector;
+                     exponent_width: positive; fraction_width: positive)
+    return std_logic_vector;
+end package;
+
+package body htfft_float_pkg is
+
+  function float_negate(a: std_logic_vector) return std_logic_vector is
+    variable negated: std_logic_vector(a'length-1 downto 0) := a;
+  begin
+    negated(a'length-1) := not negated(a'length-1);
+    return negated;
+  end function;
+
+  -- Packs a biased exponent and a mantissa in [2^F, 2^(F+1)].
+  function float_pack(sign: std_logic; exponent: integer; mantissa: unsigned;
+                      exponent_width: positive; fraction_width: positive)
+    return std_logic_vector is
+    constant E: positive := exponent_width;
+    constant F: positive := fraction_width;
+    constant MAX_EXPONENT: positive := 2**E-1;
+    variable normalized: unsigned(F+1 downto 0) := mantissa;
+    variable final_exponent: integer := exponent;
+    variable packed: std_logic_vector(E+F downto 0);
+  begin
+    if normalized(F+1) = '1' then
+      normalized := shift_right(normalized, 1);
+      final_exponent := final_exponent + 1;
+    end if;
+    packed(E+F) := sign;
+    if final_exponent <= 0 then
+      packed := (others => '0');
+    elsif final_exponent > MAX_EXPONENT then
+      packed(E+F-1 downto 0) := (others => '1');
+    else
+      packed(E+F-1 downto F) := std_logic_vector(to_unsigned(final_exponent, E));
+      packed(F-1 downto 0) := std_logic_vector(normalized(F-1 downto 0));
+    end if;
+    return packed;
+  end function;
+
+  -- The sign, then the exponent as a signed value of E+2 bits, then the
+  -- product of the mantissas.
+  function float_product_width(exponent_width: positive; fraction_width: positive)
+    return positive is
+  begin
+    return 1 + exponent_width+2 + 2*fraction_width+2;
+  end function;
+
+  -- The sign, then the exponent of the larger operand, then the sum of the
+  -- mantissas with the guard bits.
+  function float_sum_width(exponent_width: positive; fraction_width: positive)
+    return positive is
+  begin
+    return 1 + exponent_width + fraction_width+3+2;
+  end function;
+
+  function float_mult_product(a: std_logic_vector; b: std_logic_vector;
+                              exponent_width: positive; fraction_width: positive)
+    return std_logic_vector is
+    constant E: positive := exponent_width;
+    constant F: positive := fraction_width;
+    constant BIAS: natural := 2**(E-1)-1;
+    constant normalized_a: std_logic_vector(E+F downto 0) := a;
+    constant normalized_b: std_logic_vector(E+F downto 0) := b;
+    constant a_exponent: natural := to_integer(unsigned(normalized_a(E+F-1 downto F)));
+    constant b_exponent: natural := to_integer(unsigned(normalized_b(E+F-1 downto F)));
+    variable product: unsigned(2*F+1 downto 0);
+    variable exponent: integer;
+  begin
+    -- A zero product and exponent are packed as zero when rounded.
+    if a_exponent = 0 or b_exponent = 0 then
+      return std_logic_vector(to_unsigned(0, float_product_width(E, F)));
+    end if;
+    product := unsigned('1' & normalized_a(F-1 downto 0)) * unsigned('1' & normalized_b(F-1 downto 0));
+    exponent := a_exponent + b_exponent - BIAS;
+    return (normalized_a(E+F) xor normalized_b(E+F)) & std_logic_vector(to_signed(exponent, E+2)) &
+      std_logic_vector(product);
+  end function;
+
+  function float_mult_round(product: std_logic_vector;
+                            exponent_width: positive; fraction_width: positive)
+    return std_logic_vector is
+    constant E: positive := exponent_width;
+    constant F: positive := fraction_width;
+    constant normalized_product: std_logic_vector(float_product_width(E, F)-1 downto 0) := product;
+    constant sign: std_logic := normalized_product(E+2+2*F+2);
+    variable exponent: integer := to_integer(signed(normalized_product(E+2+2*F+1 downto 2*F+2)));
+    constant mantissas: unsigned(2*F+1 downto 0) := unsigned(normalized_product(2*F+1 downto 0));
+    variable mantissa: unsigned(F+1 downto 0);
+  begin
+    -- The product is in [2^(2F), 2^(2F+2)) or is zero.
+    if mantissas(2*F+1) = '1' then
+      mantissa := '0' & mantissas(2*F+1 downto F+1);
+      if mantissas(F) = '1' then
+        mantissa := mantissa + 1;
+      end if;
+      exponent := exponent + 1;
+    else
+      mantissa := mantissas(2*F+1 downto F);
+      if mantissas(F-1) = '1' then
+        mantissa := mantissa + 1;
+      end if;
+    end if;
+    return float_pack(sign, exponent, mantissa, E, F);
+  end function;
+
+  function float_mult(a: std_logic_vector; b: std_logic_vector;
+                      exponent_width: positive; fraction_width: positive)
+    return std_logic_vector is
+  begin
+    return float_mult_round(float_mult_product(a, b, exponent_width, fraction_width),
+                            exponent_width, fraction_width);
+  end function;
+
+  function float_add_align(a: std_logic_vector; b: std_logic_vector;
+                           exponent_width: positive; fraction_width: positive)
+    return std_logic_vector is
+    constant E: positive := exponent_width;
+    constant F: positive := fraction_width;
+    constant GUARD_BITS: positive := 3;
+    constant TOP: positive := F+GUARD_BITS;
+    constant normalized_a: std_logic_vector(E+F downto 0) := a;
+    constant normalized_b: std_logic_vector(E+F downto 0) := b;
+    variable big: std_logic_vector(E+F downto 0);
+    variable small: std_logic_vector(E+F downto 0);
+    variable big_exponent: natural;
+    variable small_exponent: natural;
+    variable difference: natural;
+    variable big_mantissa: unsigned(TOP+1 downto 0);
+    variable small_mantissa: unsigned(TOP+1 downto 0);
+    variable total: unsigned(TOP+1 downto 0);
+  begin
+    if unsigned(normalized_a(E+F-1 downto 0)) >= unsigned(normalized_b(E+F-1 downto 0)) then
+      big := normalized_a;
+      small := normalized_b;
+    else
+      big := normalized_b;
+      small := normalized_a;
+    end if;
+    big_exponent := to_integer(unsigned(big(E+F-1 downto F)));
+    small_exponent := to_integer(unsigned(small(E+F-1 downto F)));
+    difference := big_exponent - small_exponent;
+    big_mantissa := unsigned("01" & big(F-1 downto 0) & "000");
+    small_mantissa := unsigned("01" & small(F-1 downto 0) & "000");
+    -- Adding zero gives the other operand, which normalizing a sum of just
+    -- its mantissa does.  A zero sum is packed as zero.
+    if big_exponent = 0 then
+      big_mantissa := (others => '0');
+      small_mantissa := (others => '0');
+    elsif small_exponent = 0 or difference > TOP then
+      small_mantissa := (others => '0');
+    else
+      small_mantissa := shift_right(small_mantissa, difference);
+    end if;
+    if big(E+F) = small(E+F) then
+      total := big_mantissa + small_mantissa;
+    else
+      total := big_mantissa - small_mantissa;
+    end if;
+    return big(E+F downto F) & std_logic_vector(total);
+  end function;
+
+  function float_add_normalize(sum: std_logic_vector;
+                               exponent_width: positive; fraction_width: positive)
+    return std_logic_vector is
+    constant E: positive := exponent_width;
+    constant F: positive := fraction_width;
+    constant GUARD_BITS: positive := 3;
+    constant TOP: positive := F+GUARD_BITS;
+    constant normalized_sum: std_logic_vector(float_sum_width(E, F)-1 downto 0) := sum;
+    constant sign: std_logic := normalized_sum(E+TOP+2);
+    constant big_exponent: natural := to_integer(unsigned(normalized_sum(E+TOP+1 downto TOP+2)));
+    variable total: unsigned(TOP+1 downto 0) := unsigned(normalized_sum(TOP+1 downto 0));
+    variable leading: natural;
+    variable mantissa: unsigned(F+1 downto 0);
+  begin
+    if total = 0 then
+      return std_logic_vector(to_unsigned(0, E+F+1));
+    end if;
+    -- Normalize so that the leading one is at bit TOP.
+    leading := 0;
+    for bit_index in 0 to TOP+1 loop
+      if total(bit_index) = '1' then
+        leading := bit_index;
+      end if;
+    end loop;
+    if leading > TOP then
+      total := shift_right(total, 1);
+    else
+      total := shift_left(total, TOP-leading);
+    end if;
+    mantissa := '0' & total(TOP downto GUARD_BITS);
+    if total(GUARD_BITS-1) = '1' then
+      mantissa := mantissa + 1;
+    end if;
+    return float_pack(sign, big_exponent+leading-TOP, mantissa, E, F);
+  end function;
+
+  function float_add(a: std_logic_vector; b: std_logic_vector;
+                     exponent_width: positive; fraction_width: positive)
+    return std_logic_vector is
+  begin
+    return float_add_normalize(float_add_align(a, b, exponent_width, fraction_width),
+                               exponent_width, fraction_width);
+  end function;
+
+end package body;
@@ -3,7 +3,7 @@ import os
 import jinja2
 from fusesoc.capi2.generator import Generator
 
-from htfft import helper, unrolled_fft_gen, stage_gen
+from htfft import helper, twiddles, unrolled_fft_gen, stage_gen, floats
 
 basedir = os.path.abspath(os.path.dirname(__file__))
 
@@ -27,35 +27,150 @@ def random_pipeline(rnd, spcc):
     return pipelines
 
 
-def make_pipeline_pkg(suffix, pipelines):
+def random_width_schedule(rnd, n, spcc, input_width):
+    """
+    A random width schedule for testing.  Half the time no schedule is used.
+    The width is never reduced below `input_width`.
+    """
+    if rnd.choice([True, False]):
+        return None
+    schedule = []
+    width = input_width + 2*helper.logceil(spcc)
+    for stage_index in range(helper.logceil(n//spcc)):
+        reduction = {
+            'msbs': rnd.choice([0, 0, 1]),
+            'lsbs': rnd.randint(0, 2),
+            'rounding': rnd.choice(['truncate', 'round']),
+            }
+        reduced_width = width - 2*(reduction['msbs'] + reduction['lsbs'])
+        if rnd.choice([True, False]) or reduced_width < input_width:
+            schedule.append(None)
+        else:
+            schedule.append(reduction)
+            width = reduced_width
+        width += 2
+    return schedule
+
+
+def make_pipeline_pkg(suffix, pipelines, float_format=None):
     pipeline_template = os.path.join(basedir, 'htfft_pipeline.vhd')
     with open(pipeline_template, 'r') as f:
         template_text = f.read()
         template = jinja2.Template(template_text)
-    formatted_text = template.render(suffix=suffix, pipelines=pipelines)
+    formatted_text = template.render(suffix=suffix, pipelines=pipelines, float_format=float_format)
     pipeline_filename = 'htfft{}_pipeline.vhd'.format(suffix)
     with open(pipeline_filename, 'w') as g:
         g.write(formatted_text)
     return pipeline_filename
 
 
-def generate_htfft(n, spcc, input_width, suffix, pipelines):
+def generate_htfft(n, spcc, input_width, suffix, pipelines, width_schedule=None, gauss=False,
+                   compress_twiddles=False, twiddles_in_file=False, memory_thresholds=None,
+                   natural_order=True, inverse=False, real=False, block_floating_point=False,
+                   float_format=None, min_n=None, n_channels=None, axi_stream=False,
+                   radix22=False):
+    """
+    With `real` a wrapper htfft{suffix}_real is also generated that
+    transforms two real streams (see htfft_real.vhd).  It takes the output
+    in the order of the last stage so `natural_order` is ignored.
+
+    With `block_floating_point` each vector is normalized by a shared
+    exponent (see block_normalize.vhd) and the width schedule from
+    `helper.get_block_floating_point_schedule` is used.
+
+    With a `float_format` ('float16' or 'float32') each component of a
+    sample is a float (see floats.py) and the butterflies are floating
+    point.  `input_width` must be twice the width of the format and the
+    output has the same width as the input.
+
+    With a `min_n` the size of the FFT is selected at run time by i_log2n,
+    from `min_n` up to `n`.  The smaller sizes bypass the later stages.
+
+    With `n_channels` the HTFFT gets i_channel and o_channel ports so the
+    vectors of several channels can be interleaved, each tagged with its
+    channel.
+
+    With `axi_stream` a wrapper htfft{suffix}_axis is also generated with
+    AXI4-Stream ports that can be stalled (see htfft_axis.vhd).
+
+    With `radix22` pairs of stages are replaced by radix-2^2 stages (see
+    stage_r22.vhd and helper.get_radix22_pairs) which use a quarter fewer
+    multipliers but more memory.
+    """
     assert spcc == pow(2, helper.logceil(spcc))
     assert n == pow(2, helper.logceil(n))
+    if min_n:
+        assert min_n == pow(2, helper.logceil(min_n))
+        assert helper.get_smallest_n(spcc) <= min_n <= n
+        assert width_schedule is None
+        assert not (real or block_floating_point)
+    if n_channels:
+        # The tag FIFO is sized for vectors of N/SPCC words, so the shorter
+        # vectors of a smaller FFT selected with i_log2n could overflow it.
+        assert not (real or min_n)
+    if axi_stream:
+        assert not (real or min_n)
+    if real:
+        assert not inverse
+        assert not block_floating_point
+        natural_order = False
+    if block_floating_point:
+        assert width_schedule is None
+        width_schedule = helper.get_block_floating_point_schedule(n, spcc)
+    if float_format:
+        assert input_width == 2*floats.get_width(float_format)
+        assert width_schedule is None
+        assert not (gauss or compress_twiddles or real or block_floating_point)
+    if radix22:
+        assert spcc >= 4
+        # The radix-2^2 stages store their whole twiddle table.
+        assert not (float_format or min_n or block_floating_point or compress_twiddles)
 
-    output_width = 2*helper.logceil(n) + input_width
+    stage_widths, output_width, log_gain = helper.get_stage_widths(
+        n, spcc, input_width, width_schedule, float_format)
+    schedule = helper.normalize_width_schedule(width_schedule, len(stage_widths))
 
     unrolled_filenames = unrolled_fft_gen.generate_unrolled_fft_inner(
-        spcc, input_width, suffix)
+        spcc, input_width, suffix, gauss, twiddles_in_file, float_format)
 
     n_stages = helper.logceil(n//spcc)
+    radix22_pairs = helper.get_radix22_pairs(n_stages) if radix22 else []
     stage_filenames = []
     stage_ns = []
+    stages = []
+    radix22_extra_latency = 0
     for stage_index in range(n_stages):
         stage_n = spcc * pow(2, stage_index+1)
         stage_ns.append(stage_n)
-        width = input_width + (helper.logceil(stage_n)-1)*2
-        stage_filenames += stage_gen.generate_stage(stage_n, spcc, width, suffix)
+        unreduced_width, width = stage_widths[stage_index]
+        reduction = schedule[stage_index]
+        skip = stage_index-1 in radix22_pairs
+        stages.append({
+            'n': stage_n,
+            'unreduced_width': unreduced_width,
+            'width': width,
+            'reduce': reduction['msbs'] > 0 or reduction['lsbs'] > 0,
+            'lsbs': reduction['lsbs'],
+            'round': reduction['rounding'] == 'round',
+            'radix22': stage_index in radix22_pairs,
+            'radix22_n': 2*stage_n,
+            'skip': skip,
+            })
+        if skip:
+            # The width can't be reduced in the middle of a radix-2^2 stage.
+            assert not stages[-1]['reduce']
+        elif stage_index in radix22_pairs:
+            stage_filenames += stage_gen.generate_radix22_stage(
+                2*stage_n, spcc, width, suffix, gauss=gauss, twiddles_in_file=twiddles_in_file,
+                memory_thresholds=memory_thresholds)
+            # It takes L/2+6 clock cycles more at most, where L is the
+            # number of words in its vector.
+            radix22_extra_latency += 2*stage_n//spcc//2 + 6
+        else:
+            stage_filenames += stage_gen.generate_stage(
+                stage_n, spcc, width, suffix, gauss=gauss, compress_twiddles=compress_twiddles,
+                twiddles_in_file=twiddles_in_file, memory_thresholds=memory_thresholds,
+                float_format=float_format)
 
     params = {
         'n': n,
@@ -64,8 +179,20 @@ def generate_htfft(n, spcc, input_width, suffix, pipelines):
         'output_width': output_width,
         'suffix': suffix,
         'stage_ns': stage_ns,
+        'stages': stages,
         'n_stages': len(stage_ns),
         'pipelines': pipelines,
+        'natural_order': natural_order,
+        'inverse': inverse,
+        'block_floating_point': block_floating_point,
+        'exponent_width': helper.get_exponent_width(input_width),
+        'float_format': float_format,
+        'min_n': min_n,
+        'log2_spcc': helper.logceil(spcc),
+        'bypass_stage_counts': list(range(helper.logceil(min_n//spcc), n_stages)) if min_n else [],
+        'n_channels': n_channels,
+        'channel_width': helper.get_channel_width(n_channels),
+        'radix22_extra_latency': radix22_extra_latency,
         }
 
     template_filename = os.path.join(basedir, 'htfft.vhd')
@@ -86,9 +213,253 @@ def generate_htfft(n, spcc, input_width, suffix, pipelines):
     with open(params_filename, 'w') as g:
         g.write(formatted_text)
 
-    pipeline_filename = make_pipeline_pkg(suffix, pipelines)
+    pipeline_filename = make_pipeline_pkg(suffix, pipelines, float_format)
+
+    real_filenames = []
+    if real:
+        template_filename = os.path.join(basedir, 'htfft_real.vhd')
+        with open(template_filename, 'r') as f:
+            template_text = f.read()
+            template = jinja2.Template(template_text)
+        formatted_text = template.render(**params)
+        real_filename = 'htfft{}_real.vhd'.format(suffix)
+        with open(real_filename, 'w') as g:
+            g.write(formatted_text)
+        real_filenames.append(real_filename)
+
+    axis_filenames = []
+    if axi_stream:
+        template_filename = os.path.join(basedir, 'htfft_axis.vhd')
+        with open(template_filename, 'r') as f:
+            template_text = f.read()
+            template = jinja2.Template(template_text)
+        formatted_text = template.render(**params)
+        axis_filename = 'htfft{}_axis.vhd'.format(suffix)
+        with open(axis_filename, 'w') as g:
+            g.write(formatted_text)
+        axis_filenames.append(axis_filename)
+
+    report_filename = 'htfft{}_widths.txt'.format(suffix)
+    with open(report_filename, 'w') as g:
+        g.write(format_width_report(get_width_report(
+            n, spcc, input_width, width_schedule, gauss, float_format=float_format,
+            radix22=radix22)))
+
+    report_filename = 'htfft{}_memories.txt'.format(suffix)
+    with open(report_filename, 'w') as g:
+        g.write(format_memory_report(get_memory_report(
+            n, spcc, input_width, width_schedule, memory_thresholds, float_format, radix22)))
+
+    if float_format:
+        report_filename = 'htfft{}_float.txt'.format(suffix)
+        with open(report_filename, 'w') as g:
+            g.write(format_float_report(get_float_report(n, spcc, pipelines, float_format)))
+
+    # The params package uses the pipeline package.
+    return ([pipeline_filename, params_filename] + unrolled_filenames + stage_filenames +
+            [top_filename] + real_filenames + axis_filenames)
+
+
+def get_dsps_per_mult(operand_width, dsp_max_width):
+    """
+    A rough estimate of the DSPs needed for a multiplication of two signed
+    values of width `operand_width`.
+    """
+    if operand_width <= dsp_max_width:
+        return 1
+    else:
+        return 2
+
+
+def get_width_report(n, spcc, input_width, width_schedule=None, gauss=False, dsp_max_width=27,
+                     float_format=None, radix22=False):
+    """
+    Returns a row for each level of the FFT (unrolled levels then stages)
+    with the widths and an estimate of the DSPs used by the multipliers.
+    With `gauss` a butterfly uses 3 multiplications with operands that are
+    a bit wider.  With a `float_format` the multiplications are of the
+    mantissas.  With `radix22` the first
+    stage of each radix-2^2 pair has the SPCC*3/4 rotators of the
+    radix-2^2 stage, with twiddles 2 bits wider, and the second has none.
+
+    The default `dsp_max_width` matches the README synthesis results where
+    every multiplication with operands of up to 27 bits used a single DSP.
+    """
+    if gauss:
+        mults_per_butterfly = 3
+        extra_bits = 1
+    else:
+        mults_per_butterfly = 4
+        extra_bits = 0
+
+    def get_mult_bits(width):
+        if float_format:
+            # The unsigned mantissa with its hidden bit, plus a sign bit
+            # for a signed DSP.
+            return floats.get_format(float_format)[1] + 2
+        return width//2 + extra_bits
+
+    growth = 0 if float_format else 2
+    rows = []
+    for level in range(1, helper.logceil(spcc)+1):
+        width = input_width + growth*(level-1)
+        size = pow(2, level)
+        n_trivial = spcc//size * int(sum(twiddles.is_trivial(range(size//2), size)))
+        rows.append({
+            'name': 'unrolled_{}'.format(size),
+            'unreduced_width': width,
+            'width': width,
+            'n_mults': mults_per_butterfly * (spcc//2 - n_trivial),
+            'mult_bits': get_mult_bits(width),
+            })
+    stage_widths, output_width, log_gain = helper.get_stage_widths(
+        n, spcc, input_width, width_schedule, float_format)
+    radix22_pairs = helper.get_radix22_pairs(len(stage_widths)) if radix22 else []
+    for stage_index, (unreduced_width, width) in enumerate(stage_widths):
+        stage_n = spcc * pow(2, stage_index+1)
+        if stage_index in radix22_pairs:
+            n_mults = mults_per_butterfly * 3*spcc//4
+            # The twiddles are 2 bits wider than the samples.
+            mult_bits = get_mult_bits(width+2)
+        elif stage_index-1 in radix22_pairs:
+            n_mults = 0
+            mult_bits = get_mult_bits(width)
+        else:
+            n_trivial = len(twiddles.get_trivial_lanes(stage_n, spcc))
+            n_mults = mults_per_butterfly * (spcc//2 - n_trivial)
+            mult_bits = get_mult_bits(width)
+        rows.append({
+            'name': 'stage_{}'.format(stage_n),
+            'unreduced_width': unreduced_width,
+            'width': width,
+            'n_mults': n_mults,
+            'mult_bits': mult_bits,
+            })
+    for row in rows:
+        row['dsps_per_mult'] = get_dsps_per_mult(row['mult_bits'], dsp_max_width)
+        row['dsps'] = row['n_mults'] * row['dsps_per_mult']
+    return {
+        'rows': rows,
+        'output_width': output_width,
+        'log_gain': log_gain,
+        'dsps': sum(row['dsps'] for row in rows),
+        }
 
-    return [params_filename, pipeline_filename] + unrolled_filenames + stage_filenames + [top_filename]
+
+def format_width_report(report):
+    lines = ['{:<16} {:>10} {:>8} {:>10} {:>6} {:>8} {:>6}'.format(
+        'level', 'unreduced', 'width', 'mult bits', 'mults', 'dsp/mult', 'dsps')]
+    for row in report['rows']:
+        lines.append(
+            '{name:<16} {unreduced_width:>10} {width:>8} {mult_bits:>10} {n_mults:>6} {dsps_per_mult:>8} {dsps:>6}'.format(
+                **row))
+    lines.append('output width: {}'.format(report['output_width']))
+    lines.append('output scaling from removed MSBs: 2^{}'.format(report['log_gain']))
+    lines.append('estimated dsps: {}'.format(report['dsps']))
+    return '\n'.join(lines) + '\n'
+
+
+def get_memory_report(n, spcc, input_width, width_schedule=None, memory_thresholds=None,
+                      float_format=None, radix22=False):
+    """
+    Returns a row for each kind of data memory in each stage with the
+    number of memories, the size of each and the style chosen for them.
+    A radix-2 stage has two memories.  A radix-2^2 stage has six input
+    memories holding a quarter of a vector, two holding half a vector and
+    two output memories holding a vector.
+    """
+    stage_widths, output_width, log_gain = helper.get_stage_widths(
+        n, spcc, input_width, width_schedule, float_format)
+    radix22_pairs = helper.get_radix22_pairs(len(stage_widths)) if radix22 else []
+    rows = []
+
+    def add_row(name, count, depth, memory_width):
+        rows.append({
+            'name': name,
+            'count': count,
+            'depth': depth,
+            'width': memory_width,
+            'bits': count*depth*memory_width,
+            'style': helper.get_memory_style(depth, memory_width, memory_thresholds),
+            })
+
+    for stage_index, (unreduced_width, width) in enumerate(stage_widths):
+        stage_n = spcc * pow(2, stage_index+1)
+        if stage_index-1 in radix22_pairs:
+            continue
+        if stage_index in radix22_pairs:
+            name = 'stage_r22_{}'.format(2*stage_n)
+            n_words = 2*stage_n//spcc
+            add_row(name, 6, n_words//4, spcc*width//2)
+            add_row(name, 2, n_words//2, spcc*width//2)
+            add_row(name, 2, n_words, spcc*(width+4)//2)
+        else:
+            add_row('stage_{}'.format(stage_n), 2, stage_n//spcc//2, spcc*width//2)
+    return {
+        'rows': rows,
+        'thresholds': helper.normalize_memory_thresholds(memory_thresholds),
+        }
+
+
+def format_memory_report(report):
+    lines = ['{:<16} {:>6} {:>8} {:>8} {:>10} {:>12}'.format(
+        'stage', 'count', 'depth', 'width', 'bits', 'style')]
+    for row in report['rows']:
+        lines.append('{name:<16} {count:>6} {depth:>8} {width:>8} {bits:>10} {style:>12}'.format(**row))
+    for key, value in sorted(report['thresholds'].items()):
+        lines.append('{}: {}'.format(key, value))
+    return '\n'.join(lines) + '\n'
+
+
+def get_butterfly_latency(pipelines, float_format=None):
+    """
+    The latency of a butterfly.  This matches BUTTERFLY_LATENCY in
+    htfft_pipeline.vhd.
+    """
+    butterfly = pipelines['butterfly']
+    latency = butterfly['mult_latency'] + sum(
+        int(bool(butterfly[key])) for key in ('reg_i_p', 'reg_q_r', 'reg_r_s', 'reg_s_o'))
+    if float_format:
+        latency += 2*butterfly.get('add_latency', 2)
+    return latency
+
+
+def get_float_report(n, spcc, pipelines, float_format, dsp_max_width=27):
+    """
+    Compares a floating point HTFFT with a fixed point HTFFT of the same
+    input width.  Returns a row for each with the output width, an estimate
+    of the DSPs and the latency through the butterflies.  The rest of the
+    latency is the same for both.
+    """
+    input_width = 2*floats.get_width(float_format)
+    rows = []
+    for name, row_format in (('fixed', None), (float_format, float_format)):
+        width_report = get_width_report(n, spcc, input_width, dsp_max_width=dsp_max_width,
+                                        float_format=row_format)
+        butterfly_latency = get_butterfly_latency(pipelines, row_format)
+        rows.append({
+            'name': name,
+            'output_width': width_report['output_width'],
+            'n_mults': sum(row['n_mults'] for row in width_report['rows']),
+            'dsps': width_report['dsps'],
+            'butterfly_latency': butterfly_latency,
+            'latency': butterfly_latency * helper.logceil(n),
+            })
+    return {
+        'rows': rows,
+        'input_width': input_width,
+        }
+
+
+def format_float_report(report):
+    lines = ['input width: {}'.format(report['input_width'])]
+    lines.append('{:<10} {:>12} {:>6} {:>6} {:>16} {:>17}'.format(
+        'arithmetic', 'output width', 'mults', 'dsps', 'butterfly cycles', 'butterflies total'))
+    for row in report['rows']:
+        lines.append(
+            '{name:<10} {output_width:>12} {n_mults:>6} {dsps:>6} {butterfly_latency:>16} {latency:>17}'.format(
+                **row))
+    return '\n'.join(lines) + '\n'
 
 
 class HTFFTGenerator(Generator):
@@ -100,11 +471,29 @@ class HTFFTGenerator(Generator):
             input_width=self.config['input_width'],
             suffix=self.config['suffix'],
             pipelines=self.config['pipelines'],
+            width_schedule=self.config.get('width_schedule', None),
+            gauss=self.config.get('gauss', False),
+            compress_twiddles=self.config.get('compress_twiddles', False),
+            twiddles_in_file=self.config.get('twiddles_in_file', False),
+            memory_thresholds=self.config.get('memory_thresholds', None),
+            natural_order=self.config.get('natural_order', True),
+            inverse=self.config.get('inverse', False),
+            real=self.config.get('real', False),
+            block_floating_point=self.config.get('block_floating_point', False),
+            float_format=self.config.get('float_format', None),
+            min_n=self.config.get('min_n', None),
+            n_channels=self.config.get('n_channels', None),
+            axi_stream=self.config.get('axi_stream', False),
+            radix22=self.config.get('radix22', False),
             )
-        self.add_files(output_filenames, file_type='vhdlSource')
+        helper.add_generated_files(self, output_filenames)
 
 
-def make_htfft_core(directory, suffix, n, spcc, input_width, pipelines):
+def make_htfft_core(directory, suffix, n, spcc, input_width, pipelines, width_schedule=None, gauss=False,
+                    compress_twiddles=False, twiddles_in_file=False, memory_thresholds=None,
+                    natural_order=True, inverse=False, real=False, block_floating_point=False,
+                    float_format=None, min_n=None, n_channels=None, axi_stream=False,
+                    radix22=False):
     """
     Utility function for generating a core file from python.
     """
@@ -114,6 +503,20 @@ def make_htfft_core(directory, suffix, n, spcc, input_width, pipelines):
         'spcc': spcc,
         'input_width': input_width,
         'pipelines': pipelines,
+        'width_schedule': width_schedule,
+        'gauss': gauss,
+        'compress_twiddles': compress_twiddles,
+        'twiddles_in_file': twiddles_in_file,
+        'memory_thresholds': memory_thresholds,
+        'natural_order': natural_order,
+        'inverse': inverse,
+        'real': real,
+        'block_floating_point': block_floating_point,
+        'float_format': float_format,
+        'min_n': min_n,
+        'n_channels': n_channels,
+        'axi_stream': axi_stream,
+        'radix22': radix22,
         }
     template_filename = os.path.join(basedir, 'htfft.core.j2')
     with open(template_filename, 'r') as f:
@@ -125,6 +528,22 @@ def make_htfft_core(directory, suffix, n, spcc, input_width, pipelines):
         g.write(formatted_text)
 
 
+def make_file_tb(directory, suffix):
+    """
+    Generates a testbench for the HTFFT with the given suffix that reads its
+    input from a file and writes its output to a file.
+    """
+    template_filename = os.path.join(basedir, 'htfft_file_tb.vhd')
+    with open(template_filename, 'r') as f:
+        template_text = f.read()
+        template = jinja2.Template(template_text)
+    formatted_text = template.render(suffix=suffix)
+    tb_filename = os.path.join(directory, 'htfft{}_file_tb.vhd'.format(suffix))
+    with open(tb_filename, 'w') as g:
+        g.write(formatted_text)
+    return tb_filename
+
+
 if __name__ == '__main__':
     g = HTFFTGenerator()
     g.run()
@@ -1,7 +1,36 @@
+use work.htfft_pkg.all;
+use work.htfft{{suffix}}_pipeline.all;
+
 package htfft{{suffix}}_params is
   constant INPUT_WIDTH: positive := {{input_width}};
   constant OUTPUT_WIDTH: positive := {{output_width}};
   constant N: positive := {{n}};
   constant SPCC: positive := {{spcc}};
+  -- The smallest FFT size that can be selected with i_log2n.  It is N when
+  -- the size is fixed.
+  constant MIN_N: positive := {{min_n or n}};
+  -- When false the output isn't reordered (see model.output_order).
+  constant NATURAL_ORDER: boolean := {{'true' if natural_order else 'false'}};
+  -- When true the HTFFT does an inverse FFT.
+  constant INVERSE: boolean := {{'true' if inverse else 'false'}};
+  -- When true each vector is normalized by a shared exponent and the
+  -- stages all have the same width.
+  constant BLOCK_FLOATING_POINT: boolean := {{'true' if block_floating_point else 'false'}};
+  constant EXPONENT_WIDTH: positive := {{exponent_width}};
+  -- The number of channels that can be interleaved, with a tag on each
+  -- vector.  It is 1 when there are no channel tags.
+  constant N_CHANNELS: positive := {{n_channels or 1}};
+  constant CHANNEL_WIDTH: positive := {{channel_width}};
+  -- A radix-2^2 stage takes up to this many clock cycles more than the two
+  -- radix-2 stages it replaces would.  It is 0 without radix-2^2 stages.
+  constant RADIX22_EXTRA_LATENCY: natural := {{radix22_extra_latency}};
+  -- A bound on the clock cycles from i_first to o_first.  The initial
+  -- memory holds a vector, the stages and the final memory take less than
+  -- two vectors between them, and a few cycles are added for the block
+  -- normalization and the output register.  The FIFOs that hold values for
+  -- the vectors in flight are sized from it.
+  constant LATENCY_BOUND: positive :=
+    count_pipeline_length(BARREL_SHIFTER_PIPELINE)*2 + 3 + N/SPCC + BUTTERFLY_LATENCY*logceil(SPCC) +
+    {{n_stages}}*(BUTTERFLY_LATENCY+2) + 2*N/SPCC + RADIX22_EXTRA_LATENCY + 4;
 
 end package;
@@ -4,6 +4,10 @@ package htfft{{suffix}}_pipeline is
 
   constant BARREL_SHIFTER_PIPELINE: string := "{{pipelines.barrel_shifter}}";
   constant MULT_LATENCY: positive := {{pipelines.butterfly.mult_latency}};
+  -- The pipelining of each floating point addition in float_butterfly.
+  constant ADD_LATENCY: natural := {{pipelines.butterfly.add_latency|default(2)}};
+  -- Whether the butterflies are floating point.
+  constant FLOAT_ARITHMETIC: boolean := {{'true' if float_format else 'false'}};
   constant BUTTERFLY_I_P: boolean := {{ 'true' if pipelines.butterfly.reg_i_p else 'false' }};
   constant BUTTERFLY_Q_R: boolean := {{ 'true' if pipelines.butterfly.reg_q_r else 'false' }};
   constant BUTTERFLY_R_S: boolean := {{ 'true' if pipelines.butterfly.reg_r_s else 'false' }};
@@ -16,6 +20,7 @@ package htfft{{suffix}}_pipeline is
       boolean_to_int(BUTTERFLY_I_P) + 
       boolean_to_int(BUTTERFLY_Q_R) + 
       boolean_to_int(BUTTERFLY_R_S) + 
-      boolean_to_int(BUTTERFLY_S_O);
+      boolean_to_int(BUTTERFLY_S_O) +
+      boolean_to_int(FLOAT_ARITHMETIC)*2*ADD_LATENCY;
 
 end package;
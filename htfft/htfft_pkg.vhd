@@ -1,7 +1,18 @@
+library ieee;
+use ieee.std_logic_1164.all;
+use ieee.numeric_std.all;
+
 package htfft_pkg is
   function logceil(value: natural) return integer;
   function count_pipeline_length(pipeline: string) return natural;
   function boolean_to_int(value: boolean) return integer;
+  function reduce_width(value: signed; output_width: positive; lsbs: natural; round: boolean)
+    return signed;
+  function twiddle_slv_width(twiddle_width: positive; gauss: boolean) return positive;
+  function swap_components(data: std_logic_vector; width: positive) return std_logic_vector;
+  function log2n_width(n: positive) return positive;
+  function widen_samples(data: std_logic_vector; input_width: positive; output_width: positive)
+    return std_logic_vector;
 end package;
 
 package body htfft_pkg is
@@ -37,4 +48,95 @@ package body htfft_pkg is
     end if;
   end function;
 
+  -- Removes `lsbs` bits from the bottom of a signed value (rounding half up
+  -- if `round` is true, otherwise truncating) and then saturates the
+  -- result into `output_width` bits.
+  -- When MSBs are removed the result saturates at +-2^(output_width-2) so
+  -- that the magnitude of a complex sample stays below the range, which is
+  -- the headroom the next butterfly needs.
+  function reduce_width(value: signed; output_width: positive; lsbs: natural; round: boolean)
+    return signed is
+    constant normalized: signed(value'length-1 downto 0) := value;
+    constant REMOVES_MSBS: boolean := value'length - lsbs > output_width;
+    -- One extra bit so that the rounding can't overflow.
+    variable extended: signed(value'length downto 0);
+    variable shifted: signed(value'length-lsbs downto 0);
+    variable max_value: signed(output_width-1 downto 0);
+    variable min_value: signed(output_width-1 downto 0);
+  begin
+    if REMOVES_MSBS then
+      max_value := shift_left(to_signed(1, output_width), output_width-2);
+      min_value := -max_value;
+    else
+      max_value := (others => '1');
+      max_value(output_width-1) := '0';
+      min_value := (others => '0');
+      min_value(output_width-1) := '1';
+    end if;
+    extended := resize(normalized, value'length+1);
+    if round and (lsbs > 0) then
+      extended := extended + shift_left(to_signed(1, value'length+1), lsbs-1);
+    end if;
+    shifted := extended(value'length downto lsbs);
+    if shifted > resize(max_value, shifted'length) then
+      return max_value;
+    elsif shifted < resize(min_value, shifted'length) then
+      return min_value;
+    else
+      return resize(shifted, output_width);
+    end if;
+  end function;
+
+  -- The width of a twiddle factor in the twiddle constants.  With `gauss`
+  -- they hold c, s-c and c+s for a twiddle c+js, each with one more bit
+  -- than a component (see butterfly.vhd).
+  function twiddle_slv_width(twiddle_width: positive; gauss: boolean) return positive is
+  begin
+    if gauss then
+      return 3*(twiddle_width/2+1);
+    else
+      return twiddle_width;
+    end if;
+  end function;
+
+  -- Swaps the real and imaginary parts of each of the complex samples, of
+  -- bit-width `width`, in `data`.  Swapping the parts of the input and the
+  -- output of an FFT gives an inverse FFT.
+  function swap_components(data: std_logic_vector; width: positive) return std_logic_vector is
+    constant normalized: std_logic_vector(data'length-1 downto 0) := data;
+    variable swapped: std_logic_vector(data'length-1 downto 0);
+  begin
+    for index in 0 to data'length/width-1 loop
+      swapped((index+1)*width-1 downto index*width+width/2) :=
+        normalized(index*width+width/2-1 downto index*width);
+      swapped(index*width+width/2-1 downto index*width) :=
+        normalized((index+1)*width-1 downto index*width+width/2);
+    end loop;
+    return swapped;
+  end function;
+
+  -- The width of an input giving log2 of a FFT size up to `n`.
+  function log2n_width(n: positive) return positive is
+  begin
+    return logceil(logceil(n))+1;
+  end function;
+
+  -- Widens each of the complex samples in `data` from `input_width` to
+  -- `output_width` by adding zeros below both components.
+  function widen_samples(data: std_logic_vector; input_width: positive; output_width: positive)
+    return std_logic_vector is
+    constant normalized: std_logic_vector(data'length-1 downto 0) := data;
+    constant SHIFT: natural := (output_width-input_width)/2;
+    variable widened: std_logic_vector(data'length/input_width*output_width-1 downto 0);
+  begin
+    widened := (others => '0');
+    for index in 0 to data'length/input_width-1 loop
+      widened((index+1)*output_width-1 downto index*output_width+output_width/2+SHIFT) :=
+        normalized((index+1)*input_width-1 downto index*input_width+input_width/2);
+      widened(index*output_width+output_width/2-1 downto index*output_width+SHIFT) :=
+        normalized(index*input_width+input_width/2-1 downto index*input_width);
+    end loop;
+    return widened;
+  end function;
+
 end package body;
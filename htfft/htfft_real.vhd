@@ -0,0 +1,72 @@
+library ieee;
+use ieee.std_logic_1164.all;
+
+use work.htfft_pkg.all;
+use work.htfft{{suffix}}_params.all;
+
+-- Transforms two real input streams x and y with one complex HTFFT by
+-- transforming z = x + jy and then separating the results with real_split.
+-- The HTFFT must be generated without natural_order since real_split takes
+-- the output in the order of the last stage.
+--
+-- Each real sample is INPUT_WIDTH/2 bits and sample 0 is in the LSBs.
+-- The output has SPCC/2 bins of X and Y each clock cycle for bins 0 to N/2-1
+-- with bin N/2 in the imaginary part of bin 0 (see model.real_split).  The
+-- outputs have two more bits than OUTPUT_WIDTH.
+entity htfft{{suffix}}_real is
+ port (
+   clk: in std_logic;
+   reset: in std_logic;
+   -- Indicates this is the first clock cycle of data for this FFT.
+   i_first: in std_logic;
+   i_data_x: in std_logic_vector(SPCC*INPUT_WIDTH/2-1 downto 0);
+   i_data_y: in std_logic_vector(SPCC*INPUT_WIDTH/2-1 downto 0);
+   o_first: out std_logic;
+   o_data_x: out std_logic_vector((OUTPUT_WIDTH+2)*SPCC/2-1 downto 0);
+   o_data_y: out std_logic_vector((OUTPUT_WIDTH+2)*SPCC/2-1 downto 0)
+   );
+end entity;
+
+architecture arch of htfft{{suffix}}_real is
+
+  signal z_data: std_logic_vector(SPCC*INPUT_WIDTH-1 downto 0);
+  signal s_first: std_logic;
+  signal s_data: std_logic_vector(SPCC*OUTPUT_WIDTH-1 downto 0);
+
+begin
+
+  assert not NATURAL_ORDER severity failure;
+  assert not INVERSE severity failure;
+
+  loop_pack: for index in 0 to SPCC-1 generate
+    z_data((index+1)*INPUT_WIDTH-1 downto index*INPUT_WIDTH) <=
+      i_data_x((index+1)*INPUT_WIDTH/2-1 downto index*INPUT_WIDTH/2) &
+      i_data_y((index+1)*INPUT_WIDTH/2-1 downto index*INPUT_WIDTH/2);
+  end generate;
+
+  the_htfft: entity work.htfft{{suffix}}
+    port map (
+      clk => clk,
+      reset => reset,
+      i_first => i_first,
+      i_data => z_data,
+      o_first => s_first,
+      o_data => s_data
+      );
+
+  split: entity work.real_split
+    generic map (
+      WIDTH => OUTPUT_WIDTH,
+      SPCC => SPCC,
+      N => N
+      )
+    port map (
+      clk => clk,
+      i_first => s_first,
+      i_data => s_data,
+      o_first => o_first,
+      o_data_x => o_data_x,
+      o_data_y => o_data_y
+      );
+
+end architecture;
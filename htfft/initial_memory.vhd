@@ -20,6 +20,11 @@ entity initial_memory is
     reset: in std_logic;
     i_beforefirst: in std_logic;
     i_data: in std_logic_vector(WIDTH*SPCC-1 downto 0);
+    -- log2 of the size of the FFT which can be less than N.  The smaller
+    -- sizes use the lower addresses of the memories.  It must only change
+    -- when there are no vectors in the memory.
+    i_log2n: in std_logic_vector(log2n_width(N)-1 downto 0) :=
+      std_logic_vector(to_unsigned(logceil(N), log2n_width(N)));
     o_beforefirst: out std_logic;
     o_data: out std_logic_vector(WIDTH*SPCC-1 downto 0)
     );
@@ -27,9 +32,80 @@ entity initial_memory is
 end entity;
 
 architecture arch of initial_memory is
-  constant LATENCY: positive := count_pipeline_length(BARREL_SHIFTER_PIPELINE)*2+1+N/SPCC;
+  constant BASE_LATENCY: positive := count_pipeline_length(BARREL_SHIFTER_PIPELINE)*2+1;
+  constant LATENCY: positive := BASE_LATENCY+N/SPCC;
+  constant LOG2N: natural := logceil(N);
+  constant LOG2_SPCC: natural := logceil(SPCC);
+  -- The smallest size for which the barrel shifting works.
+  constant MIN_LOG2N: natural := 2*LOG2_SPCC;
 
-  signal i_beforefirst_slv: std_logic_vector(0 downto 0); 
+  subtype t_longaddress is unsigned(logceil(N)-1 downto 0);
+
+  function get_log2n(log2n: std_logic_vector) return natural is
+  begin
+    for candidate in MIN_LOG2N to LOG2N-1 loop
+      if unsigned(log2n) = candidate then
+        return candidate;
+      end if;
+    end loop;
+    return LOG2N;
+  end function;
+
+  function get_last_address(log2n: natural) return unsigned is
+    variable last_address: unsigned(logceil(N/SPCC)-1 downto 0) := (others => '1');
+  begin
+    for candidate in MIN_LOG2N to LOG2N loop
+      if log2n = candidate then
+        last_address := to_unsigned(2**(candidate-LOG2_SPCC)-1, logceil(N/SPCC));
+      end if;
+    end loop;
+    return last_address;
+  end function;
+
+  -- Reverses the bottom log2n bits of a long address.
+  function reverse_address(address: t_longaddress; log2n: natural) return t_longaddress is
+    variable reversed: t_longaddress := (others => '0');
+  begin
+    for candidate in MIN_LOG2N to LOG2N loop
+      if log2n = candidate then
+        for bit_index in 0 to candidate-1 loop
+          reversed(bit_index) := address(candidate-1-bit_index);
+        end loop;
+      end if;
+    end loop;
+    return reversed;
+  end function;
+
+  -- The top bits of the used addresses reversed.
+  function get_shift_rev(address: unsigned; log2n: natural) return unsigned is
+    constant normalized: unsigned(address'length-1 downto 0) := address;
+    variable shift_rev: unsigned(LOG2_SPCC-1 downto 0) := (others => '0');
+  begin
+    for candidate in MIN_LOG2N to LOG2N loop
+      if log2n = candidate then
+        for bit_index in 0 to LOG2_SPCC-1 loop
+          shift_rev(bit_index) := normalized(candidate-LOG2_SPCC-1-bit_index);
+        end loop;
+      end if;
+    end loop;
+    return shift_rev;
+  end function;
+
+  function get_latency(log2n: natural) return natural is
+    variable latency: natural := LATENCY;
+  begin
+    for candidate in MIN_LOG2N to LOG2N loop
+      if log2n = candidate then
+        latency := BASE_LATENCY+2**(candidate-LOG2_SPCC);
+      end if;
+    end loop;
+    return latency;
+  end function;
+
+  signal log2n: natural range MIN_LOG2N to LOG2N;
+  signal last_address: unsigned(logceil(N/SPCC)-1 downto 0);
+
+  signal i_beforefirsts: std_logic_vector(LATENCY downto 0);
   signal i_addressreversed: std_logic;
   signal i_address: unsigned(logceil(N/SPCC)-1 downto 0);
   constant ADDRESS_WIDTH: positive := logceil(N/SPCC);
@@ -37,7 +113,6 @@ architecture arch of initial_memory is
   signal i_shift: unsigned(logceil(SPCC)-1 downto 0);
   signal i_shift_rev: unsigned(logceil(SPCC)-1 downto 0);
   signal i_shift_slv: std_logic_vector(logceil(SPCC)-1 downto 0);
-  subtype t_longaddress is unsigned(logceil(N)-1 downto 0);
   type array_of_longaddress is array(natural range <>) of t_longaddress;
   signal i_longaddresses: array_of_longaddress(SPCC-1 downto 0);
   signal i_reversedlongaddresses: array_of_longaddress(SPCC-1 downto 0);
@@ -63,17 +138,15 @@ architecture arch of initial_memory is
   constant BARREL_SHIFTER_PIPELINE_LENGTH: natural := count_pipeline_length(
     BARREL_SHIFTER_PIPELINE);
 
-  signal o_beforefirst_slv: std_logic_vector(0 downto 0); 
-
 begin
 
+  log2n <= get_log2n(i_log2n);
+  last_address <= get_last_address(log2n);
+
   loop_samples: for sample_index in 0 to SPCC-1 generate
     i_longaddresses(sample_index)(logceil(N)-1 downto logceil(SPCC)) <= i_address;
     i_longaddresses(sample_index)(logceil(SPCC)-1 downto 0) <= to_unsigned(sample_index, logceil(SPCC));
-    loop_bits: for bit_index in 0 to logceil(N)-1 generate
-      i_reversedlongaddresses(sample_index)(bit_index) <=
-        i_longaddresses(sample_index)(logceil(N)-1-bit_index);
-    end generate;
+    i_reversedlongaddresses(sample_index) <= reverse_address(i_longaddresses(sample_index), log2n);
     i_inmemaddresses(sample_index) <= i_usedaddresses(sample_index)(logceil(N)-1 downto logceil(SPCC));
     i_dataandaddresses(sample_index*(WIDTH+ADDRESS_WIDTH)+WIDTH-1 downto
                        sample_index*(WIDTH+ADDRESS_WIDTH)) <=
@@ -99,7 +172,7 @@ begin
   process(clk)
   begin
     if rising_edge(clk) then
-      if i_address = N/SPCC-1 then
+      if i_address = last_address then
         i_address <= (others => '0');
         i_addressreversed <= not i_addressreversed;
       else
@@ -115,9 +188,7 @@ begin
     end if;
   end process;
 
-  upper_bits: for bit_index in 0 to logceil(SPCC)-1 generate
-    i_shift_rev(bit_index) <= i_address(logceil(N/SPCC)-1-bit_index);
-  end generate;
+  i_shift_rev <= get_shift_rev(i_address, log2n);
   i_shift <= (others => '0') when i_shift_rev = 0 else
              SPCC-i_shift_rev;
 
@@ -189,17 +260,15 @@ begin
       o_data => o_data
       );
 
-  i_beforefirst_slv(0) <= i_beforefirst;
-  shift_register: entity work.shift_register
-    generic map (
-      WIDTH => 1,
-      LENGTH => LATENCY
-      )
-    port map (
-      clk => clk,
-      i_data => i_beforefirst_slv,
-      o_data => o_beforefirst_slv
-      );
-  o_beforefirst <= o_beforefirst_slv(0);
+  -- The latency depends on the size so o_beforefirst is tapped from a
+  -- shift register long enough for the largest size.
+  i_beforefirsts(0) <= i_beforefirst;
+  process(clk)
+  begin
+    if rising_edge(clk) then
+      i_beforefirsts(LATENCY downto 1) <= i_beforefirsts(LATENCY-1 downto 0);
+    end if;
+  end process;
+  o_beforefirst <= i_beforefirsts(get_latency(log2n));
       
 end architecture;
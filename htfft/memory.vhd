@@ -8,7 +8,10 @@ entity memory is
   generic (
     WIDTH: positive;
     DEPTH: positive;
-    ADDRESS_CLASH: string
+    ADDRESS_CLASH: string;
+    -- The vivado ram_style: "auto", "registers", "distributed", "block"
+    -- or "ultra".
+    STYLE: string := "auto"
     );
   port (
     clk: in std_logic;
@@ -25,9 +28,13 @@ architecture arch of memory is
   subtype t_data is std_logic_vector(WIDTH-1 downto 0);
   type array_of_data is array(natural range <>) of t_data;
   signal memory_contents: array_of_data(DEPTH-1 downto 0);
+  attribute ram_style: string;
+  attribute ram_style of memory_contents: signal is STYLE;
 begin
 
   assert (ADDRESS_CLASH = "UNDEFINED") or (ADDRESS_CLASH = "OLD") or (ADDRESS_CLASH = "NEW") severity failure;
+  assert (STYLE = "auto") or (STYLE = "registers") or (STYLE = "distributed") or
+    (STYLE = "block") or (STYLE = "ultra") severity failure;
 
   process(clk)
   begin
@@ -0,0 +1,485 @@
+"""
+A bit-accurate numpy model of the fixed-point arithmetic in the HTFFT.
+
+Complex integer data is represented as a (real, imag) tuple of int64 arrays
+holding the signed value of each component.  The last axis of the arrays
+is the position within a vector and any leading axes are vectors.
+"""
+import numpy
+
+from htfft import helper, conversions, twiddles, floats
+
+
+def wrap(values, width):
+    """
+    Wraps signed integers into `width` bits in the same way that
+    resizing or adding `signed` values does in the VHDL.
+    """
+    offset = pow(2, width-1)
+    return ((values + offset) & (pow(2, width)-1)) - offset
+
+
+def complex_to_ints(values, width):
+    """
+    Maps complex numbers (with mag <= 1) to the signed components that
+    `conversions.complex_to_slv` would produce.
+    """
+    values = numpy.asarray(values, dtype=complex)
+    real = wrap(conversions.signed_array_to_slv(values.real, width//2), width//2)
+    imag = wrap(conversions.signed_array_to_slv(values.imag, width//2), width//2)
+    return real, imag
+
+
+def ints_to_complex(data, width):
+    """
+    Maps signed components with a complex bit-width of `width` back to
+    complex numbers.
+    """
+    real, imag = data
+    max_mag = pow(2, width//2-2)
+    return (real + (0+1j) * imag) / max_mag
+
+
+def ints_from_slv(slvs, width, size):
+    """
+    Unpacks a list of integers, each containing `size` complex samples with
+    bit-width `width`, into signed components.
+    """
+    components = conversions.uint_array_from_slv(slvs, width//2, 2*size).reshape(len(slvs), size, 2)
+    return wrap(components[..., 1], width//2), wrap(components[..., 0], width//2)
+
+
+def complex_to_floats(values, float_format):
+    """
+    Maps complex numbers to the bits of their components quantized to a
+    float format (see floats.py).
+    """
+    values = numpy.asarray(values, dtype=complex)
+    return floats.from_floats(values.real, float_format), floats.from_floats(values.imag, float_format)
+
+
+def floats_to_complex(data, float_format):
+    real, imag = data
+    return floats.to_floats(real, float_format) + (0+1j) * floats.to_floats(imag, float_format)
+
+
+def floats_from_slv(slvs, float_format, size):
+    """
+    Unpacks a list of integers, each containing `size` complex samples made
+    of two floats, into the bits of the components.
+    """
+    width = floats.get_width(float_format)
+    components = conversions.uint_array_from_slv(slvs, width, 2*size).reshape(len(slvs), size, 2)
+    return components[..., 1], components[..., 0]
+
+
+def get_twiddles(size, width):
+    """
+    The quantized twiddle factors that the generators put in the twiddle
+    constants for a butterfly combining two FFTs of size `size`/2.
+    """
+    return twiddles.get_twiddle_ints(size, width)
+
+
+def trim(expanded, width, twiddle_width):
+    """
+    Matches the `trim` function in butterfly.vhd which truncates the
+    product of a sample and a twiddle factor back to the sample width.
+    """
+    return wrap(expanded >> (twiddle_width//2-2), width//2)
+
+
+def multiply(b, t, width, twiddle_width, gauss=False):
+    """
+    Models the product of a sample and a twiddle factor in the butterfly
+    entity.  The product has the bit-width `width` of the sample.
+    With `gauss` it is only truncated once.
+    """
+    b_real, b_imag = b
+    t_real, t_imag = t
+    assert width//2 + twiddle_width//2 < 64
+    if gauss:
+        bt_real = trim(b_real * t_real - b_imag * t_imag, width, twiddle_width)
+        bt_imag = trim(b_real * t_imag + b_imag * t_real, width, twiddle_width)
+    else:
+        bt_real_real = trim(b_real * t_real, width, twiddle_width)
+        bt_real_imag = trim(b_real * t_imag, width, twiddle_width)
+        bt_imag_real = trim(b_imag * t_real, width, twiddle_width)
+        bt_imag_imag = trim(b_imag * t_imag, width, twiddle_width)
+        bt_real = wrap(bt_real_real - bt_imag_imag, width//2)
+        bt_imag = wrap(bt_real_imag + bt_imag_real, width//2)
+    return bt_real, bt_imag
+
+
+def butterfly(a, b, t, width, twiddle_width, gauss=False):
+    """
+    Models the butterfly entity.
+    Returns the (c, d) outputs which have a bit-width of `width` + 2.
+    With `gauss` the product of `b` and `t` is only truncated once.
+    """
+    a_real, a_imag = a
+    bt_real, bt_imag = multiply(b, t, width, twiddle_width, gauss)
+    c = (a_real + bt_real, a_imag + bt_imag)
+    d = (a_real - bt_real, a_imag - bt_imag)
+    return c, d
+
+
+def combine(data, size, width, gauss=False):
+    """
+    Combines consecutive pairs of FFTs of length `size`/2 into FFTs of length `size`.
+    This is the operation performed by one level of the unrolled FFT and by
+    a stage.  The data must have bit-width `width` and the returned data will
+    have bit-width `width` + 2.
+    """
+    real, imag = data
+    shape = real.shape
+    split_shape = shape[:-1] + (shape[-1]//size, 2, size//2)
+    real = real.reshape(split_shape)
+    imag = imag.reshape(split_shape)
+    c, d = butterfly(
+        a=(real[..., 0, :], imag[..., 0, :]),
+        b=(real[..., 1, :], imag[..., 1, :]),
+        t=get_twiddles(size, width),
+        width=width,
+        twiddle_width=width,
+        gauss=gauss,
+        )
+    real = numpy.stack([c[0], d[0]], axis=-2).reshape(shape)
+    imag = numpy.stack([c[1], d[1]], axis=-2).reshape(shape)
+    return real, imag
+
+
+def combine_radix22(data, size, width, gauss=False):
+    """
+    Models stage_r22 which does the work of combining FFTs of length
+    `size`/4 into FFTs of length `size`/2 and then `size` in one go.
+    The three rotations use twiddles with bit-width `width` + 2 and the two
+    levels of butterflies after them only use trivial twiddles.  The data
+    must have bit-width `width` and the returned data will have bit-width
+    `width` + 4.
+    """
+    real, imag = data
+    shape = real.shape
+    split_shape = shape[:-1] + (shape[-1]//size, 4, size//4)
+    real = real.reshape(split_shape)
+    imag = imag.reshape(split_shape)
+    quarters = [(real[..., quarter, :], imag[..., quarter, :]) for quarter in range(4)]
+    rotations = twiddles.get_radix22_twiddle_ints(size, width+2)
+    # P1 is rotated by W^2k, P2 by W^k and P3 by W^3k.
+    b = multiply(quarters[1], rotations[2], width, width+2, gauss)
+    c = multiply(quarters[2], rotations[1], width, width+2, gauss)
+    d = multiply(quarters[3], rotations[3], width, width+2, gauss)
+    a = quarters[0]
+    e0 = (a[0] + b[0], a[1] + b[1])
+    e1 = (a[0] - b[0], a[1] - b[1])
+    o0 = (c[0] + d[0], c[1] + d[1])
+    o1 = (c[0] - d[0], c[1] - d[1])
+    outputs = [
+        (e0[0] + o0[0], e0[1] + o0[1]),
+        # E1 - jO1
+        (e1[0] + o1[1], e1[1] - o1[0]),
+        (e0[0] - o0[0], e0[1] - o0[1]),
+        # E1 + jO1
+        (e1[0] - o1[1], e1[1] + o1[0]),
+        ]
+    real = numpy.stack([output[0] for output in outputs], axis=-2).reshape(shape)
+    imag = numpy.stack([output[1] for output in outputs], axis=-2).reshape(shape)
+    return real, imag
+
+
+def float_butterfly(a, b, t, float_format):
+    """
+    Models the float_butterfly entity.  The components are the bits of
+    floats and the outputs have the same format as the inputs.
+    """
+    a_real, a_imag = a
+    b_real, b_imag = b
+    t_real, t_imag = t
+    bt_real = floats.add(floats.mult(b_real, t_real, float_format),
+                         floats.negate(floats.mult(b_imag, t_imag, float_format), float_format),
+                         float_format)
+    bt_imag = floats.add(floats.mult(b_real, t_imag, float_format),
+                         floats.mult(b_imag, t_real, float_format), float_format)
+    c = (floats.add(a_real, bt_real, float_format), floats.add(a_imag, bt_imag, float_format))
+    d = (floats.add(a_real, floats.negate(bt_real, float_format), float_format),
+         floats.add(a_imag, floats.negate(bt_imag, float_format), float_format))
+    return c, d
+
+
+def float_combine(data, size, float_format):
+    """
+    The same as `combine` for floating point data using float_butterfly.
+    """
+    real, imag = data
+    shape = real.shape
+    split_shape = shape[:-1] + (shape[-1]//size, 2, size//2)
+    real = real.reshape(split_shape)
+    imag = imag.reshape(split_shape)
+    c, d = float_butterfly(
+        a=(real[..., 0, :], imag[..., 0, :]),
+        b=(real[..., 1, :], imag[..., 1, :]),
+        t=twiddles.get_float_twiddle_ints(size, float_format),
+        float_format=float_format,
+        )
+    real = numpy.stack([c[0], d[0]], axis=-2).reshape(shape)
+    imag = numpy.stack([c[1], d[1]], axis=-2).reshape(shape)
+    return real, imag
+
+
+def reduce(data, width, msbs, lsbs, rounding='truncate'):
+    """
+    Models the reduce_width entity which removes `lsbs` bits from the bottom
+    of each component (truncating or rounding half up) and then saturates
+    away `msbs` bits from the top.  The data has bit-width `width` and the
+    returned data has bit-width `width` - 2*(`msbs`+`lsbs`).
+
+    When MSBs are removed the components saturate at half the range so that
+    the magnitude of a sample stays below the range, which is the headroom
+    the next butterfly needs.
+    """
+    output_component_width = width//2 - msbs - lsbs
+    if msbs > 0:
+        max_value = pow(2, output_component_width-2)
+        min_value = -pow(2, output_component_width-2)
+    else:
+        max_value = pow(2, output_component_width-1) - 1
+        min_value = -pow(2, output_component_width-1)
+    reduced = []
+    for component in data:
+        if rounding == 'round' and lsbs > 0:
+            component = component + pow(2, lsbs-1)
+        else:
+            assert rounding in ('truncate', 'round')
+        reduced.append(numpy.clip(component >> lsbs, min_value, max_value))
+    return tuple(reduced)
+
+
+def bit_reverse(data):
+    """
+    Reorders the positions within each vector by bit-reversing their indices.
+    This matches both `comb_reordering` and `initial_memory`.
+    """
+    real, imag = data
+    n = real.shape[-1]
+    indices = [helper.reverse_bits(index, helper.logceil(n)) for index in range(n)]
+    return real[..., indices], imag[..., indices]
+
+
+def unrolled_fft_inner(data, size, input_width, gauss=False):
+    """
+    Models unrolled_fft_inner which expects its input in bit-reversed order.
+    Consecutive groups of `size` positions are processed independently.
+    The output has a bit-width of `input_width` + 2*logceil(size).
+    """
+    width = input_width
+    for level in range(1, helper.logceil(size)+1):
+        data = combine(data, pow(2, level), width, gauss)
+        width += 2
+    return data
+
+
+def stage(data, n, width, gauss=False):
+    """
+    Models a stage of size `n` acting on vectors of length `n`.
+    """
+    assert data[0].shape[-1] == n
+    return combine(data, n, width, gauss)
+
+
+def unrolled_fft(data, input_width, gauss=False):
+    size = data[0].shape[-1]
+    return unrolled_fft_inner(bit_reverse(data), size, input_width, gauss)
+
+
+def output_order(n, spcc):
+    """
+    The order of the output when the HTFFT is generated without
+    `natural_order`.  Position `p` of the output vector holds the FFT bin
+    `output_order(n, spcc)[p]`.
+
+    Word `i` holds bins i*spcc/2 to (i+1)*spcc/2-1 in its lower half and
+    n/2 + i*spcc/2 to n/2 + (i+1)*spcc/2-1 in its upper half.  This is the
+    order the last stage produces them in.  The bin is the position with
+    bit logceil(spcc)-1 moved to the top.
+    """
+    positions = numpy.arange(n)
+    word_index = positions // spcc
+    upper = (positions // (spcc//2)) % 2
+    offset = positions % (spcc//2)
+    return upper*(n//2) + word_index*(spcc//2) + offset
+
+
+def htfft(data, n, spcc, input_width, width_schedule=None, gauss=False, natural_order=True,
+          inverse=False, float_format=None, radix22=False):
+    """
+    Models the output of the HTFFT for input data of shape [vectors, n].
+
+    The unrolled FFT and the stages use the same widths and twiddle factors
+    for a given FFT level so the result does not depend on `spcc` unless a
+    width schedule (see helper.normalize_width_schedule) is used.
+    Without `natural_order` the output is in the order given by
+    `output_order`.  With `inverse` the real and imaginary parts of the input
+    and output are swapped, which gives the inverse FFT.
+    With a `float_format` the components are the bits of floats and every
+    level uses float_butterfly so the result never depends on `spcc`.
+    With `radix22` pairs of stages are done by a radix-2^2 stage (see
+    helper.get_radix22_pairs) which gives a slightly different result.
+    """
+    assert data[0].shape[-1] == n
+    assert spcc == pow(2, helper.logceil(spcc))
+    assert n == pow(2, helper.logceil(n))
+    assert helper.logceil(spcc)*2 <= helper.logceil(n)
+    if inverse:
+        data = data[1], data[0]
+    data = bit_reverse(data)
+    if float_format:
+        assert width_schedule is None
+        assert not gauss
+        for level in range(1, helper.logceil(n)+1):
+            data = float_combine(data, pow(2, level), float_format)
+    else:
+        data = unrolled_fft_inner(data, spcc, input_width, gauss)
+        n_stages = helper.logceil(n//spcc)
+        schedule = helper.normalize_width_schedule(width_schedule, n_stages)
+        width = input_width + 2*helper.logceil(spcc)
+        if radix22:
+            assert spcc >= 4
+            pairs = helper.get_radix22_pairs(n_stages)
+        else:
+            pairs = []
+        for stage_index, reduction in enumerate(schedule):
+            if stage_index-1 in pairs:
+                # Done with the previous stage.
+                assert not (reduction['msbs'] or reduction['lsbs'])
+                continue
+            if reduction['msbs'] or reduction['lsbs']:
+                data = reduce(data, width, **reduction)
+                width -= 2*(reduction['msbs'] + reduction['lsbs'])
+            if stage_index in pairs:
+                stage_n = spcc * pow(2, stage_index+2)
+                data = combine_radix22(data, stage_n, width, gauss)
+                width += 4
+                continue
+            stage_n = spcc * pow(2, stage_index+1)
+            # Each stage acts on consecutive sub-vectors of length stage_n.
+            data = combine(data, stage_n, width, gauss)
+            width += 2
+    if not natural_order:
+        order = output_order(n, spcc)
+        data = data[0][..., order], data[1][..., order]
+    if inverse:
+        data = data[1], data[0]
+    return data
+
+
+def block_exponents(data, input_width):
+    """
+    Models the exponent detection in block_normalize.  Returns the number
+    of bits that the components of each vector can be shifted up by while
+    still fitting in `input_width`/2-1 bits.
+    """
+    # A signed value needs one more bit than the bit length of its
+    # magnitude (or of its inverse for negative values).
+    acc = 0
+    for component in data:
+        inverted = numpy.where(component < 0, ~component, component)
+        acc = acc | numpy.bitwise_or.reduce(inverted, axis=-1)
+    bit_lengths = numpy.array([int(value).bit_length() for value in numpy.ravel(acc)])
+    return numpy.maximum(0, input_width//2-2 - bit_lengths).reshape(numpy.shape(acc))
+
+
+def htfft_block_floating_point(data, n, spcc, input_width, gauss=False, natural_order=True,
+                               inverse=False):
+    """
+    Models the HTFFT generated with `block_floating_point`.  Each vector is
+    shifted up by its exponent before the FFT and the stages use the width
+    schedule from `helper.get_block_floating_point_schedule`.
+    Returns the output data and the exponent of each vector.  The output is
+    the FFT divided by `n` and multiplied by 2 to the power of the exponent.
+    """
+    exponents = block_exponents(data, input_width)
+    normalized = tuple(component << exponents[..., numpy.newaxis] for component in data)
+    schedule = helper.get_block_floating_point_schedule(n, spcc)
+    output = htfft(normalized, n, spcc, input_width, schedule, gauss, natural_order, inverse)
+    return output, exponents
+
+
+def htfft_smaller(data, size, n, spcc, input_width, gauss=False, natural_order=True, inverse=False,
+                  float_format=None):
+    """
+    Models a HTFFT generated with a `min_n` and a maximum size `n` doing FFTs
+    of a smaller `size` selected with i_log2n.  The later stages are bypassed
+    and the samples are widened to the full output width so the output is
+    still the FFT divided by `size`.
+    """
+    output = htfft(data, size, spcc, input_width, gauss=gauss, natural_order=natural_order,
+                   inverse=inverse, float_format=float_format)
+    if float_format:
+        return output
+    shift = helper.logceil(n) - helper.logceil(size)
+    return tuple(component << shift for component in output)
+
+
+def real_split(data):
+    """
+    Models real_split.  Takes the FFT Z of z = x + jy (in natural order, of
+    shape [vectors, n]) and returns the FFTs X and Y of the real x and y for
+    bins 0 to n/2-1.  X[n/2] is in the imaginary part of X[0] and likewise
+    for Y.  The outputs are not divided by 2 but have one more bit per
+    component.
+    """
+    real, imag = data
+    n = real.shape[-1]
+    a_real = real[..., :n//2]
+    a_imag = imag[..., :n//2]
+    # The partner of bin k is bin n-k.  For bin 0 we use bin 0 and then
+    # overwrite the imaginary parts with bin n/2.
+    partners = (n - numpy.arange(n//2)) % n
+    b_real = real[..., partners]
+    b_imag = imag[..., partners]
+    x_real = a_real + b_real
+    x_imag = a_imag - b_imag
+    y_real = a_imag + b_imag
+    y_imag = b_real - a_real
+    x_imag[..., 0] = 2*real[..., n//2]
+    y_imag[..., 0] = 2*imag[..., n//2]
+    return (x_real, x_imag), (y_real, y_imag)
+
+
+def packed_rfft(values):
+    """
+    The FFTs of real vectors of shape [vectors, n] for bins 0 to n/2-1 with
+    bin n/2 in the imaginary part of bin 0 as real_split outputs them.
+    """
+    n = values.shape[-1]
+    spectrum = numpy.fft.rfft(values, axis=-1)
+    packed = spectrum[..., :n//2].copy()
+    packed[..., 0] = spectrum[..., 0].real + (0+1j)*spectrum[..., n//2].real
+    return packed
+
+
+def htfft_real(x, y, n, spcc, input_width, width_schedule=None, gauss=False):
+    """
+    Models the real mode of the HTFFT (htfft_real.vhd) for two real inputs
+    of shape [vectors, n] with components of bit-width `input_width`/2.
+    Returns the outputs for x and y which have a width two bits more than
+    the HTFFT output width.
+    """
+    data = htfft((x, y), n, spcc, input_width, width_schedule, gauss)
+    return real_split(data)
+
+
+def htfft_complex(values, n, spcc, input_width, width_schedule=None, gauss=False,
+                  natural_order=True, inverse=False):
+    """
+    Takes complex input vectors of shape [vectors, n] and returns the
+    complex values that the HTFFT outputs.  These are the FFT divided by `n`
+    (or with `inverse` the inverse FFT) multiplied by a power of two if the
+    width schedule removes MSBs.
+    """
+    stage_widths, output_width, log_gain = helper.get_stage_widths(
+        n, spcc, input_width, width_schedule)
+    data = complex_to_ints(values, input_width)
+    return ints_to_complex(htfft(data, n, spcc, input_width, width_schedule, gauss, natural_order,
+                                 inverse),
+                           output_width)
@@ -0,0 +1,139 @@
+"""
+Pre-analyzed GHDL work libraries for the static (non-templated) sources.
+
+The static sources (htfft_pkg.vhd, butterfly.vhd, memory.vhd, ...) are the
+same for every test so we analyze them once into a library that is kept in
+the cache directory.  Before a simulation the library is copied into the
+`sim_build` directory that cocotb_test uses and only the generated sources
+are passed to cocotb_test to be analyzed.
+
+cocotb_test analyzes the sources into a library named after the top level
+so a prebuilt library is specific to a top level name.  The tests reuse a
+small number of top level names so this still gives plenty of reuse.
+
+When the top level only depends on static sources the design is also
+elaborated once.  For the GHDL backends that produce an executable this
+means cocotb_test finds an up to date executable and skips straight to
+running it.
+
+A library is keyed on the contents of the static sources it holds and the
+GHDL version, so changing a static source builds a new library.
+"""
+import os
+import shutil
+import hashlib
+import functools
+import subprocess
+import tempfile
+
+from htfft import cache
+
+basedir = os.path.abspath(os.path.dirname(__file__))
+
+# This must match the directory that cocotb_test runs GHDL in.
+SIM_BUILD = 'sim_build'
+
+
+def is_template(filename):
+    with open(filename, 'r') as f:
+        text = f.read()
+    return '{{' in text or '{%' in text
+
+
+@functools.lru_cache(maxsize=None)
+def get_static_hashes():
+    """
+    Returns a dictionary mapping the basenames of the static sources to
+    a hash of their contents.
+    """
+    hashes = {}
+    for name in os.listdir(basedir):
+        filename = os.path.join(basedir, name)
+        if name.endswith('.vhd') and not is_template(filename):
+            hashes[name] = hash_file(filename)
+    return hashes
+
+
+def hash_file(filename):
+    with open(filename, 'rb') as f:
+        return hashlib.sha256(f.read()).hexdigest()
+
+
+def split_sources(filenames):
+    """
+    Splits the filenames into those that are copies of static sources and
+    those that have been generated.  Fusesoc and the file list cache
+    copy the sources so we compare contents rather than paths.
+    """
+    static_hashes = get_static_hashes()
+    static = []
+    generated = []
+    for filename in filenames:
+        basename = os.path.basename(filename)
+        if static_hashes.get(basename, None) == hash_file(filename):
+            static.append(basename)
+        else:
+            generated.append(filename)
+    return static, generated
+
+
+@functools.lru_cache(maxsize=None)
+def get_ghdl_version():
+    if shutil.which('ghdl') is None:
+        return None
+    return subprocess.check_output(['ghdl', '--version']).decode()
+
+
+def get_library(static_basenames, top_name, elaborate):
+    """
+    Returns the directory of a library named `top_name` with the static
+    sources analyzed (and `top_name` elaborated if `elaborate` is True),
+    building it if necessary.
+    """
+    hasher = hashlib.sha256()
+    hasher.update(get_ghdl_version().encode())
+    for basename in static_basenames:
+        hasher.update(basename.encode())
+        hasher.update(get_static_hashes()[basename].encode())
+    hasher.update(top_name.encode())
+    hasher.update(str(elaborate).encode())
+    library_dir = os.path.join(cache.get_cache_dir(), 'ghdl', hasher.hexdigest())
+    if not os.path.exists(library_dir):
+        parent_dir = os.path.dirname(library_dir)
+        os.makedirs(parent_dir, exist_ok=True)
+        temp_dir = tempfile.mkdtemp(prefix='.tmp', dir=parent_dir)
+        # The sources are given in dependency order by fusesoc.
+        subprocess.check_call(
+            ['ghdl', '-a', '--work={}'.format(top_name)] +
+            [os.path.join(basedir, basename) for basename in static_basenames],
+            cwd=temp_dir)
+        if elaborate:
+            subprocess.check_call(['ghdl', '-m', '--work={}'.format(top_name), top_name],
+                                  cwd=temp_dir)
+        try:
+            os.rename(temp_dir, library_dir)
+        except OSError:
+            # Another process built the same library first.
+            shutil.rmtree(temp_dir)
+    return library_dir
+
+
+def prepare(working_directory, filenames, top_name):
+    """
+    Copies a prebuilt library into the simulation directory and returns
+    the sources that still need to be given to cocotb_test.
+    """
+    if not cache.is_enabled() or get_ghdl_version() is None:
+        return filenames
+    static, generated = split_sources(filenames)
+    if not static:
+        return filenames
+    library_dir = get_library(tuple(static), top_name, elaborate=not generated)
+    sim_build = os.path.join(working_directory, SIM_BUILD)
+    if os.path.exists(sim_build):
+        shutil.rmtree(sim_build)
+    # copy2 keeps the modification times so GHDL and cocotb_test see the
+    # analyzed units and the executable as up to date.
+    shutil.copytree(library_dir, sim_build, copy_function=shutil.copy2)
+    # A dictionary so that cocotb_test accepts an empty list of sources.
+    return {top_name: generated}
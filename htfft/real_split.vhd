@@ -0,0 +1,208 @@
+library ieee;
+use ieee.std_logic_1164.all;
+use ieee.numeric_std.all;
+
+use work.htfft_pkg.all;
+
+-- Splits the FFT Z of z = x + jy, where x and y are real, into the FFTs X
+-- and Y of x and y using
+--   X[k] = (Z[k] + conj(Z[N-k]))/2
+--   Y[k] = (Z[k] - conj(Z[N-k]))/2j
+-- The input is in the order the last stage of the HTFFT produces it (see
+-- model.output_order) so word t holds bins t*SPCC/2+l in its lower half
+-- and N/2+t*SPCC/2+l in its upper half.
+--
+-- Only bins 0 to N/2-1 are output since the others are conjugates of these.
+-- X[0] and X[N/2] are both real so X[N/2] is put in the imaginary part of
+-- X[0], and likewise for Y.  The outputs aren't divided by 2 but have one
+-- more bit per component so they are exact.
+--
+-- The lower halves are delayed by a vector and the upper halves are stored
+-- and read back in reverse order.  The upper half memory is written in the
+-- opposite direction each vector so that it can be read and written at the
+-- same address.
+entity real_split is
+  generic (
+    -- The number of bits used for each complex sample of Z.
+    WIDTH: positive;
+    -- Number of samples of Z per clock cycle.
+    SPCC: positive;
+    -- The number of samples in an FFT.
+    N: positive
+    );
+  port (
+    clk: in std_logic;
+    -- Indicates the first clock cycle of data for an FFT.
+    i_first: in std_logic;
+    i_data: in std_logic_vector(WIDTH*SPCC-1 downto 0);
+    o_first: out std_logic;
+    -- Bins t*SPCC/2 to (t+1)*SPCC/2-1 of X and Y.
+    o_data_x: out std_logic_vector((WIDTH+2)*SPCC/2-1 downto 0);
+    o_data_y: out std_logic_vector((WIDTH+2)*SPCC/2-1 downto 0)
+    );
+end entity;
+
+architecture arch of real_split is
+
+  constant M: positive := N/SPCC;
+  constant HALF_WIDTH: positive := WIDTH*SPCC/2;
+
+  subtype t_output_component is signed(WIDTH/2 downto 0);
+
+  function get_real(data: std_logic_vector; lane: natural) return t_output_component is
+    constant normalized: std_logic_vector(data'length-1 downto 0) := data;
+  begin
+    return resize(signed(normalized((lane+1)*WIDTH-1 downto lane*WIDTH+WIDTH/2)), WIDTH/2+1);
+  end function;
+
+  function get_imag(data: std_logic_vector; lane: natural) return t_output_component is
+    constant normalized: std_logic_vector(data'length-1 downto 0) := data;
+  begin
+    return resize(signed(normalized(lane*WIDTH+WIDTH/2-1 downto lane*WIDTH)), WIDTH/2+1);
+  end function;
+
+  signal w_counter: unsigned(logceil(M)-1 downto 0) := (others => '0');
+  signal w_index: unsigned(logceil(M)-1 downto 0);
+  signal w_reversed: std_logic := '0';
+  signal w_next_reversed: std_logic;
+  signal w_address: unsigned(logceil(M)-1 downto 0);
+  signal w_lower: std_logic_vector(HALF_WIDTH-1 downto 0);
+  signal w_upper: std_logic_vector(HALF_WIDTH-1 downto 0);
+  -- Whether the current pass through the addresses is writing a vector.
+  signal w_vector: std_logic := '0';
+  signal w_complete: std_logic;
+  -- Bin N/2, the first sample of the upper half of word 0, of the vector
+  -- being written and of the previous vector.
+  signal w_saved_next: std_logic_vector(WIDTH-1 downto 0);
+  signal w_saved: std_logic_vector(WIDTH-1 downto 0);
+
+  signal r_index: unsigned(logceil(M)-1 downto 0);
+  signal r_first: std_logic := '0';
+  signal r_lower: std_logic_vector(HALF_WIDTH-1 downto 0);
+  signal r_upper: std_logic_vector(HALF_WIDTH-1 downto 0);
+  signal r_upper_previous: std_logic_vector(HALF_WIDTH-1 downto 0);
+
+begin
+
+  assert M >= 2 severity failure;
+
+  w_index <= (others => '0') when i_first = '1' else
+             w_counter + 1;
+  w_next_reversed <= not w_reversed when w_index = 0 else
+                     w_reversed;
+  w_address <= w_index when w_next_reversed = '0' else
+               to_unsigned(M-1, logceil(M)) - w_index;
+  w_lower <= i_data(HALF_WIDTH-1 downto 0);
+  w_upper <= i_data(2*HALF_WIDTH-1 downto HALF_WIDTH);
+  -- The previous vector was all written if we've just wrapped around.
+  w_complete <= '1' when (w_index = 0) and (w_counter = M-1) and (w_vector = '1') else
+                '0';
+
+  process(clk)
+  begin
+    if rising_edge(clk) then
+      w_counter <= w_index;
+      w_reversed <= w_next_reversed;
+      if w_index = 0 then
+        w_vector <= i_first;
+        w_saved_next <= w_upper(WIDTH-1 downto 0);
+        w_saved <= w_saved_next;
+      end if;
+      r_index <= w_index;
+      r_first <= w_complete;
+      r_upper_previous <= r_upper;
+    end if;
+  end process;
+
+  -- Delays the lower halves by a vector.
+  lower_memory: entity work.memory
+    generic map (
+      WIDTH => HALF_WIDTH,
+      DEPTH => M,
+      ADDRESS_CLASH => "OLD"
+      )
+    port map (
+      clk => clk,
+      write_valid => '1',
+      write_address => w_index,
+      write_data => w_lower,
+      toread_valid => '1',
+      toread_address => w_index,
+      fromread_data => r_lower
+      );
+
+  -- Reads the upper halves of the previous vector in reverse order.
+  upper_memory: entity work.memory
+    generic map (
+      WIDTH => HALF_WIDTH,
+      DEPTH => M,
+      ADDRESS_CLASH => "OLD"
+      )
+    port map (
+      clk => clk,
+      write_valid => '1',
+      write_address => w_address,
+      write_data => w_upper,
+      toread_valid => '1',
+      toread_address => w_address,
+      fromread_data => r_upper
+      );
+
+  -- In r_index = t, r_lower holds bins t*SPCC/2+l, r_upper holds bins
+  -- N-t*SPCC/2-l for l = 1 to SPCC/2-1 (at lane SPCC/2-l) and
+  -- r_upper_previous holds bin N-t*SPCC/2 (at lane 0).
+  loop_lanes: for lane in 0 to SPCC/2-1 generate
+    signal a_real: t_output_component;
+    signal a_imag: t_output_component;
+    signal b_real: t_output_component;
+    signal b_imag: t_output_component;
+    signal x_real: t_output_component;
+    signal x_imag: t_output_component;
+    signal y_real: t_output_component;
+    signal y_imag: t_output_component;
+  begin
+    a_real <= get_real(r_lower, lane);
+    a_imag <= get_imag(r_lower, lane);
+    lane_zero: if lane = 0 generate
+      b_real <= get_real(w_saved, 0) when r_index = 0 else
+                get_real(r_upper_previous, 0);
+      b_imag <= get_imag(w_saved, 0) when r_index = 0 else
+                get_imag(r_upper_previous, 0);
+      -- Bins 0 and N/2 are both real so they're packed together.
+      x_real <= a_real + a_real when r_index = 0 else
+                a_real + b_real;
+      x_imag <= b_real + b_real when r_index = 0 else
+                a_imag - b_imag;
+      y_real <= a_imag + a_imag when r_index = 0 else
+                a_imag + b_imag;
+      y_imag <= b_imag + b_imag when r_index = 0 else
+                b_real - a_real;
+    end generate;
+    other_lanes: if lane > 0 generate
+      b_real <= get_real(r_upper, SPCC/2-lane);
+      b_imag <= get_imag(r_upper, SPCC/2-lane);
+      x_real <= a_real + b_real;
+      x_imag <= a_imag - b_imag;
+      y_real <= a_imag + b_imag;
+      y_imag <= b_real - a_real;
+    end generate;
+
+    process(clk)
+    begin
+      if rising_edge(clk) then
+        o_data_x((lane+1)*(WIDTH+2)-1 downto lane*(WIDTH+2)) <=
+          std_logic_vector(x_real) & std_logic_vector(x_imag);
+        o_data_y((lane+1)*(WIDTH+2)-1 downto lane*(WIDTH+2)) <=
+          std_logic_vector(y_real) & std_logic_vector(y_imag);
+      end if;
+    end process;
+  end generate;
+
+  process(clk)
+  begin
+    if rising_edge(clk) then
+      o_first <= r_first;
+    end if;
+  end process;
+
+end architecture;
@@ -0,0 +1,49 @@
+library ieee;
+use ieee.std_logic_1164.all;
+use ieee.numeric_std.all;
+
+use work.htfft_pkg.all;
+
+-- Reduces the width of SIZE complex samples by removing LSBS bits from the
+-- bottom of each component (truncating or rounding) and then saturating
+-- into OUTPUT_WIDTH/2 bits.
+-- Removing LSBs keeps the scaling of the samples the same, while
+-- saturating away MSBs multiplies them by two for each bit removed.  When
+-- MSBs are removed each component saturates at half the range so that the
+-- next butterfly can't overflow.
+entity reduce_width is
+  generic (
+    SIZE: positive;
+    INPUT_WIDTH: positive;
+    OUTPUT_WIDTH: positive;
+    LSBS: natural;
+    ROUND: boolean
+    );
+  port (
+    i_data: in std_logic_vector(SIZE*INPUT_WIDTH-1 downto 0);
+    o_data: out std_logic_vector(SIZE*OUTPUT_WIDTH-1 downto 0)
+    );
+end entity;
+
+architecture arch of reduce_width is
+begin
+
+  assert INPUT_WIDTH mod 2 = 0 severity failure;
+  assert OUTPUT_WIDTH mod 2 = 0 severity failure;
+  assert OUTPUT_WIDTH/2 + LSBS <= INPUT_WIDTH/2 severity failure;
+
+  loop_samples: for sample_index in 0 to SIZE-1 generate
+    signal input_real: signed(INPUT_WIDTH/2-1 downto 0);
+    signal input_imag: signed(INPUT_WIDTH/2-1 downto 0);
+  begin
+    input_real <= signed(i_data(sample_index*INPUT_WIDTH+INPUT_WIDTH-1 downto
+                                sample_index*INPUT_WIDTH+INPUT_WIDTH/2));
+    input_imag <= signed(i_data(sample_index*INPUT_WIDTH+INPUT_WIDTH/2-1 downto
+                                sample_index*INPUT_WIDTH));
+    o_data(sample_index*OUTPUT_WIDTH+OUTPUT_WIDTH-1 downto sample_index*OUTPUT_WIDTH+OUTPUT_WIDTH/2) <=
+      std_logic_vector(reduce_width(input_real, OUTPUT_WIDTH/2, LSBS, ROUND));
+    o_data(sample_index*OUTPUT_WIDTH+OUTPUT_WIDTH/2-1 downto sample_index*OUTPUT_WIDTH) <=
+      std_logic_vector(reduce_width(input_imag, OUTPUT_WIDTH/2, LSBS, ROUND));
+  end generate;
+
+end architecture;
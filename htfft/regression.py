@@ -0,0 +1,124 @@
+"""
+Runs the configurations from the cocotb test modules across a pool of
+processes.
+
+`helper.run_with_cocotb` changes the working directory and the environment
+so each configuration is run in a fresh worker process.  The output of each
+configuration is written to a log file and results are reported as they
+complete.
+
+    python regression.py --n_tests 100 --jobs 16
+"""
+import os
+import re
+import sys
+import glob
+import time
+import argparse
+import inspect
+import importlib
+import traceback
+import multiprocessing
+
+basedir = os.path.abspath(os.path.dirname(__file__))
+
+
+def find_test_modules(directory=basedir):
+    """
+    The names of the test_*.py modules that run simulations, which are the
+    ones with a `run_test`.
+    """
+    module_names = []
+    for filename in sorted(glob.glob(os.path.join(directory, 'test_*.py'))):
+        with open(filename, 'r') as f:
+            if re.search(r'^def run_test\(', f.read(), re.MULTILINE):
+                module_names.append(os.path.splitext(os.path.basename(filename))[0])
+    return tuple(module_names)
+
+
+TEST_MODULE_NAMES = find_test_modules()
+
+
+def get_configurations(module_names, n_tests, base_seed=0, n_seeds=1):
+    configurations = []
+    for module_name in module_names:
+        module = importlib.import_module('htfft.' + module_name)
+        kwargs = {'n_tests': n_tests, 'base_seed': base_seed}
+        # Some modules can run several seeds in each simulation.
+        if 'n_seeds' in inspect.signature(module.get_test_params).parameters:
+            kwargs['n_seeds'] = n_seeds
+        for test_index, test_params in enumerate(module.get_test_params(**kwargs)):
+            name = '{}[{}]'.format(module_name, test_index)
+            configurations.append((name, module_name, test_params))
+    return configurations
+
+
+def run_configuration(configuration, log_directory):
+    """
+    Runs a single configuration with stdout and stderr (including those of
+    the fusesoc and simulator subprocesses) redirected to a log file.
+    """
+    name, module_name, test_params = configuration
+    log_filename = os.path.join(log_directory, '{}.log'.format(name))
+    start_time = time.time()
+    with open(log_filename, 'w') as log_file:
+        sys.stdout.flush()
+        sys.stderr.flush()
+        os.dup2(log_file.fileno(), sys.stdout.fileno())
+        os.dup2(log_file.fileno(), sys.stderr.fileno())
+        try:
+            module = importlib.import_module('htfft.' + module_name)
+            module.run_test(test_params)
+            passed = True
+        except BaseException:
+            # cocotb_test signals failures with SystemExit as well as exceptions.
+            traceback.print_exc()
+            passed = False
+        sys.stdout.flush()
+        sys.stderr.flush()
+    return name, passed, time.time() - start_time, log_filename
+
+
+def run_configurations(configurations, n_jobs, log_directory):
+    if not os.path.exists(log_directory):
+        os.makedirs(log_directory)
+    failures = []
+    # A new process for every configuration so that changes to the working
+    # directory and the environment can't leak between them.
+    with multiprocessing.Pool(processes=n_jobs, maxtasksperchild=1) as pool:
+        results = pool.imap_unordered(
+            _run_configuration_star, [(configuration, log_directory) for configuration in configurations])
+        for index, (name, passed, duration, log_filename) in enumerate(results):
+            print('[{}/{}] {} {} ({:.1f}s)'.format(
+                index+1, len(configurations), 'PASS' if passed else 'FAIL', name, duration))
+            if not passed:
+                failures.append((name, log_filename))
+    return failures
+
+
+def _run_configuration_star(args):
+    return run_configuration(*args)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--modules', dest='modules', nargs='+', default=TEST_MODULE_NAMES,
+                        choices=TEST_MODULE_NAMES)
+    parser.add_argument('--n_tests', dest='n_tests', type=int, default=10)
+    parser.add_argument('--base_seed', dest='base_seed', type=int, default=0)
+    parser.add_argument('--n_seeds', dest='n_seeds', type=int, default=1)
+    parser.add_argument('--jobs', dest='jobs', type=int, default=multiprocessing.cpu_count())
+    parser.add_argument('--log_directory', dest='log_directory',
+                        default=os.path.abspath(os.path.join('temp', 'regression_logs')))
+    args = parser.parse_args()
+    configurations = get_configurations(args.modules, n_tests=args.n_tests, base_seed=args.base_seed,
+                                        n_seeds=args.n_seeds)
+    failures = run_configurations(configurations, n_jobs=args.jobs, log_directory=args.log_directory)
+    print('{} passed, {} failed'.format(len(configurations) - len(failures), len(failures)))
+    for name, log_filename in failures:
+        print('FAILED {}: {}'.format(name, log_filename))
+    sys.exit(1 if failures else 0)
+
+
+if __name__ == '__main__':
+    main()
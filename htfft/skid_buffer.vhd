@@ -0,0 +1,59 @@
+library ieee;
+use ieee.std_logic_1164.all;
+
+-- A register slice for a valid/ready stream.  o_valid, o_data and i_ready
+-- all come from registers so neither direction has a combinatorial path
+-- through it.  A word can pass every clock cycle.  When o_ready drops, the
+-- word that was already accepted is held in the skid register.
+entity skid_buffer is
+  generic (
+    WIDTH: positive
+    );
+  port (
+    clk: in std_logic;
+    reset: in std_logic;
+    i_valid: in std_logic;
+    i_ready: out std_logic;
+    i_data: in std_logic_vector(WIDTH-1 downto 0);
+    o_valid: out std_logic;
+    o_ready: in std_logic;
+    o_data: out std_logic_vector(WIDTH-1 downto 0)
+    );
+end entity;
+
+architecture arch of skid_buffer is
+  signal main_valid: std_logic := '0';
+  signal main_data: std_logic_vector(WIDTH-1 downto 0);
+  signal skid_valid: std_logic := '0';
+  signal skid_data: std_logic_vector(WIDTH-1 downto 0);
+begin
+
+  i_ready <= not skid_valid;
+  o_valid <= main_valid;
+  o_data <= main_data;
+
+  process(clk)
+  begin
+    if rising_edge(clk) then
+      if (main_valid = '0') or (o_ready = '1') then
+        -- The output register is free for the next word.
+        if skid_valid = '1' then
+          main_valid <= '1';
+          main_data <= skid_data;
+          skid_valid <= '0';
+        else
+          main_valid <= i_valid;
+          main_data <= i_data;
+        end if;
+      elsif (i_valid = '1') and (skid_valid = '0') then
+        skid_valid <= '1';
+        skid_data <= i_data;
+      end if;
+      if reset = '1' then
+        main_valid <= '0';
+        skid_valid <= '0';
+      end if;
+    end if;
+  end process;
+
+end architecture;
@@ -2,6 +2,8 @@ library ieee;
 use ieee.std_logic_1164.all;
 use ieee.numeric_std.all;
 
+use std.textio.all;
+
 use work.htfft_pkg.all;
 use work.htfft{{suffix}}_pipeline.all;
 
@@ -16,8 +18,8 @@ entity stage_{{n}}{{suffix}} is
     i_data_a: in std_logic_vector({{width}}*{{size}}/2-1 downto 0);
     i_data_b: in std_logic_vector({{width}}*{{size}}/2-1 downto 0);
     o_reset: out std_logic;
-    o_data_a: out std_logic_vector(({{width}}+2)*{{size}}/2-1 downto 0);
-    o_data_b: out std_logic_vector(({{width}}+2)*{{size}}/2-1 downto 0)
+    o_data_a: out std_logic_vector({{output_width}}*{{size}}/2-1 downto 0);
+    o_data_b: out std_logic_vector({{output_width}}*{{size}}/2-1 downto 0)
   );
 end entity;
 
@@ -25,8 +27,19 @@ architecture arch of stage_{{n}}{{suffix}} is
   constant N: positive := {{n}};
   constant WIDTH: positive := {{width}};
   constant SIZE: positive := {{size}};
-  constant OUTPUT_WIDTH: positive := WIDTH + 2;
+  -- The output is 2 bits wider than the input except with floating point
+  -- samples.
+  constant OUTPUT_WIDTH: positive := {{output_width}};
   constant L: positive := N/SIZE;
+  constant GAUSS: boolean := {{'true' if gauss else 'false'}};
+  -- With COMPRESS_TWIDDLES only the first half of the batches of twiddles
+  -- (positions below N/4) are stored.  The twiddle at position p+N/4 is the
+  -- one at p multiplied by -j.
+  constant COMPRESS_TWIDDLES: boolean := {{'true' if compress_twiddles else 'false'}};
+  constant N_STORED_BATCHES: positive := {{n_stored_batches}};
+  -- How the memories holding the data for the butterflies are implemented
+  -- (see helper.get_memory_style).
+  constant MEMORY_STYLE: string := "{{memory_style}}";
 
   function ADDRESS_CLASH return string is
   begin
@@ -50,7 +63,7 @@ architecture arch of stage_{{n}}{{suffix}} is
   signal toread_valid_b: std_logic;
   signal toread_address: unsigned(logceil(L/2)-1 downto 0);
 
-  subtype t_twiddle is std_logic_vector(WIDTH-1 downto 0);
+  subtype t_twiddle is std_logic_vector(twiddle_slv_width(WIDTH, GAUSS)-1 downto 0);
   type array_of_twiddles is array(natural range <>) of t_twiddle;
   signal fromread_data_a: std_logic_vector(SIZE*WIDTH/2-1 downto 0);
   signal fromread_data_b: std_logic_vector(SIZE*WIDTH/2-1 downto 0);
@@ -70,7 +83,23 @@ architecture arch of stage_{{n}}{{suffix}} is
   signal tobutterfly_data_a: std_logic_vector(SIZE*WIDTH/2-1 downto 0);
   signal tobutterfly_data_b: std_logic_vector(SIZE*WIDTH/2-1 downto 0);
 
-  subtype t_batch_of_twiddles is array_of_twiddles(SIZE/2-1 downto 0);
+  -- With GAUSS and COMPRESS_TWIDDLES the stored twiddles hold c, s, s-c and
+  -- c+s so that the fields of the rotated twiddle can be selected without
+  -- adding anything.
+  function stored_twiddle_width return positive is
+  begin
+    if GAUSS and COMPRESS_TWIDDLES then
+      return 4*(WIDTH/2+1);
+    else
+      return twiddle_slv_width(WIDTH, GAUSS);
+    end if;
+  end function;
+  subtype t_stored_twiddle is std_logic_vector(stored_twiddle_width-1 downto 0);
+  type array_of_stored_twiddles is array(natural range <>) of t_stored_twiddle;
+  signal fromread_stored: array_of_stored_twiddles(SIZE/2-1 downto 0);
+  signal fromread_rotate: std_logic;
+
+  subtype t_batch_of_twiddles is array_of_stored_twiddles(SIZE/2-1 downto 0);
   type array_of_batches_of_twiddles is array(natural range <>) of t_batch_of_twiddles;
 
   subtype t_data is std_logic_vector(WIDTH-1 downto 0);
@@ -78,16 +107,49 @@ architecture arch of stage_{{n}}{{suffix}} is
   signal tobutterfly_dataarray_a: array_of_data(SIZE/2-1 downto 0);
   signal tobutterfly_dataarray_b: array_of_data(SIZE/2-1 downto 0);
 
-  subtype t_odata is std_logic_vector(WIDTH+2-1 downto 0);
+  subtype t_odata is std_logic_vector(OUTPUT_WIDTH-1 downto 0);
   type array_of_odata is array(natural range <>) of t_odata;
   signal o_dataarray_a: array_of_odata(SIZE/2-1 downto 0);
   signal o_dataarray_b: array_of_odata(SIZE/2-1 downto 0);
 
-  constant LOCAL_TWIDDLES: array_of_batches_of_twiddles(N/SIZE-1 downto 0) := ({% for twiddle_batch in twiddle_batches %}
+  -- Lanes where the twiddles are always 1 or -j use a butterfly without
+  -- multipliers.
+  type array_of_booleans is array(natural range <>) of boolean;
+  constant TRIVIAL_LANES: array_of_booleans(SIZE/2-1 downto 0) := ({% for trivial in trivial_lanes %}
+    {{loop.index0}} => {{'true' if trivial else 'false'}}{% if not loop.last %},{% endif %}{% endfor %}
+  );
+
+{% if twiddles_in_file %}
+  -- The twiddles are read from a file when the design is elaborated rather
+  -- than written out as an aggregate, which is slow to analyze for large N.
+  -- The file has a twiddle on each line, written as bits with the MSB
+  -- first, in order of batch and then lane.
+  constant TWIDDLE_FILENAME: string := "{{twiddle_filename}}";
+
+  impure function read_twiddles return array_of_batches_of_twiddles is
+    file twiddle_file: text open read_mode is TWIDDLE_FILENAME;
+    variable twiddle_line: line;
+    variable twiddle: bit_vector(t_stored_twiddle'range);
+    variable twiddles: array_of_batches_of_twiddles(N_STORED_BATCHES-1 downto 0);
+  begin
+    for batch_index in 0 to N_STORED_BATCHES-1 loop
+      for lane in 0 to SIZE/2-1 loop
+        readline(twiddle_file, twiddle_line);
+        read(twiddle_line, twiddle);
+        twiddles(batch_index)(lane) := to_stdlogicvector(twiddle);
+      end loop;
+    end loop;
+    return twiddles;
+  end function;
+
+  constant LOCAL_TWIDDLES: array_of_batches_of_twiddles(N_STORED_BATCHES-1 downto 0) := read_twiddles;
+{% else %}
+  constant LOCAL_TWIDDLES: array_of_batches_of_twiddles(N_STORED_BATCHES-1 downto 0) := ({% for twiddle_batch in twiddle_batches %}
     {{loop.index0}} => ({% for twiddle in twiddle_batch %}
        {{loop.index0}} => "{{twiddle}}"{% if not loop.last %},{% endif %}{% endfor %}
        ){% if not loop.last %},{% endif %}{% endfor %}
   );
+{% endif %}
 
 
   signal i_reset_slv: std_logic_vector(0 downto 0);
@@ -134,7 +196,8 @@ begin
     generic map (
       DEPTH => L/2,
       WIDTH => SIZE*WIDTH/2,
-      ADDRESS_CLASH => ADDRESS_CLASH
+      ADDRESS_CLASH => ADDRESS_CLASH,
+      STYLE => MEMORY_STYLE
       )
     port map (
       clk => clk,
@@ -150,7 +213,8 @@ begin
     generic map (
       DEPTH => L/2,
       WIDTH => SIZE*WIDTH/2,
-      ADDRESS_CLASH => ADDRESS_CLASH
+      ADDRESS_CLASH => ADDRESS_CLASH,
+      STYLE => MEMORY_STYLE
       )
     port map (
       clk => clk,
@@ -168,11 +232,41 @@ begin
   process(clk)
   begin
     if rising_edge(clk) then
-      fromread_twiddles <= LOCAL_TWIDDLES(to_integer(read_index));
+      fromread_stored <= LOCAL_TWIDDLES(to_integer(read_index) mod N_STORED_BATCHES);
+      fromread_rotate <= read_index(logceil(L)-1);
       fromread_swap <= read_index(logceil(L)-1);
     end if;
   end process;
 
+  loop_unfold: for lane in 0 to SIZE/2-1 generate
+    full: if not COMPRESS_TWIDDLES generate
+      fromread_twiddles(lane) <= fromread_stored(lane);
+    end generate;
+    -- Multiplying c+js by -j gives s-jc.
+    folded: if COMPRESS_TWIDDLES and not GAUSS generate
+      fromread_twiddles(lane) <=
+        fromread_stored(lane) when fromread_rotate = '0' else
+        fromread_stored(lane)(WIDTH/2-1 downto 0) &
+        std_logic_vector(-signed(fromread_stored(lane)(WIDTH-1 downto WIDTH/2)));
+    end generate;
+    -- The fields of the rotated twiddle are s, -(c+s) and s-c.
+    folded_gauss: if COMPRESS_TWIDDLES and GAUSS generate
+      constant F: positive := WIDTH/2+1;
+      signal stored_c: std_logic_vector(F-1 downto 0);
+      signal stored_s: std_logic_vector(F-1 downto 0);
+      signal stored_s_minus_c: std_logic_vector(F-1 downto 0);
+      signal stored_c_plus_s: std_logic_vector(F-1 downto 0);
+    begin
+      stored_c <= fromread_stored(lane)(4*F-1 downto 3*F);
+      stored_s <= fromread_stored(lane)(3*F-1 downto 2*F);
+      stored_s_minus_c <= fromread_stored(lane)(2*F-1 downto F);
+      stored_c_plus_s <= fromread_stored(lane)(F-1 downto 0);
+      fromread_twiddles(lane) <=
+        stored_c & stored_s_minus_c & stored_c_plus_s when fromread_rotate = '0' else
+        stored_s & std_logic_vector(-signed(stored_c_plus_s)) & stored_s_minus_c;
+    end generate;
+  end generate;
+
   yes_fromread_buffered: if STAGE_REG_FROMREAD_BUFFERED generate
     process(clk)
     begin
@@ -217,24 +311,93 @@ begin
   loop_butterflys: for bf_index in 0 to SIZE/2-1 generate
     tobutterfly_dataarray_a(bf_index) <= tobutterfly_data_a((bf_index+1)*WIDTH-1 downto bf_index*WIDTH);
     tobutterfly_dataarray_b(bf_index) <= tobutterfly_data_b((bf_index+1)*WIDTH-1 downto bf_index*WIDTH);
-    bf: entity work.butterfly
-      generic map (
-        WIDTH => WIDTH,
-        TWIDDLE_WIDTH => WIDTH,
-        MULT_LATENCY => MULT_LATENCY,
-        REG_I_P => BUTTERFLY_I_P,
-        REG_Q_R => BUTTERFLY_Q_R,
-        REG_R_S => BUTTERFLY_R_S,
-        REG_S_O => BUTTERFLY_S_O
-      )
-      port map (
-        clk => clk,
-        i_a => tobutterfly_dataarray_a(bf_index),
-        i_b => tobutterfly_dataarray_b(bf_index),
-        i_t => tobutterfly_twiddles(bf_index),
-        o_c => o_dataarray_a(bf_index),
-        o_d => o_dataarray_b(bf_index)
-        );
+    {% if float_format %}
+    nontrivial: if not TRIVIAL_LANES(bf_index) generate
+      bf: entity work.float_butterfly
+        generic map (
+          EXPONENT_WIDTH => {{exponent_width}},
+          FRACTION_WIDTH => {{fraction_width}},
+          MULT_LATENCY => MULT_LATENCY,
+          ADD_LATENCY => ADD_LATENCY,
+          REG_I_P => BUTTERFLY_I_P,
+          REG_Q_R => BUTTERFLY_Q_R,
+          REG_R_S => BUTTERFLY_R_S,
+          REG_S_O => BUTTERFLY_S_O
+        )
+        port map (
+          clk => clk,
+          i_a => tobutterfly_dataarray_a(bf_index),
+          i_b => tobutterfly_dataarray_b(bf_index),
+          i_t => tobutterfly_twiddles(bf_index),
+          o_c => o_dataarray_a(bf_index),
+          o_d => o_dataarray_b(bf_index)
+          );
+    end generate;
+    trivial: if TRIVIAL_LANES(bf_index) generate
+      bf: entity work.float_trivial_butterfly
+        generic map (
+          EXPONENT_WIDTH => {{exponent_width}},
+          FRACTION_WIDTH => {{fraction_width}},
+          MULT_LATENCY => MULT_LATENCY,
+          ADD_LATENCY => ADD_LATENCY,
+          REG_I_P => BUTTERFLY_I_P,
+          REG_Q_R => BUTTERFLY_Q_R,
+          REG_R_S => BUTTERFLY_R_S,
+          REG_S_O => BUTTERFLY_S_O
+        )
+        port map (
+          clk => clk,
+          i_a => tobutterfly_dataarray_a(bf_index),
+          i_b => tobutterfly_dataarray_b(bf_index),
+          i_t => tobutterfly_twiddles(bf_index),
+          o_c => o_dataarray_a(bf_index),
+          o_d => o_dataarray_b(bf_index)
+          );
+    end generate;
+    {% else %}
+    nontrivial: if not TRIVIAL_LANES(bf_index) generate
+      bf: entity work.butterfly
+        generic map (
+          WIDTH => WIDTH,
+          TWIDDLE_WIDTH => WIDTH,
+          MULT_LATENCY => MULT_LATENCY,
+          REG_I_P => BUTTERFLY_I_P,
+          REG_Q_R => BUTTERFLY_Q_R,
+          REG_R_S => BUTTERFLY_R_S,
+          REG_S_O => BUTTERFLY_S_O,
+          GAUSS => GAUSS
+        )
+        port map (
+          clk => clk,
+          i_a => tobutterfly_dataarray_a(bf_index),
+          i_b => tobutterfly_dataarray_b(bf_index),
+          i_t => tobutterfly_twiddles(bf_index),
+          o_c => o_dataarray_a(bf_index),
+          o_d => o_dataarray_b(bf_index)
+          );
+    end generate;
+    trivial: if TRIVIAL_LANES(bf_index) generate
+      bf: entity work.trivial_butterfly
+        generic map (
+          WIDTH => WIDTH,
+          TWIDDLE_WIDTH => WIDTH,
+          MULT_LATENCY => MULT_LATENCY,
+          REG_I_P => BUTTERFLY_I_P,
+          REG_Q_R => BUTTERFLY_Q_R,
+          REG_R_S => BUTTERFLY_R_S,
+          REG_S_O => BUTTERFLY_S_O,
+          GAUSS => GAUSS
+        )
+        port map (
+          clk => clk,
+          i_a => tobutterfly_dataarray_a(bf_index),
+          i_b => tobutterfly_dataarray_b(bf_index),
+          i_t => tobutterfly_twiddles(bf_index),
+          o_c => o_dataarray_a(bf_index),
+          o_d => o_dataarray_b(bf_index)
+          );
+    end generate;
+    {% endif %}
     o_data_a((bf_index+1)*OUTPUT_WIDTH-1 downto bf_index*OUTPUT_WIDTH) <=
       std_logic_vector(o_dataarray_a(bf_index));
     o_data_b((bf_index+1)*OUTPUT_WIDTH-1 downto bf_index*OUTPUT_WIDTH) <=
@@ -3,45 +3,143 @@ import os
 import jinja2
 from fusesoc.capi2.generator import Generator
 
-from htfft import helper, conversions
+from htfft import helper, floats
+from htfft.twiddles import (iter_twiddle_strs, iter_folded_twiddle_strs, folding_is_exact,
+                            get_trivial_lanes, iter_radix22_twiddle_strs)
 import htfft_gen
 
 basedir = os.path.abspath(os.path.dirname(__file__))
 
 
-def generate_stage(n, size, width, suffix, pipelines=None, make_pipeline_pkg=False):
+def iter_twiddle_batches(n, size, width, gauss=False, compress_twiddles=False, float_format=None):
+    """
+    Lazily yields the twiddles for each batch of butterflies in a stage.
+    With `compress_twiddles` only the first half of the batches are yielded.
+    """
+    if compress_twiddles:
+        twiddles = iter_folded_twiddle_strs(n, width, gauss=gauss)
+        n_batches = n//size//2
+    else:
+        twiddles = iter_twiddle_strs(n, width, gauss=gauss, float_format=float_format)
+        n_batches = n//size
+    for batch_index in range(n_batches):
+        yield [next(twiddles) for index in range(size//2)]
+
+
+def generate_stage(n, size, width, suffix, pipelines=None, make_pipeline_pkg=False, gauss=False,
+                   compress_twiddles=False, twiddles_in_file=False, memory_thresholds=None,
+                   float_format=None):
+    """
+    With a `float_format` the samples are floats and float_butterfly and
+    float_trivial_butterfly are used.  The output is then the same width as
+    the input.
+    """
     assert size == pow(2, helper.logceil(size))
+    trivial_lanes = get_trivial_lanes(n, size)
+    if float_format:
+        assert not gauss
+        exponent_width, fraction_width = floats.get_format(float_format)
+        assert width == 2*floats.get_width(float_format)
+        compress_twiddles = False
+        output_width = width
+    else:
+        exponent_width, fraction_width = None, None
+        output_width = width + 2
+    memory_style = helper.get_memory_style(n//size//2, size*width//2, memory_thresholds)
+    # The compressed table must give exactly the same twiddles as the full
+    # one.  If rounding ever broke the symmetry fall back to the full table.
+    compress_twiddles = compress_twiddles and folding_is_exact(n, width)
+    if compress_twiddles:
+        n_stored_batches = n//size//2
+    else:
+        n_stored_batches = n//size
+    twiddle_batches = iter_twiddle_batches(n, size, width, gauss, compress_twiddles, float_format)
+    twiddle_filename = 'stage_{}{}_twiddles.mem'.format(n, suffix)
+    if twiddles_in_file:
+        helper.write_twiddle_file(
+            twiddle_filename, (twiddle for batch in twiddle_batches for twiddle in batch))
+        twiddle_filenames = [twiddle_filename]
+    else:
+        twiddle_filenames = []
 
-    twiddle_batches = []
-    batch_size = size//2
-    for batch_index in range(n//size):
-        base_index = batch_index * batch_size
-        twiddles = [conversions.int_to_str(conversions.complex_to_slv(
-            helper.get_twiddle(base_index+index, n), width), width)
-                    for index in range(batch_size)]
-        twiddle_batches.append(twiddles)
     params = {
         'n': n,
         'size': size,
         'width': width,
+        'output_width': output_width,
         'suffix': suffix,
+        'gauss': gauss,
+        'float_format': float_format,
+        'exponent_width': exponent_width,
+        'fraction_width': fraction_width,
+        'compress_twiddles': compress_twiddles,
+        'n_stored_batches': n_stored_batches,
+        'twiddles_in_file': twiddles_in_file,
+        'twiddle_filename': twiddle_filename,
+        'memory_style': memory_style,
         'twiddle_batches': twiddle_batches,
+        'trivial_lanes': [lane in trivial_lanes for lane in range(size//2)],
         }
     template_filename = os.path.join(basedir, 'stage.vhd')
     with open(template_filename, 'r') as f:
         template_text = f.read()
         template = jinja2.Template(template_text)
-    formatted_text = template.render(**params)
     output_filename = 'stage_{}{}.vhd'.format(n, suffix)
-    with open(output_filename, 'w') as g:
-        g.write(formatted_text)
+    # Stream the output to the file so the twiddle constants never have
+    # to all be held in memory.
+    template.stream(**params).dump(output_filename)
 
     if make_pipeline_pkg:
-        extra_filenames = [htfft_gen.make_pipeline_pkg(suffix, pipelines)]
+        extra_filenames = [htfft_gen.make_pipeline_pkg(suffix, pipelines, float_format)]
     else:
         extra_filenames = []
 
-    return extra_filenames + [output_filename]
+    return extra_filenames + twiddle_filenames + [output_filename]
+
+
+def generate_radix22_stage(n, size, width, suffix, gauss=False, twiddles_in_file=False,
+                           memory_thresholds=None):
+    """
+    Generates stage_r22 which does the work of the stages of size `n`/2 and
+    `n`.  The output is 4 bits wider than the input.
+    """
+    assert size == pow(2, helper.logceil(size))
+    assert size >= 4
+    assert n >= 4*size
+    n_words = n//size
+    twiddles = iter_radix22_twiddle_strs(n, width+2, gauss=gauss)
+    twiddle_batches = ([next(twiddles) for index in range(size//4)] for batch_index in range(n_words))
+    twiddle_filename = 'stage_r22_{}{}_twiddles.mem'.format(n, suffix)
+    if twiddles_in_file:
+        helper.write_twiddle_file(
+            twiddle_filename, (twiddle for batch in twiddle_batches for twiddle in batch))
+        twiddle_filenames = [twiddle_filename]
+    else:
+        twiddle_filenames = []
+    params = {
+        'n': n,
+        'size': size,
+        'width': width,
+        'output_width': width + 4,
+        'suffix': suffix,
+        'gauss': gauss,
+        'twiddles_in_file': twiddles_in_file,
+        'twiddle_filename': twiddle_filename,
+        'twiddle_batches': twiddle_batches,
+        'input_memory_style': helper.get_memory_style(
+            n_words//4, size*width//2, memory_thresholds),
+        'double_memory_style': helper.get_memory_style(
+            n_words//2, size*width//2, memory_thresholds),
+        'output_memory_style': helper.get_memory_style(
+            n_words, size*(width+4)//2, memory_thresholds),
+        }
+    template_filename = os.path.join(basedir, 'stage_r22.vhd')
+    with open(template_filename, 'r') as f:
+        template_text = f.read()
+        template = jinja2.Template(template_text)
+    output_filename = 'stage_r22_{}{}.vhd'.format(n, suffix)
+    template.stream(**params).dump(output_filename)
+    return twiddle_filenames + [output_filename]
 
 
 class StageGenerator(Generator):
@@ -54,11 +152,18 @@ class StageGenerator(Generator):
             suffix=self.config['suffix'],
             pipelines=self.config.get('pipelines', None),
             make_pipeline_pkg=self.config.get('make_pipeline_pkg', False),
+            gauss=self.config.get('gauss', False),
+            compress_twiddles=self.config.get('compress_twiddles', False),
+            twiddles_in_file=self.config.get('twiddles_in_file', False),
+            memory_thresholds=self.config.get('memory_thresholds', None),
+            float_format=self.config.get('float_format', None),
             )
-        self.add_files(output_filenames, file_type='vhdlSource')
+        helper.add_generated_files(self, output_filenames)
 
 
-def make_stage_core(directory, suffix, n, size, width, pipelines):
+def make_stage_core(directory, suffix, n, size, width, pipelines, gauss=False,
+                    compress_twiddles=False, twiddles_in_file=False, memory_thresholds=None,
+                    float_format=None):
     """
     Utility function for generating a core file from python.
     """
@@ -69,6 +174,11 @@ def make_stage_core(directory, suffix, n, size, width, pipelines):
         'width': width,
         'pipelines': pipelines,
         'make_pipeline_pkg': True,
+        'gauss': gauss,
+        'compress_twiddles': compress_twiddles,
+        'twiddles_in_file': twiddles_in_file,
+        'memory_thresholds': memory_thresholds,
+        'float_format': float_format,
         }
     template_filename = os.path.join(basedir, 'stage.core.j2')
     with open(template_filename, 'r') as f:
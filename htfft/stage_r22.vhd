@@ -0,0 +1,537 @@
+library ieee;
+use ieee.std_logic_1164.all;
+use ieee.numeric_std.all;
+
+use std.textio.all;
+
+use work.htfft_pkg.all;
+use work.htfft{{suffix}}_pipeline.all;
+
+-- A radix-2^2 stage that does the work of the two radix-2 stages of size
+-- N/2 and N, and has the same ports as them put together.
+--
+-- The vector of size N is made of four FFTs of size N/4, P0 to P3, which
+-- arrive one after the other.  Each is stored in its own memories so that
+-- position k of all four can be read together.  Then for each k
+--   B = P1*W^2k, C = P2*W^k, D = P3*W^3k
+--   E0 = P0 + B, E1 = P0 - B, O0 = C + D, O1 = C - D
+--   X(k) = E0 + O0, X(k+N/2) = E0 - O0
+--   X(k+N/4) = E1 - jO1, X(k+3N/4) = E1 + jO1
+-- where W = exp(-2*pi*j/N).  The first level of butterflies only uses a
+-- twiddle of 1 and the second only 1 and -j, so the only multipliers are
+-- the SIZE/4 rotators for each of B, C and D.  The two radix-2 stages have
+-- SIZE/2 butterflies each.
+--
+-- SIZE/4 positions are done every clock cycle, and the results are stored
+-- in the output memories to send them out in the same order as a radix-2
+-- stage of size N.
+entity stage_r22_{{n}}{{suffix}} is
+  port (
+    clk: in std_logic;
+    -- The reset is just to get the addresses in sync with the
+    -- data flow.  If it arrives on the clock cycle immediately
+    -- before a new vector starts it will have no effect since
+    -- the addresses would be getting initialized anyway.
+    i_reset: in std_logic;
+    i_data_a: in std_logic_vector({{width}}*{{size}}/2-1 downto 0);
+    i_data_b: in std_logic_vector({{width}}*{{size}}/2-1 downto 0);
+    o_reset: out std_logic;
+    o_data_a: out std_logic_vector({{output_width}}*{{size}}/2-1 downto 0);
+    o_data_b: out std_logic_vector({{output_width}}*{{size}}/2-1 downto 0)
+  );
+end entity;
+
+architecture arch of stage_r22_{{n}}{{suffix}} is
+  constant N: positive := {{n}};
+  constant WIDTH: positive := {{width}};
+  constant SIZE: positive := {{size}};
+  -- The output is 4 bits wider than the input.
+  constant OUTPUT_WIDTH: positive := {{output_width}};
+  -- The rotators use twiddles with the width of the second level so they
+  -- are as precise as those of the radix-2 stage of size N.
+  constant TWIDDLE_WIDTH: positive := WIDTH+2;
+  constant L: positive := N/SIZE;
+  -- The clock cycles that each of P0 to P3 takes to arrive.
+  constant T: positive := L/4;
+  constant LOG_L: positive := logceil(L);
+  constant H: positive := SIZE/2;
+  constant Q: positive := SIZE/4;
+  constant GAUSS: boolean := {{'true' if gauss else 'false'}};
+  -- How the memories are implemented (see helper.get_memory_style).
+  constant INPUT_MEMORY_STYLE: string := "{{input_memory_style}}";
+  constant DOUBLE_MEMORY_STYLE: string := "{{double_memory_style}}";
+  constant OUTPUT_MEMORY_STYLE: string := "{{output_memory_style}}";
+
+  -- The clock cycles from reading the input memories to the outputs of
+  -- the second level of butterflies.
+  constant X_LATENCY: positive :=
+    1 + boolean_to_int(STAGE_REG_FROMREAD_BUFFERED) + boolean_to_int(STAGE_REG_BUFFERED_TOBUTTERFLY) +
+    BUTTERFLY_LATENCY + 2;
+  -- Relative to the first word of a vector arriving, the input memories
+  -- are read from 3T+1 clock cycles (as soon as the first position of P3
+  -- has been written), the outputs of position k are ready X_LATENCY
+  -- clock cycles later, and the output memories are read from L/2+1 clock
+  -- cycles after that so that X(k) is always written before it is read.
+  constant READ_RESET_INDEX: natural := T-1;
+  -- The vector takes longer than L clock cycles to pass through so the
+  -- previous vector can still be in the stage when the reset arrives.
+  -- The later counters are reset by delayed copies of the reset instead,
+  -- when the new vector gets to them.
+  constant X_RESET_DELAY: positive := 3*T + 1 + X_LATENCY;
+  constant OUTPUT_RESET_DELAY: positive := X_RESET_DELAY + L/2 + 1;
+
+  subtype t_half is std_logic_vector(H*WIDTH-1 downto 0);
+  type array_of_halves is array(natural range <>) of t_half;
+  subtype t_quarter is std_logic_vector(Q*WIDTH-1 downto 0);
+  type array_of_quarters is array(natural range <>) of t_quarter;
+
+  signal write_index: unsigned(LOG_L-1 downto 0);
+  signal write_quarter: unsigned(1 downto 0);
+  signal write_position: unsigned(LOG_L-3 downto 0);
+  signal write_bank: std_logic := '0';
+  signal double_write_address: unsigned(LOG_L-2 downto 0);
+
+  signal read_index: unsigned(LOG_L-1 downto 0);
+  signal read_position: unsigned(LOG_L-3 downto 0);
+  signal read_bank: std_logic := '0';
+  signal double_read_address: unsigned(LOG_L-2 downto 0);
+  signal toread_valid: std_logic;
+
+  signal fromread_data_a: array_of_halves(3 downto 0);
+  signal fromread_data_b: array_of_halves(3 downto 0);
+  signal fromread_upper: std_logic;
+  signal fromread_sub: std_logic;
+  signal fromread_halves: array_of_halves(3 downto 0);
+  signal fromread_quarters: array_of_quarters(3 downto 0);
+
+  subtype t_twiddle is std_logic_vector(twiddle_slv_width(TWIDDLE_WIDTH, GAUSS)-1 downto 0);
+  constant TW: positive := t_twiddle'length;
+  -- The twiddles for P3, P2 and P1 from the MSB, which are W^3k, W^k and
+  -- W^2k.
+  subtype t_stored_twiddle is std_logic_vector(3*TW-1 downto 0);
+  type array_of_stored_twiddles is array(natural range <>) of t_stored_twiddle;
+  subtype t_batch_of_twiddles is array_of_stored_twiddles(Q-1 downto 0);
+  type array_of_batches_of_twiddles is array(natural range <>) of t_batch_of_twiddles;
+  signal fromread_twiddles: t_batch_of_twiddles;
+
+  signal buffered_quarters: array_of_quarters(3 downto 0);
+  signal buffered_twiddles: t_batch_of_twiddles;
+  signal tobutterfly_quarters: array_of_quarters(3 downto 0);
+  signal tobutterfly_twiddles: t_batch_of_twiddles;
+
+  subtype t_mid is std_logic_vector(WIDTH+2-1 downto 0);
+  type array_of_mids is array(natural range <>) of t_mid;
+  subtype t_ocomponent is std_logic_vector(OUTPUT_WIDTH/2-1 downto 0);
+  type array_of_ocomponents is array(natural range <>) of t_ocomponent;
+  subtype t_oquarter is std_logic_vector(Q*OUTPUT_WIDTH-1 downto 0);
+  type array_of_oquarters is array(natural range <>) of t_oquarter;
+  subtype t_ohalf is std_logic_vector(H*OUTPUT_WIDTH-1 downto 0);
+
+  -- X(k), X(k+N/4), X(k+N/2) and X(k+3N/4) for the SIZE/4 positions.
+  signal x_quarters: array_of_oquarters(3 downto 0);
+  signal x_index: unsigned(LOG_L-1 downto 0);
+  signal held_quarters: array_of_oquarters(3 downto 0);
+  signal pending_a: t_ohalf;
+  signal pending_b: t_ohalf;
+  signal pending_position: unsigned(LOG_L-2 downto 0);
+  signal out_write_address: unsigned(LOG_L-1 downto 0);
+  signal out_write_data_a: t_ohalf;
+  signal out_write_data_b: t_ohalf;
+  signal out_valid: std_logic;
+  signal output_index: unsigned(LOG_L-1 downto 0);
+
+{% if twiddles_in_file %}
+  -- The twiddles are read from a file when the design is elaborated rather
+  -- than written out as an aggregate, which is slow to analyze for large N.
+  -- The file has a twiddle on each line, written as bits with the MSB
+  -- first, in order of batch and then lane.
+  constant TWIDDLE_FILENAME: string := "{{twiddle_filename}}";
+
+  impure function read_twiddles return array_of_batches_of_twiddles is
+    file twiddle_file: text open read_mode is TWIDDLE_FILENAME;
+    variable twiddle_line: line;
+    variable twiddle: bit_vector(t_stored_twiddle'range);
+    variable twiddles: array_of_batches_of_twiddles(L-1 downto 0);
+  begin
+    for batch_index in 0 to L-1 loop
+      for lane in 0 to Q-1 loop
+        readline(twiddle_file, twiddle_line);
+        read(twiddle_line, twiddle);
+        twiddles(batch_index)(lane) := to_stdlogicvector(twiddle);
+      end loop;
+    end loop;
+    return twiddles;
+  end function;
+
+  constant LOCAL_TWIDDLES: array_of_batches_of_twiddles(L-1 downto 0) := read_twiddles;
+{% else %}
+  constant LOCAL_TWIDDLES: array_of_batches_of_twiddles(L-1 downto 0) := ({% for twiddle_batch in twiddle_batches %}
+    {{loop.index0}} => ({% for twiddle in twiddle_batch %}
+       {{loop.index0}} => "{{twiddle}}"{% if not loop.last %},{% endif %}{% endfor %}
+       ){% if not loop.last %},{% endif %}{% endfor %}
+  );
+{% endif %}
+
+  signal i_reset_slv: std_logic_vector(0 downto 0);
+  signal x_reset_slv: std_logic_vector(0 downto 0);
+  signal output_reset_slv: std_logic_vector(0 downto 0);
+  signal o_reset_slv: std_logic_vector(0 downto 0);
+
+begin
+
+  assert SIZE >= 4 severity failure;
+  assert L >= 4 severity failure;
+
+  process(clk)
+  begin
+    if rising_edge(clk) then
+      if write_index = L-1 then
+        write_index <= (others => '0');
+      else
+        write_index <= write_index + 1;
+      end if;
+      -- The vector being written is read from the next clock cycle.
+      if read_index = L-1 then
+        read_index <= (others => '0');
+        read_bank <= write_bank;
+      else
+        read_index <= read_index + 1;
+      end if;
+      if x_index = L-1 then
+        x_index <= (others => '0');
+      else
+        x_index <= x_index + 1;
+      end if;
+      if output_index = L-1 then
+        output_index <= (others => '0');
+      else
+        output_index <= output_index + 1;
+      end if;
+      if (write_index = L-1) or (i_reset = '1') then
+        write_bank <= not write_bank;
+      end if;
+      if i_reset = '1' then
+        write_index <= (others => '0');
+        read_index <= to_unsigned(READ_RESET_INDEX, LOG_L);
+      end if;
+      if x_reset_slv(0) = '1' then
+        x_index <= (others => '0');
+      end if;
+      if output_reset_slv(0) = '1' then
+        output_index <= (others => '0');
+      end if;
+    end if;
+  end process;
+
+  write_quarter <= write_index(LOG_L-1 downto LOG_L-2);
+  write_position <= write_index(LOG_L-3 downto 0);
+
+  -- Each word is read on two clock cycles, a quarter of the positions at a
+  -- time.
+  toread_valid <= not read_index(0);
+  read_position <= read_index(LOG_L-2 downto 1);
+  double_write_address <= write_bank & write_position;
+  double_read_address <= read_bank & read_position;
+
+  -- P0 to P3 each have a memory for the first half of their positions
+  -- (which arrive on i_data_a) and one for the second half.  The second
+  -- half of P0 and P1 is still being read when the next vector overwrites
+  -- it so those memories hold two vectors.
+  loop_memories: for quarter in 0 to 3 generate
+    signal write_valid: std_logic;
+  begin
+    write_valid <= '1' when write_quarter = quarter else '0';
+
+    memory_a: entity work.memory
+      generic map (
+        DEPTH => T,
+        WIDTH => H*WIDTH,
+        ADDRESS_CLASH => "OLD",
+        STYLE => INPUT_MEMORY_STYLE
+        )
+      port map (
+        clk => clk,
+        toread_valid => toread_valid,
+        toread_address => read_position,
+        fromread_data => fromread_data_a(quarter),
+        write_valid => write_valid,
+        write_address => write_position,
+        write_data => i_data_a
+        );
+
+    single_b: if quarter >= 2 generate
+      memory_b: entity work.memory
+        generic map (
+          DEPTH => T,
+          WIDTH => H*WIDTH,
+          ADDRESS_CLASH => "OLD",
+          STYLE => INPUT_MEMORY_STYLE
+          )
+        port map (
+          clk => clk,
+          toread_valid => toread_valid,
+          toread_address => read_position,
+          fromread_data => fromread_data_b(quarter),
+          write_valid => write_valid,
+          write_address => write_position,
+          write_data => i_data_b
+          );
+    end generate;
+
+    double_b: if quarter < 2 generate
+      memory_b: entity work.memory
+        generic map (
+          DEPTH => 2*T,
+          WIDTH => H*WIDTH,
+          ADDRESS_CLASH => "OLD",
+          STYLE => DOUBLE_MEMORY_STYLE
+          )
+        port map (
+          clk => clk,
+          toread_valid => toread_valid,
+          toread_address => double_read_address,
+          fromread_data => fromread_data_b(quarter),
+          write_valid => write_valid,
+          write_address => double_write_address,
+          write_data => i_data_b
+          );
+    end generate;
+  end generate;
+
+  process(clk)
+  begin
+    if rising_edge(clk) then
+      fromread_twiddles <= LOCAL_TWIDDLES(to_integer(read_index));
+      fromread_upper <= read_index(LOG_L-1);
+      fromread_sub <= read_index(0);
+    end if;
+  end process;
+
+  loop_select: for quarter in 0 to 3 generate
+    fromread_halves(quarter) <= fromread_data_a(quarter) when fromread_upper = '0' else
+                                fromread_data_b(quarter);
+    fromread_quarters(quarter) <= fromread_halves(quarter)(Q*WIDTH-1 downto 0) when fromread_sub = '0' else
+                                  fromread_halves(quarter)(H*WIDTH-1 downto Q*WIDTH);
+  end generate;
+
+  yes_fromread_buffered: if STAGE_REG_FROMREAD_BUFFERED generate
+    process(clk)
+    begin
+      if rising_edge(clk) then
+        buffered_quarters <= fromread_quarters;
+        buffered_twiddles <= fromread_twiddles;
+      end if;
+    end process;
+  end generate;
+  no_fromread_buffered: if not STAGE_REG_FROMREAD_BUFFERED generate
+    buffered_quarters <= fromread_quarters;
+    buffered_twiddles <= fromread_twiddles;
+  end generate;
+
+  yes_buffered_tobutterfly: if STAGE_REG_BUFFERED_TOBUTTERFLY generate
+    process(clk)
+    begin
+      if rising_edge(clk) then
+        tobutterfly_quarters <= buffered_quarters;
+        tobutterfly_twiddles <= buffered_twiddles;
+      end if;
+    end process;
+  end generate;
+  no_buffered_tobutterfly: if not STAGE_REG_BUFFERED_TOBUTTERFLY generate
+    tobutterfly_quarters <= buffered_quarters;
+    tobutterfly_twiddles <= buffered_twiddles;
+  end generate;
+
+  loop_lanes: for lane in 0 to Q-1 generate
+    constant ZERO: std_logic_vector(WIDTH-1 downto 0) := (others => '0');
+    signal inputs: array_of_mids(3 downto 0);
+    signal delayed: std_logic_vector(WIDTH-1 downto 0);
+    signal e0_real: signed(WIDTH/2+1-1 downto 0);
+    signal e0_imag: signed(WIDTH/2+1-1 downto 0);
+    signal e1_real: signed(WIDTH/2+1-1 downto 0);
+    signal e1_imag: signed(WIDTH/2+1-1 downto 0);
+    signal o0_real: signed(WIDTH/2+1-1 downto 0);
+    signal o0_imag: signed(WIDTH/2+1-1 downto 0);
+    signal o1_real: signed(WIDTH/2+1-1 downto 0);
+    signal o1_imag: signed(WIDTH/2+1-1 downto 0);
+    signal x_real: array_of_ocomponents(3 downto 0);
+    signal x_imag: array_of_ocomponents(3 downto 0);
+  begin
+    -- P0 isn't rotated so it is just delayed to line up with the others.
+    delay_p0: entity work.shift_register
+      generic map (
+        WIDTH => WIDTH,
+        LENGTH => BUTTERFLY_LATENCY
+        )
+      port map (
+        clk => clk,
+        i_data => tobutterfly_quarters(0)((lane+1)*WIDTH-1 downto lane*WIDTH),
+        o_data => delayed
+        );
+    inputs(0) <= std_logic_vector(resize(signed(delayed(WIDTH-1 downto WIDTH/2)), WIDTH/2+1)) &
+                 std_logic_vector(resize(signed(delayed(WIDTH/2-1 downto 0)), WIDTH/2+1));
+
+    -- A butterfly with a zero input gives the product of the other input
+    -- and the twiddle, truncated in the same way as the radix-2 stages.
+    -- P1 is rotated by W^2k, P2 by W^k and P3 by W^3k.
+    loop_rotators: for quarter in 1 to 3 generate
+      rotator: entity work.butterfly
+        generic map (
+          WIDTH => WIDTH,
+          TWIDDLE_WIDTH => TWIDDLE_WIDTH,
+          MULT_LATENCY => MULT_LATENCY,
+          REG_I_P => BUTTERFLY_I_P,
+          REG_Q_R => BUTTERFLY_Q_R,
+          REG_R_S => BUTTERFLY_R_S,
+          REG_S_O => BUTTERFLY_S_O,
+          GAUSS => GAUSS
+        )
+        port map (
+          clk => clk,
+          i_a => ZERO,
+          i_b => tobutterfly_quarters(quarter)((lane+1)*WIDTH-1 downto lane*WIDTH),
+          i_t => tobutterfly_twiddles(lane)(quarter*TW-1 downto (quarter-1)*TW),
+          o_c => inputs(quarter),
+          o_d => open
+          );
+    end generate;
+
+    -- The two levels of butterflies with trivial twiddles.
+    process(clk)
+      variable a_real, a_imag, b_real, b_imag, c_real, c_imag, d_real, d_imag: signed(WIDTH/2+1-1 downto 0);
+    begin
+      if rising_edge(clk) then
+        a_real := signed(inputs(0)(WIDTH+2-1 downto WIDTH/2+1));
+        a_imag := signed(inputs(0)(WIDTH/2+1-1 downto 0));
+        b_real := signed(inputs(1)(WIDTH+2-1 downto WIDTH/2+1));
+        b_imag := signed(inputs(1)(WIDTH/2+1-1 downto 0));
+        c_real := signed(inputs(2)(WIDTH+2-1 downto WIDTH/2+1));
+        c_imag := signed(inputs(2)(WIDTH/2+1-1 downto 0));
+        d_real := signed(inputs(3)(WIDTH+2-1 downto WIDTH/2+1));
+        d_imag := signed(inputs(3)(WIDTH/2+1-1 downto 0));
+        -- The inputs fit in WIDTH/2 bits so these can't overflow.
+        e0_real <= a_real + b_real;
+        e0_imag <= a_imag + b_imag;
+        e1_real <= a_real - b_real;
+        e1_imag <= a_imag - b_imag;
+        o0_real <= c_real + d_real;
+        o0_imag <= c_imag + d_imag;
+        o1_real <= c_real - d_real;
+        o1_imag <= c_imag - d_imag;
+        x_real(0) <= std_logic_vector(resize(e0_real, WIDTH/2+2) + resize(o0_real, WIDTH/2+2));
+        x_imag(0) <= std_logic_vector(resize(e0_imag, WIDTH/2+2) + resize(o0_imag, WIDTH/2+2));
+        -- E1 - jO1
+        x_real(1) <= std_logic_vector(resize(e1_real, WIDTH/2+2) + resize(o1_imag, WIDTH/2+2));
+        x_imag(1) <= std_logic_vector(resize(e1_imag, WIDTH/2+2) - resize(o1_real, WIDTH/2+2));
+        x_real(2) <= std_logic_vector(resize(e0_real, WIDTH/2+2) - resize(o0_real, WIDTH/2+2));
+        x_imag(2) <= std_logic_vector(resize(e0_imag, WIDTH/2+2) - resize(o0_imag, WIDTH/2+2));
+        -- E1 + jO1
+        x_real(3) <= std_logic_vector(resize(e1_real, WIDTH/2+2) - resize(o1_imag, WIDTH/2+2));
+        x_imag(3) <= std_logic_vector(resize(e1_imag, WIDTH/2+2) + resize(o1_real, WIDTH/2+2));
+      end if;
+    end process;
+
+    loop_outputs: for output in 0 to 3 generate
+      x_quarters(output)((lane+1)*OUTPUT_WIDTH-1 downto lane*OUTPUT_WIDTH) <=
+        x_real(output) & x_imag(output);
+    end generate;
+  end generate;
+
+  -- A word of the output memories is made from two clock cycles of
+  -- outputs.  Output memory a holds X(k) for the first L/2 words and
+  -- X(k+N/4) for the next L/2, and memory b holds X(k+N/2) and X(k+3N/4).
+  -- The words for X(k) and X(k+N/2) are written as soon as they are
+  -- complete and the others on the next clock cycle.
+  process(clk)
+  begin
+    if rising_edge(clk) then
+      if x_index(0) = '0' then
+        held_quarters <= x_quarters;
+      else
+        pending_a <= x_quarters(1) & held_quarters(1);
+        pending_b <= x_quarters(3) & held_quarters(3);
+        pending_position <= x_index(LOG_L-1 downto 1);
+      end if;
+    end if;
+  end process;
+
+  out_write_address <= '0' & x_index(LOG_L-1 downto 1) when x_index(0) = '1' else
+                       '1' & pending_position;
+  out_write_data_a <= x_quarters(0) & held_quarters(0) when x_index(0) = '1' else
+                      pending_a;
+  out_write_data_b <= x_quarters(2) & held_quarters(2) when x_index(0) = '1' else
+                      pending_b;
+
+  out_valid <= '1';
+
+  output_memory_a: entity work.memory
+    generic map (
+      DEPTH => L,
+      WIDTH => H*OUTPUT_WIDTH,
+      ADDRESS_CLASH => "UNDEFINED",
+      STYLE => OUTPUT_MEMORY_STYLE
+      )
+    port map (
+      clk => clk,
+      toread_valid => out_valid,
+      toread_address => output_index,
+      fromread_data => o_data_a,
+      write_valid => out_valid,
+      write_address => out_write_address,
+      write_data => out_write_data_a
+      );
+
+  output_memory_b: entity work.memory
+    generic map (
+      DEPTH => L,
+      WIDTH => H*OUTPUT_WIDTH,
+      ADDRESS_CLASH => "UNDEFINED",
+      STYLE => OUTPUT_MEMORY_STYLE
+      )
+    port map (
+      clk => clk,
+      toread_valid => out_valid,
+      toread_address => output_index,
+      fromread_data => o_data_b,
+      write_valid => out_valid,
+      write_address => out_write_address,
+      write_data => out_write_data_b
+      );
+
+  i_reset_slv(0) <= i_reset;
+  x_reset_sr: entity work.shift_register
+    generic map (
+      WIDTH => 1,
+      LENGTH => X_RESET_DELAY
+      )
+    port map (
+      clk => clk,
+      i_data => i_reset_slv,
+      o_data => x_reset_slv
+      );
+
+  output_reset_sr: entity work.shift_register
+    generic map (
+      WIDTH => 1,
+      LENGTH => OUTPUT_RESET_DELAY - X_RESET_DELAY
+      )
+    port map (
+      clk => clk,
+      i_data => x_reset_slv,
+      o_data => output_reset_slv
+      );
+
+  -- The output memories have a clock cycle of read latency.
+  o_reset_sr: entity work.shift_register
+    generic map (
+      WIDTH => 1,
+      LENGTH => 1
+      )
+    port map (
+      clk => clk,
+      i_data => output_reset_slv,
+      o_data => o_reset_slv
+      );
+  o_reset <= o_reset_slv(0);
+
+end architecture;
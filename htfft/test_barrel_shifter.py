@@ -40,7 +40,7 @@ async def check_data(dut, size, shift_increment, pipeline_length):
         await triggers.RisingEdge(dut.clk)
 
 
-def get_test_params(n_tests, base_seed=0):
+def get_test_params(n_tests, base_seed=0, n_seeds=1):
     for test_index in range(n_tests):
         seed = (base_seed + test_index) * 4353453
         rnd = Random(seed)
@@ -58,6 +58,7 @@ def get_test_params(n_tests, base_seed=0):
             'test_index': test_index,
             'n_data': n_data,
             'seed': seed,
+            'seeds': helper.get_seeds(rnd, seed, n_seeds),
             'core_name': 'barrel_shifter',
             'top_name': 'barrel_shifter',
             'test_module_name': 'test_barrel_shifter',
@@ -66,11 +67,15 @@ def get_test_params(n_tests, base_seed=0):
         yield test_params
 
 
-@cocotb.test()
-async def barrel_shifter_test(dut):
+async def barrel_shifter_test(dut, seed):
+    """
+    The barrel shifter has no reset.  The checker ignores the outputs for
+    the first `pipeline_length` cycles so data left in the pipeline by a
+    previous seed is flushed.
+    """
     test_params = helper.get_test_params()
     generics = test_params['generics']
-    rnd = Random(test_params['seed'])
+    rnd = Random(seed)
     n_data = test_params['n_data']
 
     cocotb.fork(clock.Clock(dut.clk, 2, 'ns').start())
@@ -96,6 +101,9 @@ async def barrel_shifter_test(dut):
         await triggers.RisingEdge(dut.clk)
 
 
+helper.generate_seed_tests(barrel_shifter_test)
+
+
 def run_test(test_params, wave=False):
     working_directory = os.path.abspath(os.path.join(
         'temp', 'test_barrel_shifter_{}'.format(test_params['test_index'])))
@@ -117,8 +125,8 @@ def test_htfft(test_params):
     run_test(test_params, wave=False)
 
 
-def run_tests(n_tests=10):
-    for test_params in get_test_params(n_tests=n_tests):
+def run_tests(n_tests=10, n_seeds=1):
+    for test_params in get_test_params(n_tests=n_tests, n_seeds=n_seeds):
         run_test(test_params, wave=False)
 
 
@@ -7,18 +7,29 @@ import pytest
 import cocotb
 from cocotb import clock, triggers
 
-from htfft import helper, conversions
+from htfft import helper, conversions, model, twiddles
 
 basedir = os.path.abspath(os.path.dirname(__file__))
 
-async def send_data(rnd, dut, width, sent_queue):
+def get_twiddle_slv(t, width, gauss):
+    if gauss:
+        real, imag = model.complex_to_ints([t], width)
+        return int(twiddles.to_gauss_strs(real, imag, width)[0], 2)
+    return conversions.complex_to_slv(t, width)
+
+
+async def send_data(rnd, dut, width, sent_queue, trivial=False, gauss=False):
     while True:
         a = helper.random_complex(rnd, width)
         b = helper.random_complex(rnd, width)
-        t = helper.random_complex(rnd, width)
+        if trivial:
+            # The trivial_butterfly only supports twiddles of 1 and -j.
+            t = rnd.choice([1, -1j])
+        else:
+            t = helper.random_complex(rnd, width)
         dut.i_a <= conversions.complex_to_slv(a, width)
         dut.i_b <= conversions.complex_to_slv(b, width)
-        dut.i_t <= conversions.complex_to_slv(t, width)
+        dut.i_t <= get_twiddle_slv(t, width, gauss)
         sent_queue.append((a, b, t))
         await triggers.RisingEdge(dut.clk)
 
@@ -64,10 +75,13 @@ def get_latency(generics):
     return latency
 
 
-@cocotb.test()
-async def butterfly_test(dut):
+async def butterfly_test(dut, seed):
+    """
+    The butterfly has no reset.  The checker ignores the outputs for the
+    first `latency` cycles so data left in the pipeline by a previous seed
+    is flushed.
+    """
     test_params = helper.get_test_params()
-    seed = test_params['seed']
     generics = test_params['generics']
     width = generics['width']
     latency = get_latency(generics)
@@ -75,13 +89,16 @@ async def butterfly_test(dut):
     cocotb.fork(clock.Clock(dut.clk, 2, 'ns').start())
     await triggers.RisingEdge(dut.clk)
     sent_queue = collections.deque()
-    cocotb.fork(send_data(rnd, dut, width, sent_queue))
+    cocotb.fork(send_data(rnd, dut, width, sent_queue, test_params['trivial'], generics['gauss']))
     cocotb.fork(check_data(dut, width, sent_queue, latency))
     for i in range(test_params['n_data'] + latency):
         await triggers.RisingEdge(dut.clk)
 
 
-def get_test_params(n_tests, base_seed=0):
+helper.generate_seed_tests(butterfly_test)
+
+
+def get_test_params(n_tests, base_seed=0, n_seeds=1):
     for test_index in range(n_tests):
         seed = (base_seed + test_index) * 2391
         rnd = Random(seed)
@@ -95,12 +112,19 @@ def get_test_params(n_tests, base_seed=0):
             'reg_r_s': rnd.choice([True, False]),
             'reg_s_o': rnd.choice([True, False]),
             }
+        trivial = rnd.choice([True, False])
+        generics['gauss'] = rnd.choice([True, False])
+        # The seeds are drawn last so the configuration doesn't depend on
+        # n_seeds.
+        seeds = helper.get_seeds(rnd, seed, n_seeds)
         test_params = {
             'test_index': test_index,
             'n_data': 100,
             'seed': seed,
+            'seeds': seeds,
+            'trivial': trivial,
             'core_name': 'butterfly',
-            'top_name': 'butterfly',
+            'top_name': 'trivial_butterfly' if trivial else 'butterfly',
             'test_module_name': 'test_butterfly',
             'generics': generics,
             }
@@ -128,8 +152,8 @@ def test_htfft(test_params):
     run_test(test_params, wave=False)
 
 
-def run_tests(n_tests=10):
-    for test_params in get_test_params(n_tests=n_tests):
+def run_tests(n_tests=10, n_seeds=1):
+    for test_params in get_test_params(n_tests=n_tests, n_seeds=n_seeds):
         run_test(test_params, wave=True)
 
 
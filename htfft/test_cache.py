@@ -0,0 +1,69 @@
+import os
+
+import pytest
+
+from htfft import cache
+
+
+@pytest.fixture
+def cache_dir(tmp_path, monkeypatch):
+    directory = tmp_path / 'cache'
+    monkeypatch.setenv('HTFFT_CACHE_DIR', str(directory))
+    monkeypatch.delenv('HTFFT_CACHE_DISABLE', raising=False)
+    return directory
+
+
+def make_files(directory, names, size=100):
+    os.makedirs(directory, exist_ok=True)
+    filenames = []
+    for name in names:
+        filename = os.path.join(directory, name)
+        with open(filename, 'w') as f:
+            f.write(name * size)
+        filenames.append(filename)
+    return filenames
+
+
+def test_store_and_lookup(cache_dir, tmp_path):
+    core_filename = make_files(tmp_path / 'cores', ['a.core'])[0]
+    key = cache.get_key('a', core_filename=core_filename)
+    assert cache.lookup(key, str(tmp_path / 'work')) is None
+    # The order of the files must be kept since it's the compile order.
+    filenames = make_files(tmp_path / 'src', ['z.vhd', 'b.vhd', 'm.vhd'])
+    cache.store(key, filenames)
+    cached = cache.lookup(key, str(tmp_path / 'work'))
+    assert [os.path.basename(f) for f in cached] == ['z.vhd', 'b.vhd', 'm.vhd']
+    for filename, cached_filename in zip(filenames, cached):
+        with open(filename) as f, open(cached_filename) as g:
+            assert f.read() == g.read()
+
+
+def test_key(cache_dir, tmp_path, monkeypatch):
+    core_filename = make_files(tmp_path / 'cores', ['a.core'])[0]
+    key = cache.get_key('a', core_filename=core_filename)
+    assert key == cache.get_key('a', core_filename=core_filename)
+    assert key != cache.get_key('b', core_filename=core_filename)
+    with open(core_filename, 'a') as f:
+        f.write('changed')
+    assert key != cache.get_key('a', core_filename=core_filename)
+    assert cache.get_key('core_that_does_not_exist') is None
+    monkeypatch.setenv('HTFFT_CACHE_DISABLE', '1')
+    assert cache.get_key('a', core_filename=core_filename) is None
+
+
+def test_eviction(cache_dir, tmp_path):
+    keys = ['key{}'.format(index) for index in range(4)]
+    for index, key in enumerate(keys):
+        filenames = make_files(tmp_path / 'src{}'.format(index), ['f{}.vhd'.format(index)])
+        cache.store(key, filenames)
+        os.utime(os.path.join(str(cache_dir), key, cache.MANIFEST_FILENAME),
+                 (1000 + index, 1000 + index))
+    # Using the oldest entry makes it the most recently used.
+    assert cache.lookup(keys[0], str(tmp_path / 'work')) is not None
+    entry_bytes = max(n_bytes for last_used, n_bytes, directory in cache.get_entries())
+    cache.evict(2*entry_bytes)
+    remaining = sorted(os.path.basename(directory)
+                       for last_used, n_bytes, directory in cache.get_entries())
+    assert remaining == [keys[0], keys[3]]
+    cache.clear()
+    assert cache.get_entries() == []
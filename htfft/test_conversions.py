@@ -0,0 +1,54 @@
+from random import Random
+
+import numpy
+import pytest
+
+from htfft import helper, conversions
+
+
+def get_test_params(n_tests, base_seed=0):
+    for test_index in range(n_tests):
+        seed = (base_seed + test_index) * 8741
+        rnd = Random(seed)
+        test_params = {
+            'seed': seed,
+            'width': rnd.randint(2, 30)*2,
+            'size': rnd.choice([1, 2, 4, 8, 16, 32]),
+            'n_vectors': rnd.randint(1, 20),
+            'exact': rnd.choice([True, False]),
+            }
+        yield test_params
+
+
+@pytest.mark.parametrize('test_params', get_test_params(n_tests=20))
+def test_complex_array(test_params):
+    rnd = Random(test_params['seed'])
+    width = test_params['width']
+    size = test_params['size']
+    vectors = [[helper.random_complex(rnd, width, exact=test_params['exact'])
+                for index in range(size)]
+               for vector_index in range(test_params['n_vectors'])]
+    # Make sure the extremes are covered.
+    vectors[0][0] = 1
+    vectors[-1][-1] = -1j
+    expected_slvs = [conversions.list_of_complex_to_slv(vector, width) for vector in vectors]
+    slvs = conversions.complex_array_to_slv(numpy.array(vectors), width)
+    assert slvs == expected_slvs
+    expected_values = [conversions.list_of_complex_from_slv(slv, width, size)
+                       for slv in expected_slvs]
+    values = conversions.complex_array_from_slv(slvs, width, size)
+    assert values.tolist() == expected_values
+
+
+@pytest.mark.parametrize('test_params', get_test_params(n_tests=20))
+def test_uint_array(test_params):
+    rnd = Random(test_params['seed'])
+    width = test_params['width']
+    size = test_params['size']
+    vectors = [[rnd.randint(0, pow(2, width)-1) for index in range(size)]
+               for vector_index in range(test_params['n_vectors'])]
+    expected_slvs = [conversions.list_of_uints_to_slv(vector, width) for vector in vectors]
+    slvs = conversions.uint_array_to_slv(numpy.array(vectors), width)
+    assert slvs == expected_slvs
+    values = conversions.uint_array_from_slv(slvs, width, size)
+    assert values.tolist() == vectors
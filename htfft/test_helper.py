@@ -0,0 +1,39 @@
+import numpy
+import pytest
+
+from htfft import helper, conversions
+
+
+@pytest.mark.parametrize('width', [4, 8, 16, 32])
+@pytest.mark.parametrize('exact', [True, False])
+def test_random_complex_array(width, exact):
+    rng = numpy.random.default_rng(width)
+    values = helper.random_complex_array(rng, width, (20, 64), exact=exact)
+    assert values.shape == (20, 64)
+    assert numpy.all(numpy.abs(values) <= 1)
+    # The values fill the unit circle rather than being clustered.
+    assert numpy.abs(numpy.mean(values)) < 0.1
+    assert numpy.max(numpy.abs(values)) > 0.9
+    if exact:
+        slvs = conversions.complex_array_to_slv(values, width)
+        assert numpy.array_equal(conversions.complex_array_from_slv(slvs, width, 64), values)
+
+
+def test_random_complex_blocks():
+    blocks_a = helper.random_complex_blocks(seed=5, width=16, n=32, block_size=10)
+    blocks_b = helper.random_complex_blocks(seed=5, width=16, n=32, block_size=10)
+    first_a = next(blocks_a)
+    assert numpy.array_equal(first_a, next(blocks_b))
+    assert not numpy.array_equal(first_a, next(blocks_a))
+
+
+def test_get_memory_style():
+    assert helper.get_memory_style(1, 1000) == 'registers'
+    assert helper.get_memory_style(2, 100) == 'distributed'
+    assert helper.get_memory_style(128, 432) == 'block'
+    assert helper.get_memory_style(4096, 384) == 'ultra'
+    thresholds = {'registers_max_depth': 2, 'block_max_bits': pow(2, 30)}
+    assert helper.get_memory_style(2, 100, thresholds) == 'registers'
+    assert helper.get_memory_style(4096, 384, thresholds) == 'block'
+    with pytest.raises(AssertionError):
+        helper.get_memory_style(2, 100, {'lutram_max_bits': 10})
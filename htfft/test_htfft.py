@@ -5,11 +5,12 @@ from random import Random
 import collections
 import pytest
 
+import numpy
 from numpy import fft
 import cocotb
 from cocotb import clock, triggers
 
-from htfft import helper, conversions
+from htfft import helper, conversions, model, floats
 import htfft_gen
 
 basedir = os.path.abspath(os.path.dirname(__file__))
@@ -25,49 +26,161 @@ def get_expected_discrepancy(input_width, n):
     return expected_error
 
 
-async def send_data(rnd, dut, sent_queue, n, spcc, input_width):
-    while True:
-        values = [helper.random_complex(rnd, input_width)
-                  for i in range(n)]
+def get_expected_float_discrepancy(float_format, n):
+    """
+    A bound on the RMS error of a floating point HTFFT for inputs with
+    magnitudes up to 1.  The outputs grow like sqrt(n) and each level adds
+    a rounding error relative to them.
+    """
+    exponent_width, fraction_width = floats.get_format(float_format)
+    return pow(2, -fraction_width) * math.sqrt(n) * helper.logceil(n)
+
+
+def check_vectors(values, received_slvs, n, spcc, input_width, width_schedule=None, gauss=False,
+                  natural_order=True, inverse=False, received_exponents=None, float_format=None,
+                  radix22=False):
+    """
+    Checks the output words for a block of vectors against the model and
+    against numpy's FFT.  `values` are the sent complex vectors.
+    Without `natural_order` the output is expected in model.output_order.
+    With `inverse` the comparison is with numpy's inverse FFT.
+    The comparison with numpy's FFT is skipped when there is a width schedule
+    since the precision then depends on the schedule.
+    `received_exponents` are given when the HTFFT uses block floating point.
+    With a `float_format` the samples are pairs of floats.
+    With `radix22` the HTFFT has radix-2^2 stages.
+    """
+    n_vectors = len(values)
+    if float_format:
+        check_float_vectors(values, received_slvs, n, spcc, float_format, natural_order, inverse)
+        return
+    block_floating_point = received_exponents is not None
+    if block_floating_point:
+        width_schedule = helper.get_block_floating_point_schedule(n, spcc)
+    stage_widths, output_width, log_gain = helper.get_stage_widths(
+        n, spcc, input_width, width_schedule)
+    assert len(received_slvs) == n_vectors * n//spcc
+    # The model should match the hardware exactly.
+    input_ints = model.complex_to_ints(values, input_width)
+    if block_floating_point:
+        expected_ints, expected_exponents = model.htfft_block_floating_point(
+            input_ints, n, spcc, input_width, gauss, natural_order, inverse)
+        assert numpy.array_equal(expected_exponents, received_exponents)
+    else:
+        expected_ints = model.htfft(input_ints, n, spcc, input_width, width_schedule, gauss,
+                                    natural_order, inverse, radix22=radix22)
+    received_ints = model.ints_from_slv(received_slvs, output_width, spcc)
+    for expected_component, received_component in zip(expected_ints, received_ints):
+        assert numpy.array_equal(expected_component, received_component.reshape(n_vectors, n))
+    if width_schedule is not None and not block_floating_point:
+        return
+    received = model.ints_to_complex(received_ints, output_width).reshape(n_vectors, n) * n
+    allowed = 2 * get_expected_discrepancy(input_width=input_width, n=n)
+    if block_floating_point:
+        received = received / numpy.power(2.0, received_exponents)[:, numpy.newaxis]
+        # Removing an LSB before each stage makes the error grow faster with n.
+        allowed = 2 * allowed * pow(1.25, helper.logceil(n))
+    if inverse:
+        expected = fft.ifft(values, axis=1) * n
+    else:
+        expected = fft.fft(values, axis=1)
+    if not natural_order:
+        expected = expected[:, model.output_order(n, spcc)]
+    discrepancies = numpy.sqrt(numpy.mean(numpy.abs(received - expected)**2, axis=1))
+    assert numpy.all(discrepancies < allowed)
+
+
+def check_float_vectors(values, received_slvs, n, spcc, float_format, natural_order=True,
+                        inverse=False):
+    """
+    Checks the output words of a floating point HTFFT against the model and
+    against numpy's FFT.  The output isn't scaled down by `n`.
+    """
+    n_vectors = len(values)
+    input_width = 2*floats.get_width(float_format)
+    assert len(received_slvs) == n_vectors * n//spcc
+    input_floats = model.complex_to_floats(values, float_format)
+    expected_floats = model.htfft(input_floats, n, spcc, input_width, natural_order=natural_order,
+                                  inverse=inverse, float_format=float_format)
+    received_floats = model.floats_from_slv(received_slvs, float_format, spcc)
+    for expected_component, received_component in zip(expected_floats, received_floats):
+        assert numpy.array_equal(expected_component, received_component.reshape(n_vectors, n))
+    received = conversions.float_array_from_slv(received_slvs, float_format, spcc).reshape(n_vectors, n)
+    quantized = model.floats_to_complex(input_floats, float_format)
+    if inverse:
+        expected = fft.ifft(quantized, axis=1) * n
+    else:
+        expected = fft.fft(quantized, axis=1)
+    if not natural_order:
+        expected = expected[:, model.output_order(n, spcc)]
+    discrepancies = numpy.sqrt(numpy.mean(numpy.abs(received - expected)**2, axis=1))
+    assert numpy.all(discrepancies < get_expected_float_discrepancy(float_format, n))
+
+
+async def send_data(seed, dut, sent_queue, n, spcc, input_width, block_size, scale_vectors=False,
+                    float_format=None, channels=None):
+    """
+    With `scale_vectors` each vector is scaled down by a random power of two
+    so that they have different block floating point exponents.
+    With a `float_format` the samples are sent as pairs of floats.
+    `channels` are the channel tags given to the vectors in turn.
+    """
+    rng = numpy.random.default_rng(seed)
+    vector_index = 0
+    for values in helper.random_complex_blocks(seed, input_width, n, block_size):
+        if scale_vectors:
+            shifts = rng.integers(0, input_width//2-2, size=block_size)
+            values = values / numpy.power(2.0, shifts)[:, numpy.newaxis]
         sent_queue.append(values)
-        lumps = [values[index*spcc: (index+1)*spcc]
-                 for index in range(n//spcc)]
-        dut.i_first <= 1
-        for lump in lumps:
-            lump_as_slv = conversions.list_of_complex_to_slv(lump, input_width)
-            dut.i_data <= lump_as_slv
+        if float_format:
+            words = conversions.float_array_to_slv(values.reshape(block_size*n//spcc, spcc), float_format)
+        else:
+            words = conversions.complex_array_to_slv(values.reshape(block_size*n//spcc, spcc), input_width)
+        for word_index, word in enumerate(words):
+            if word_index % (n//spcc) == 0:
+                dut.i_first <= 1
+                if channels is not None:
+                    dut.i_channel <= channels[vector_index % len(channels)]
+                vector_index += 1
+            else:
+                dut.i_first <= 0
+            dut.i_data <= word
             await triggers.RisingEdge(dut.clk)
-            dut.i_first <= 0
 
 
-async def check_data(rnd, dut, sent_queue, n, spcc, input_width, output_width, n_vectors):
+async def check_data(dut, sent_queue, n, spcc, input_width, n_vectors, width_schedule=None,
+                     gauss=False, natural_order=True, inverse=False, block_floating_point=False,
+                     float_format=None, channels=None, radix22=False):
     assert n % spcc == 0
     n_lumps = n//spcc
     await triggers.ReadOnly()
-    expected_discrepancy = get_expected_discrepancy(input_width=input_width, n=n)
-    discrepancies = []
+    received_slvs = []
+    received_exponents = []
+    received_channels = []
     for vector_index in range(n_vectors):
         while True:
             if str(dut.o_first.value) == '1':
                 break
             await triggers.RisingEdge(dut.clk)
             await triggers.ReadOnly()
-        received_data = []
+        if block_floating_point:
+            received_exponents.append(dut.o_exponent.value.integer)
+        if channels is not None:
+            received_channels.append(dut.o_channel.value.integer)
         for lump_index in range(n_lumps):
             assert dut.o_first.value == (1 if lump_index == 0 else 0)
-            complexes = conversions.list_of_complex_from_slv(
-                dut.o_data.value.integer, output_width, spcc)
-            received_data += [x * n for x in complexes]
+            received_slvs.append(dut.o_data.value.integer)
             await triggers.RisingEdge(dut.clk)
             await triggers.ReadOnly()
-        sent_data = sent_queue.popleft()
-        expected_data = fft.fft(sent_data)
-        assert len(received_data) == len(expected_data)
-        assert len(received_data) == n
-        discrepancy = pow(sum(pow(abs(a-b), 2)
-                              for a, b in zip(received_data, expected_data))/n, 0.5)
-        discrepancies.append(discrepancy)
-        assert discrepancy < 2 * expected_discrepancy
+    sent_values = numpy.concatenate(list(sent_queue))[:n_vectors]
+    if channels is not None:
+        assert received_channels == channels[:n_vectors]
+    if block_floating_point:
+        received_exponents = numpy.array(received_exponents)
+    else:
+        received_exponents = None
+    check_vectors(sent_values, received_slvs, n, spcc, input_width, width_schedule, gauss,
+                  natural_order, inverse, received_exponents, float_format, radix22)
 
 
 @cocotb.test()
@@ -78,18 +191,42 @@ async def htfft_test(dut):
     n = generation_params['n']
     input_width = generation_params['input_width']
     n_vectors = test_params['n_vectors']
-    output_width = input_width + 2*helper.logceil(n)
     seed = test_params['seed']
-    rnd = Random(seed)
     cocotb.fork(clock.Clock(dut.clk, 2, 'ns').start())
     await triggers.RisingEdge(dut.clk)
     dut.reset <= 1
     await triggers.RisingEdge(dut.clk)
     dut.reset <= 0
+    block_floating_point = generation_params.get('block_floating_point', False)
+    float_format = generation_params.get('float_format', None)
+    channels = test_params.get('channels', None)
     sent_queue = collections.deque()
-    cocotb.fork(send_data(rnd, dut, sent_queue, n, spcc, input_width,))
-    await cocotb.fork(check_data(rnd, dut, sent_queue, n, spcc,
-                                 input_width, output_width, n_vectors=n_vectors))
+    cocotb.fork(send_data(seed, dut, sent_queue, n, spcc, input_width, block_size=n_vectors,
+                          scale_vectors=block_floating_point, float_format=float_format,
+                          channels=channels))
+    await cocotb.fork(check_data(dut, sent_queue, n, spcc, input_width, n_vectors=n_vectors,
+                                 width_schedule=generation_params.get('width_schedule', None),
+                                 gauss=generation_params.get('gauss', False),
+                                 natural_order=generation_params.get('natural_order', True),
+                                 inverse=generation_params.get('inverse', False),
+                                 block_floating_point=block_floating_point,
+                                 float_format=float_format, channels=channels,
+                                 radix22=generation_params.get('radix22', False)))
+
+
+# Parameters that are fixed for some test indices so that every run covers
+# them.  The random choices are still drawn so the other indices don't change.
+FIXED_PARAMS = {
+    # Radix-2^2 stages with an even and an odd number of stages.
+    0: {'n': 64, 'spcc': 4, 'radix22': True, 'gauss': True, 'twiddles_in_file': False,
+        'float_format': None},
+    1: {'n': 256, 'spcc': 8, 'radix22': True, 'gauss': False, 'twiddles_in_file': True,
+        'float_format': None},
+    # float32 has wider mantissas than float16.
+    2: {'float_format': 'float32'},
+    # The folded twiddle table without gauss.
+    3: {'compress_twiddles': True, 'gauss': False, 'radix22': False, 'float_format': None},
+    }
 
 
 def get_test_params(n_tests, base_seed=0):
@@ -97,21 +234,64 @@ def get_test_params(n_tests, base_seed=0):
         seed = (base_seed + test_index) * 123214
         rnd = Random(seed)
         suffix = '_{}_test'.format(test_index)
-        n = rnd.choice([8, 16, 32, 64, 128, 256])
+        fixed = FIXED_PARAMS.get(test_index, {})
+        n = fixed.get('n', rnd.choice([8, 16, 32, 64, 128, 256]))
         possible_spcc = [spcc for spcc in (2, 4, 8, 16, 32)
                          if helper.logceil(spcc) <= helper.logceil(n)/2]
-        spcc = rnd.choice(possible_spcc)
+        spcc = fixed.get('spcc', rnd.choice(possible_spcc))
         input_width = rnd.choice([8, 32])
+        block_floating_point = rnd.choice([True, False])
+        if block_floating_point:
+            width_schedule = None
+        else:
+            width_schedule = htfft_gen.random_width_schedule(rnd, n, spcc, input_width)
         generation_params = {
             'suffix': suffix,
             'n': n,
             'spcc': spcc,
             'input_width': input_width,
             'pipelines': htfft_gen.random_pipeline(rnd, spcc),
+            'width_schedule': width_schedule,
+            'gauss': rnd.choice([True, False]),
+            'compress_twiddles': rnd.choice([True, False]),
+            'twiddles_in_file': rnd.choice([True, False]),
+            'natural_order': rnd.choice([True, False]),
+            'inverse': rnd.choice([True, False]),
+            'block_floating_point': block_floating_point,
             }
+        float_format = fixed.get('float_format', rnd.choice([None, None, 'float16', 'float32']))
+        if float_format:
+            generation_params.update({
+                'input_width': 2*floats.get_width(float_format),
+                'width_schedule': None,
+                'gauss': False,
+                'compress_twiddles': False,
+                'block_floating_point': False,
+                'float_format': float_format,
+                })
+            generation_params['pipelines']['butterfly']['add_latency'] = rnd.randint(0, 3)
         n_vectors = 10
+        n_channels = rnd.choice([None, 3, 8])
+        if n_channels:
+            generation_params['n_channels'] = n_channels
+            channels = [rnd.randrange(n_channels) for vector_index in range(n_vectors)]
+        else:
+            channels = None
+        if (spcc >= 4 and width_schedule is None and not generation_params['block_floating_point']
+                and not float_format):
+            generation_params['radix22'] = rnd.choice([True, False])
+            if generation_params['radix22']:
+                generation_params['compress_twiddles'] = False
+        if fixed.get('radix22'):
+            generation_params.update({
+                'width_schedule': None,
+                'compress_twiddles': False,
+                'block_floating_point': False,
+                })
+        generation_params.update(fixed)
         test_params = {
             'n_vectors': n_vectors,
+            'channels': channels,
             'seed': seed,
             'core_name': 'htfft' + suffix,
             'top_name': 'htfft' + suffix,
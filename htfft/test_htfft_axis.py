@@ -0,0 +1,233 @@
+"""
+Tests the AXI4-Stream wrapper htfft{suffix}_axis with random gaps in
+s_axis_tvalid and random backpressure on m_axis_tready.
+"""
+import os
+import shutil
+import collections
+from random import Random
+import pytest
+
+import numpy
+import cocotb
+from cocotb import clock, triggers
+
+from htfft import helper, conversions, floats, test_htfft
+import htfft_gen
+
+basedir = os.path.abspath(os.path.dirname(__file__))
+
+
+async def send_data(seed, dut, sent_queue, stalls, n, spcc, input_width, n_vectors,
+                    valid_probability, scale_vectors=False, float_format=None, channels=None):
+    """
+    Sends `n_vectors` vectors, leaving s_axis_tvalid low with probability
+    1-`valid_probability` before each word.  The clock cycles where a word
+    was offered but not accepted are counted in `stalls`.
+    """
+    rnd = Random(seed)
+    rng = numpy.random.default_rng(seed)
+    n_words = n//spcc
+    values = helper.random_complex_array(rng, input_width, (n_vectors, n))
+    if scale_vectors:
+        shifts = rng.integers(0, input_width//2-2, size=n_vectors)
+        values = values / numpy.power(2.0, shifts)[:, numpy.newaxis]
+    sent_queue.append(values)
+    if float_format:
+        words = conversions.float_array_to_slv(values.reshape(n_vectors*n_words, spcc), float_format)
+    else:
+        words = conversions.complex_array_to_slv(values.reshape(n_vectors*n_words, spcc), input_width)
+    for word_index, word in enumerate(words):
+        while rnd.random() >= valid_probability:
+            dut.s_axis_tvalid <= 0
+            await triggers.RisingEdge(dut.clk)
+        dut.s_axis_tvalid <= 1
+        dut.s_axis_tdata <= word
+        dut.s_axis_tlast <= (1 if word_index % n_words == n_words-1 else 0)
+        if channels is not None:
+            dut.s_axis_tid <= channels[word_index // n_words]
+        while True:
+            await triggers.ReadOnly()
+            accepted = dut.s_axis_tready.value == 1
+            await triggers.RisingEdge(dut.clk)
+            if accepted:
+                break
+            stalls.append(word_index)
+    dut.s_axis_tvalid <= 0
+
+
+async def check_data(seed, dut, sent_queue, n, spcc, input_width, n_vectors, ready_probability,
+                     gauss=False, natural_order=True, inverse=False, block_floating_point=False,
+                     float_format=None, channels=None, full_throughput=False):
+    """
+    Receives `n_vectors` vectors with m_axis_tready high with probability
+    `ready_probability` and checks tlast, tuser and tid as well as the data.
+    With `full_throughput` the output words must be on consecutive clock
+    cycles.
+    """
+    rnd = Random(seed+1)
+    n_words = n//spcc
+    index_width = helper.logceil(n_words)
+    received_slvs = []
+    received_exponents = []
+    received_channels = []
+    transfer_cycles = []
+    cycle = 0
+    while len(received_slvs) < n_vectors * n_words:
+        await triggers.RisingEdge(dut.clk)
+        cycle += 1
+        dut.m_axis_tready <= (1 if rnd.random() < ready_probability else 0)
+        await triggers.ReadOnly()
+        if not (dut.m_axis_tvalid.value == 1 and dut.m_axis_tready.value == 1):
+            continue
+        word_index = len(received_slvs) % n_words
+        tuser = dut.m_axis_tuser.value.integer
+        assert tuser % n_words == word_index
+        assert dut.m_axis_tlast.value == (1 if word_index == n_words-1 else 0)
+        if word_index == 0:
+            if block_floating_point:
+                received_exponents.append(tuser >> index_width)
+            if channels is not None:
+                received_channels.append(dut.m_axis_tid.value.integer)
+        else:
+            if block_floating_point:
+                assert tuser >> index_width == received_exponents[-1]
+            if channels is not None:
+                assert dut.m_axis_tid.value.integer == received_channels[-1]
+        received_slvs.append(dut.m_axis_tdata.value.integer)
+        transfer_cycles.append(cycle)
+    if full_throughput:
+        assert transfer_cycles[-1] - transfer_cycles[0] == len(transfer_cycles) - 1
+    sent_values = numpy.concatenate(list(sent_queue))[:n_vectors]
+    if channels is not None:
+        assert received_channels == channels[:n_vectors]
+    if block_floating_point:
+        received_exponents = numpy.array(received_exponents)
+    else:
+        received_exponents = None
+    test_htfft.check_vectors(sent_values, received_slvs, n, spcc, input_width, None, gauss,
+                             natural_order, inverse, received_exponents, float_format)
+
+
+@cocotb.test()
+async def htfft_axis_test(dut):
+    test_params = helper.get_test_params()
+    generation_params = test_params['generation']
+    spcc = generation_params['spcc']
+    n = generation_params['n']
+    input_width = generation_params['input_width']
+    n_vectors = test_params['n_vectors']
+    seed = test_params['seed']
+    full_throughput = test_params['valid_probability'] == 1 and test_params['ready_probability'] == 1
+    cocotb.fork(clock.Clock(dut.clk, 2, 'ns').start())
+    dut.s_axis_tvalid <= 0
+    dut.m_axis_tready <= 0
+    await triggers.RisingEdge(dut.clk)
+    dut.reset <= 1
+    await triggers.RisingEdge(dut.clk)
+    dut.reset <= 0
+    block_floating_point = generation_params.get('block_floating_point', False)
+    float_format = generation_params.get('float_format', None)
+    channels = test_params.get('channels', None)
+    sent_queue = collections.deque()
+    stalls = []
+    cocotb.fork(send_data(seed, dut, sent_queue, stalls, n, spcc, input_width, n_vectors,
+                          test_params['valid_probability'], scale_vectors=block_floating_point,
+                          float_format=float_format, channels=channels))
+    await cocotb.fork(check_data(seed, dut, sent_queue, n, spcc, input_width, n_vectors,
+                                 test_params['ready_probability'],
+                                 gauss=generation_params.get('gauss', False),
+                                 natural_order=generation_params.get('natural_order', True),
+                                 inverse=generation_params.get('inverse', False),
+                                 block_floating_point=block_floating_point,
+                                 float_format=float_format, channels=channels,
+                                 full_throughput=full_throughput))
+    if full_throughput:
+        assert not stalls
+
+
+def get_test_params(n_tests, base_seed=0):
+    for test_index in range(n_tests):
+        seed = (base_seed + test_index) * 71237
+        rnd = Random(seed)
+        suffix = '_{}_axistest'.format(test_index)
+        n = rnd.choice([8, 16, 32, 64, 128])
+        possible_spcc = [spcc for spcc in (2, 4, 8, 16)
+                         if helper.logceil(spcc) <= helper.logceil(n)/2]
+        spcc = rnd.choice(possible_spcc)
+        input_width = rnd.choice([8, 32])
+        generation_params = {
+            'suffix': suffix,
+            'n': n,
+            'spcc': spcc,
+            'input_width': input_width,
+            'pipelines': htfft_gen.random_pipeline(rnd, spcc),
+            'gauss': rnd.choice([True, False]),
+            'natural_order': rnd.choice([True, False]),
+            'inverse': rnd.choice([True, False]),
+            'block_floating_point': rnd.choice([True, False]),
+            'axi_stream': True,
+            }
+        float_format = rnd.choice([None, None, 'float16'])
+        if float_format:
+            generation_params.update({
+                'input_width': 2*floats.get_width(float_format),
+                'gauss': False,
+                'block_floating_point': False,
+                'float_format': float_format,
+                })
+        n_vectors = 10
+        n_channels = rnd.choice([None, 3])
+        if n_channels:
+            generation_params['n_channels'] = n_channels
+            channels = [rnd.randrange(n_channels) for vector_index in range(n_vectors)]
+        else:
+            channels = None
+        # The first test checks that nothing stalls without backpressure.
+        if test_index == 0:
+            valid_probability = 1
+            ready_probability = 1
+        else:
+            valid_probability = rnd.choice([1, 0.9, 0.5])
+            ready_probability = rnd.choice([1, 0.9, 0.5, 0.2])
+        test_params = {
+            'n_vectors': n_vectors,
+            'channels': channels,
+            'valid_probability': valid_probability,
+            'ready_probability': ready_probability,
+            'seed': seed,
+            'core_name': 'htfft' + suffix,
+            'top_name': 'htfft{}_axis'.format(suffix),
+            'test_module_name': 'test_htfft_axis',
+            'generation': generation_params,
+            }
+        yield test_params
+
+
+def run_test(test_params, wave=False):
+    suffix = test_params['generation']['suffix']
+    working_directory = os.path.abspath(os.path.join('temp', 'test_htfft_axis{}'.format(suffix)))
+    if os.path.exists(working_directory):
+        shutil.rmtree(working_directory)
+    os.makedirs(working_directory)
+    generated_directory = os.path.join(basedir, 'generated')
+    if not os.path.exists(generated_directory):
+        os.makedirs(generated_directory)
+    htfft_gen.make_htfft_core(directory=generated_directory, **test_params['generation'])
+    helper.run_core(
+        working_directory,
+        core_name=test_params['core_name'],
+        top_name=test_params['top_name'],
+        test_module_name=test_params['test_module_name'],
+        wave=wave,
+        test_params=test_params)
+
+
+@pytest.mark.parametrize('test_params', get_test_params(n_tests=6))
+def test_htfft_axis(test_params):
+    run_test(test_params, wave=False)
+
+
+if __name__ == '__main__':
+    for test_params in get_test_params(n_tests=6):
+        run_test(test_params, wave=False)
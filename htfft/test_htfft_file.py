@@ -0,0 +1,148 @@
+"""
+Tests the HTFFT with a VHDL testbench that reads the stimulus from a file
+and writes the output to a file (see htfft_file_tb.vhd).
+
+The only thing cocotb does is wait for the testbench to finish so the
+simulation isn't slowed down by accessing the wide data buses through the
+simulator interface every clock cycle.  This makes long runs with many
+vectors and large N practical.
+"""
+import os
+import shutil
+from random import Random
+
+import pytest
+import cocotb
+from cocotb import triggers
+
+from htfft import helper, conversions, test_htfft
+import htfft_gen
+
+basedir = os.path.abspath(os.path.dirname(__file__))
+
+
+@cocotb.test()
+async def htfft_file_test(dut):
+    await triggers.RisingEdge(dut.done)
+
+
+def write_input_file(filename, words, width):
+    word_format = '{{:0{}b}}\n'.format(width)
+    with open(filename, 'w') as f:
+        for word in words:
+            f.write(word_format.format(word))
+
+
+def read_output_file(filename):
+    firsts = []
+    words = []
+    with open(filename, 'r') as f:
+        for line in f:
+            first, word = line.split()
+            firsts.append(int(first))
+            words.append(int(word, 2))
+    return firsts, words
+
+
+def check_output(test_params, values, firsts, words):
+    """
+    Checks the output of the testbench.  `values` are the sent complex vectors.
+    """
+    generation_params = test_params['generation']
+    n = generation_params['n']
+    spcc = generation_params['spcc']
+    n_words = n//spcc
+    assert firsts == ([1] + [0]*(n_words-1)) * test_params['n_vectors']
+    test_htfft.check_vectors(values, words, n, spcc, generation_params['input_width'],
+                             generation_params.get('width_schedule', None),
+                             generation_params.get('gauss', False),
+                             generation_params.get('natural_order', True),
+                             generation_params.get('inverse', False))
+
+
+def get_test_params(n_tests, base_seed=0, n_vectors=20, ns=(8, 16, 32, 64, 128, 256)):
+    for test_index in range(n_tests):
+        seed = (base_seed + test_index) * 52817
+        rnd = Random(seed)
+        suffix = '_{}_filetest'.format(test_index)
+        n = rnd.choice(ns)
+        possible_spcc = [spcc for spcc in (2, 4, 8, 16, 32)
+                         if helper.logceil(spcc) <= helper.logceil(n)/2]
+        spcc = rnd.choice(possible_spcc)
+        input_width = rnd.choice([8, 32])
+        generation_params = {
+            'suffix': suffix,
+            'n': n,
+            'spcc': spcc,
+            'input_width': input_width,
+            'pipelines': htfft_gen.random_pipeline(rnd, spcc),
+            'natural_order': rnd.choice([True, False]),
+            'inverse': rnd.choice([True, False]),
+            }
+        test_params = {
+            'n_vectors': n_vectors,
+            'seed': seed,
+            'core_name': 'htfft' + suffix,
+            'top_name': 'htfft{}_file_tb'.format(suffix),
+            'test_module_name': 'test_htfft_file',
+            'generation': generation_params,
+            }
+        yield test_params
+
+
+def run_test(test_params, wave=False):
+    generation_params = test_params['generation']
+    suffix = generation_params['suffix']
+    n = generation_params['n']
+    spcc = generation_params['spcc']
+    input_width = generation_params['input_width']
+    n_vectors = test_params['n_vectors']
+    working_directory = os.path.abspath(os.path.join('temp', 'test_htfft_file{}'.format(suffix)))
+    if os.path.exists(working_directory):
+        shutil.rmtree(working_directory)
+    os.makedirs(working_directory)
+    generated_directory = os.path.join(basedir, 'generated')
+    if not os.path.exists(generated_directory):
+        os.makedirs(generated_directory)
+    htfft_gen.make_htfft_core(directory=generated_directory, **generation_params)
+    filenames = helper.get_files(test_params['core_name'], working_directory)
+    filenames.append(htfft_gen.make_file_tb(working_directory, suffix))
+
+    values = next(helper.random_complex_blocks(test_params['seed'], input_width, n, n_vectors))
+    words = conversions.complex_array_to_slv(values.reshape(n_vectors*n//spcc, spcc), input_width)
+    input_filename = os.path.join(working_directory, 'input.txt')
+    output_filename = os.path.join(working_directory, 'output.txt')
+    write_input_file(input_filename, words, spcc*input_width)
+
+    generics = {
+        'INPUT_FILENAME': input_filename,
+        'OUTPUT_FILENAME': output_filename,
+        'N_VECTORS': n_vectors,
+        }
+    helper.run_with_cocotb(
+        working_directory, filenames,
+        top_name=test_params['top_name'],
+        test_module_name=test_params['test_module_name'],
+        wave=wave,
+        generics=generics,
+        test_params=test_params)
+    firsts, output_words = read_output_file(output_filename)
+    check_output(test_params, values, firsts, output_words)
+
+
+@pytest.mark.parametrize('test_params', get_test_params(n_tests=10))
+def test_htfft_file(test_params):
+    run_test(test_params, wave=False)
+
+
+def run_tests(n_tests=10, base_seed=0, n_vectors=20, ns=(8, 16, 32, 64, 128, 256)):
+    """
+    For soak tests use something like n_vectors=1000 and ns=(4096,).
+    """
+    for test_params in get_test_params(n_tests=n_tests, base_seed=base_seed,
+                                       n_vectors=n_vectors, ns=ns):
+        run_test(test_params, wave=False)
+
+
+if __name__ == '__main__':
+    run_tests()
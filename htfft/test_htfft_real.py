@@ -0,0 +1,171 @@
+"""
+Tests the real mode of the HTFFT (htfft_real.vhd) which transforms two real
+streams with one complex HTFFT.
+"""
+import os
+import shutil
+from random import Random
+import collections
+import pytest
+
+import numpy
+import cocotb
+from cocotb import clock, triggers
+
+from htfft import helper, conversions, model, test_htfft
+import htfft_gen
+
+basedir = os.path.abspath(os.path.dirname(__file__))
+
+
+def real_array_to_slv(values, width, spcc):
+    """
+    Packs real values between -1 and 1 of shape [vectors, n] into words of
+    `spcc` samples with bit-width `width`.
+    """
+    n_vectors, n = values.shape
+    mapped = conversions.signed_array_to_slv(values.reshape(n_vectors*n//spcc, spcc), width)
+    return conversions.uint_array_to_slv(mapped, width)
+
+
+def check_vectors(values, received_x, received_y, n, spcc, input_width, width_schedule=None,
+                  gauss=False):
+    """
+    Checks the output words for a block of vectors against the model and
+    against numpy's real FFT.  The real and imaginary parts of `values` are
+    the sent x and y vectors.
+    """
+    n_vectors = len(values)
+    stage_widths, output_width, log_gain = helper.get_stage_widths(
+        n, spcc, input_width, width_schedule)
+    assert len(received_x) == n_vectors * n//spcc
+    x, y = model.complex_to_ints(values, input_width)
+    expected_ints = model.htfft_real(x, y, n, spcc, input_width, width_schedule, gauss)
+    for expected, received_slvs, real_values in zip(
+            expected_ints, (received_x, received_y), (values.real, values.imag)):
+        # The model should match the hardware exactly.
+        received_ints = model.ints_from_slv(received_slvs, output_width+2, spcc//2)
+        for expected_component, received_component in zip(expected, received_ints):
+            assert numpy.array_equal(expected_component, received_component.reshape(n_vectors, n//2))
+        if width_schedule is not None:
+            continue
+        received = model.ints_to_complex(received_ints, output_width+2).reshape(n_vectors, n//2) * n
+        discrepancies = numpy.sqrt(numpy.mean(numpy.abs(received - model.packed_rfft(real_values))**2,
+                                              axis=1))
+        assert numpy.all(discrepancies < 2 * test_htfft.get_expected_discrepancy(input_width, n))
+
+
+async def send_data(seed, dut, sent_queue, n, spcc, input_width, block_size):
+    for values in helper.random_complex_blocks(seed, input_width, n, block_size):
+        sent_queue.append(values)
+        words_x = real_array_to_slv(values.real, input_width//2, spcc)
+        words_y = real_array_to_slv(values.imag, input_width//2, spcc)
+        for word_index, (word_x, word_y) in enumerate(zip(words_x, words_y)):
+            dut.i_first <= (1 if word_index % (n//spcc) == 0 else 0)
+            dut.i_data_x <= word_x
+            dut.i_data_y <= word_y
+            await triggers.RisingEdge(dut.clk)
+
+
+async def check_data(dut, sent_queue, n, spcc, input_width, n_vectors, width_schedule=None,
+                     gauss=False):
+    n_lumps = n//spcc
+    await triggers.ReadOnly()
+    received_x = []
+    received_y = []
+    for vector_index in range(n_vectors):
+        while True:
+            if str(dut.o_first.value) == '1':
+                break
+            await triggers.RisingEdge(dut.clk)
+            await triggers.ReadOnly()
+        for lump_index in range(n_lumps):
+            assert dut.o_first.value == (1 if lump_index == 0 else 0)
+            received_x.append(dut.o_data_x.value.integer)
+            received_y.append(dut.o_data_y.value.integer)
+            await triggers.RisingEdge(dut.clk)
+            await triggers.ReadOnly()
+    sent_values = numpy.concatenate(list(sent_queue))[:n_vectors]
+    check_vectors(sent_values, received_x, received_y, n, spcc, input_width, width_schedule, gauss)
+
+
+@cocotb.test()
+async def htfft_real_test(dut):
+    test_params = helper.get_test_params()
+    generation_params = test_params['generation']
+    spcc = generation_params['spcc']
+    n = generation_params['n']
+    input_width = generation_params['input_width']
+    n_vectors = test_params['n_vectors']
+    seed = test_params['seed']
+    cocotb.fork(clock.Clock(dut.clk, 2, 'ns').start())
+    await triggers.RisingEdge(dut.clk)
+    dut.reset <= 1
+    await triggers.RisingEdge(dut.clk)
+    dut.reset <= 0
+    sent_queue = collections.deque()
+    cocotb.fork(send_data(seed, dut, sent_queue, n, spcc, input_width, block_size=n_vectors))
+    await cocotb.fork(check_data(dut, sent_queue, n, spcc, input_width, n_vectors=n_vectors,
+                                 width_schedule=generation_params.get('width_schedule', None),
+                                 gauss=generation_params.get('gauss', False)))
+
+
+def get_test_params(n_tests, base_seed=0):
+    for test_index in range(n_tests):
+        seed = (base_seed + test_index) * 71933
+        rnd = Random(seed)
+        suffix = '_{}_realtest'.format(test_index)
+        n = rnd.choice([8, 16, 32, 64, 128, 256])
+        possible_spcc = [spcc for spcc in (2, 4, 8, 16, 32)
+                         if helper.logceil(spcc) <= helper.logceil(n)/2]
+        spcc = rnd.choice(possible_spcc)
+        input_width = rnd.choice([8, 32])
+        generation_params = {
+            'suffix': suffix,
+            'n': n,
+            'spcc': spcc,
+            'input_width': input_width,
+            'pipelines': htfft_gen.random_pipeline(rnd, spcc),
+            'width_schedule': htfft_gen.random_width_schedule(rnd, n, spcc, input_width),
+            'gauss': rnd.choice([True, False]),
+            'real': True,
+            }
+        n_vectors = 10
+        test_params = {
+            'n_vectors': n_vectors,
+            'seed': seed,
+            'core_name': 'htfft' + suffix,
+            'top_name': 'htfft{}_real'.format(suffix),
+            'test_module_name': 'test_htfft_real',
+            'generation': generation_params,
+            }
+        yield test_params
+
+
+def run_test(test_params, wave=False):
+    suffix = test_params['generation']['suffix']
+    working_directory = os.path.abspath(os.path.join('temp', 'test_htfft_real{}'.format(suffix)))
+    if os.path.exists(working_directory):
+        shutil.rmtree(working_directory)
+    os.makedirs(working_directory)
+    generated_directory = os.path.join(basedir, 'generated')
+    if not os.path.exists(generated_directory):
+        os.makedirs(generated_directory)
+    htfft_gen.make_htfft_core(directory=generated_directory, **test_params['generation'])
+    helper.run_core(
+        working_directory,
+        core_name=test_params['core_name'],
+        top_name=test_params['top_name'],
+        test_module_name=test_params['test_module_name'],
+        wave=wave,
+        test_params=test_params)
+
+
+@pytest.mark.parametrize('test_params', get_test_params(n_tests=5))
+def test_htfft_real(test_params):
+    run_test(test_params, wave=False)
+
+
+if __name__ == '__main__':
+    for test_params in get_test_params(n_tests=5):
+        run_test(test_params, wave=False)
@@ -0,0 +1,209 @@
+"""
+Tests a HTFFT generated with a `min_n` where the size of the FFT is selected
+at run time with i_log2n.
+"""
+import os
+import shutil
+from random import Random
+import pytest
+
+import numpy
+from numpy import fft
+import cocotb
+from cocotb import clock, triggers
+
+from htfft import helper, conversions, model, floats, test_htfft
+import htfft_gen
+
+basedir = os.path.abspath(os.path.dirname(__file__))
+
+
+def check_block(values, received_slvs, size, n, spcc, input_width, gauss=False, natural_order=True,
+                inverse=False, float_format=None):
+    """
+    Checks the output words for a block of vectors of length `size` against
+    the model and against numpy's FFT.
+    """
+    n_vectors = len(values)
+    assert len(received_slvs) == n_vectors * size//spcc
+    if float_format:
+        data = model.complex_to_floats(values, float_format)
+    else:
+        data = model.complex_to_ints(values, input_width)
+    expected_data = model.htfft_smaller(data, size, n, spcc, input_width, gauss, natural_order,
+                                        inverse, float_format)
+    if float_format:
+        received_data = model.floats_from_slv(received_slvs, float_format, spcc)
+    else:
+        stage_widths, output_width, log_gain = helper.get_stage_widths(n, spcc, input_width)
+        received_data = model.ints_from_slv(received_slvs, output_width, spcc)
+    # The model should match the hardware exactly.
+    for expected_component, received_component in zip(expected_data, received_data):
+        assert numpy.array_equal(expected_component, received_component.reshape(n_vectors, size))
+    if float_format:
+        received = model.floats_to_complex(received_data, float_format).reshape(n_vectors, size)
+        values = model.floats_to_complex(data, float_format)
+        allowed = test_htfft.get_expected_float_discrepancy(float_format, size)
+    else:
+        received = model.ints_to_complex(received_data, output_width).reshape(n_vectors, size) * size
+        allowed = 2 * test_htfft.get_expected_discrepancy(input_width=input_width, n=size)
+    if inverse:
+        expected = fft.ifft(values, axis=1) * size
+    else:
+        expected = fft.fft(values, axis=1)
+    if not natural_order:
+        expected = expected[:, model.output_order(size, spcc)]
+    discrepancies = numpy.sqrt(numpy.mean(numpy.abs(received - expected)**2, axis=1))
+    assert numpy.all(discrepancies < allowed)
+
+
+async def send_data(seed, dut, sent_blocks, drained, sizes, spcc, input_width, block_size,
+                    float_format=None):
+    """
+    Sends a block of `block_size` vectors for each of `sizes`.  Before the
+    size changes it waits for the `drained` event of the previous block.
+    """
+    rng = numpy.random.default_rng(seed)
+    for block_index, size in enumerate(sizes):
+        if block_index > 0 and size != sizes[block_index-1]:
+            await drained[block_index-1].wait()
+            await triggers.RisingEdge(dut.clk)
+        values = helper.random_complex_array(rng, input_width, (block_size, size))
+        sent_blocks.append(values)
+        if float_format:
+            words = conversions.float_array_to_slv(values.reshape(block_size*size//spcc, spcc), float_format)
+        else:
+            words = conversions.complex_array_to_slv(values.reshape(block_size*size//spcc, spcc), input_width)
+        for word_index, word in enumerate(words):
+            dut.i_first <= (1 if word_index % (size//spcc) == 0 else 0)
+            dut.i_log2n <= helper.logceil(size)
+            dut.i_data <= word
+            await triggers.RisingEdge(dut.clk)
+        dut.i_first <= 0
+
+
+async def check_data(dut, sent_blocks, drained, sizes, n, spcc, input_width, block_size, gauss=False,
+                     natural_order=True, inverse=False, float_format=None):
+    await triggers.ReadOnly()
+    for block_index, size in enumerate(sizes):
+        received_slvs = []
+        for vector_index in range(block_size):
+            while True:
+                if str(dut.o_first.value) == '1':
+                    break
+                await triggers.RisingEdge(dut.clk)
+                await triggers.ReadOnly()
+            for lump_index in range(size//spcc):
+                assert dut.o_first.value == (1 if lump_index == 0 else 0)
+                received_slvs.append(dut.o_data.value.integer)
+                await triggers.RisingEdge(dut.clk)
+                await triggers.ReadOnly()
+        drained[block_index].set()
+        check_block(sent_blocks[block_index], received_slvs, size, n, spcc, input_width, gauss,
+                    natural_order, inverse, float_format)
+
+
+@cocotb.test()
+async def htfft_sizes_test(dut):
+    test_params = helper.get_test_params()
+    generation_params = test_params['generation']
+    spcc = generation_params['spcc']
+    n = generation_params['n']
+    input_width = generation_params['input_width']
+    sizes = test_params['sizes']
+    block_size = test_params['block_size']
+    seed = test_params['seed']
+    cocotb.fork(clock.Clock(dut.clk, 2, 'ns').start())
+    dut.i_first <= 0
+    dut.i_log2n <= helper.logceil(n)
+    await triggers.RisingEdge(dut.clk)
+    dut.reset <= 1
+    await triggers.RisingEdge(dut.clk)
+    dut.reset <= 0
+    sent_blocks = []
+    drained = [triggers.Event() for size in sizes]
+    cocotb.fork(send_data(seed, dut, sent_blocks, drained, sizes, spcc, input_width, block_size,
+                          generation_params.get('float_format', None)))
+    await cocotb.fork(check_data(dut, sent_blocks, drained, sizes, n, spcc, input_width, block_size,
+                                 gauss=generation_params.get('gauss', False),
+                                 natural_order=generation_params.get('natural_order', True),
+                                 inverse=generation_params.get('inverse', False),
+                                 float_format=generation_params.get('float_format', None)))
+
+
+def get_test_params(n_tests, base_seed=0):
+    for test_index in range(n_tests):
+        seed = (base_seed + test_index) * 52361
+        rnd = Random(seed)
+        suffix = '_{}_sizestest'.format(test_index)
+        n = rnd.choice([16, 32, 64, 128, 256])
+        possible_spcc = [spcc for spcc in (2, 4, 8, 16)
+                         if helper.get_smallest_n(spcc) < n]
+        spcc = rnd.choice(possible_spcc)
+        possible_min_n = [pow(2, log2n) for log2n in range(helper.logceil(helper.get_smallest_n(spcc)),
+                                                           helper.logceil(n))]
+        min_n = rnd.choice(possible_min_n)
+        input_width = rnd.choice([8, 32])
+        generation_params = {
+            'suffix': suffix,
+            'n': n,
+            'spcc': spcc,
+            'input_width': input_width,
+            'pipelines': htfft_gen.random_pipeline(rnd, spcc),
+            'gauss': rnd.choice([True, False]),
+            'natural_order': rnd.choice([True, False]),
+            'inverse': rnd.choice([True, False]),
+            'min_n': min_n,
+            }
+        float_format = rnd.choice([None, None, 'float16'])
+        # The first test covers the wider mantissas of float32.
+        if test_index == 0:
+            float_format = 'float32'
+        if float_format:
+            generation_params.update({
+                'input_width': 2*floats.get_width(float_format),
+                'gauss': False,
+                'float_format': float_format,
+                })
+        all_sizes = [pow(2, log2n) for log2n in range(helper.logceil(min_n), helper.logceil(n)+1)]
+        # Repeat some sizes so that following blocks of the same size are tested too.
+        sizes = [rnd.choice(all_sizes) for block_index in range(6)]
+        test_params = {
+            'sizes': sizes,
+            'block_size': 3,
+            'seed': seed,
+            'core_name': 'htfft' + suffix,
+            'top_name': 'htfft' + suffix,
+            'test_module_name': 'test_htfft_sizes',
+            'generation': generation_params,
+            }
+        yield test_params
+
+
+def run_test(test_params, wave=False):
+    suffix = test_params['generation']['suffix']
+    working_directory = os.path.abspath(os.path.join('temp', 'test_htfft_sizes{}'.format(suffix)))
+    if os.path.exists(working_directory):
+        shutil.rmtree(working_directory)
+    os.makedirs(working_directory)
+    generated_directory = os.path.join(basedir, 'generated')
+    if not os.path.exists(generated_directory):
+        os.makedirs(generated_directory)
+    htfft_gen.make_htfft_core(directory=generated_directory, **test_params['generation'])
+    helper.run_core(
+        working_directory,
+        core_name=test_params['core_name'],
+        top_name=test_params['top_name'],
+        test_module_name=test_params['test_module_name'],
+        wave=wave,
+        test_params=test_params)
+
+
+@pytest.mark.parametrize('test_params', get_test_params(n_tests=5))
+def test_htfft_sizes(test_params):
+    run_test(test_params, wave=False)
+
+
+if __name__ == '__main__':
+    for test_params in get_test_params(n_tests=5):
+        run_test(test_params, wave=False)
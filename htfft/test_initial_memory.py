@@ -59,10 +59,8 @@ async def check_data(dut, width, spcc, n, pipeline_length, sent_queue):
         assert expected_values == received_values
 
 
-@cocotb.test()
-async def initial_memory_test(dut):
+async def initial_memory_test(dut, seed):
     test_params = helper.get_test_params()
-    seed = test_params['seed']
     generics = test_params['generics']
     rnd = Random(seed)
 
@@ -102,7 +100,10 @@ async def initial_memory_test(dut):
         await triggers.RisingEdge(dut.clk)
 
 
-def get_test_params(n_tests, base_seed=0):
+helper.generate_seed_tests(initial_memory_test)
+
+
+def get_test_params(n_tests, base_seed=0, n_seeds=1):
     for test_index in range(n_tests):
         seed = (base_seed + test_index) * 13987
         rnd = Random(seed)
@@ -121,6 +122,7 @@ def get_test_params(n_tests, base_seed=0):
         test_params = {
             'test_index': test_index,
             'seed': seed,
+            'seeds': helper.get_seeds(rnd, seed, n_seeds),
             'core_name': 'initial_memory',
             'top_name': 'initial_memory',
             'test_module_name': 'test_initial_memory',
@@ -150,8 +152,8 @@ def test_htfft(test_params):
     run_test(test_params, wave=False)
 
 
-def run_tests(n_tests=10):
-    for test_params in get_test_params(n_tests=n_tests):
+def run_tests(n_tests=10, n_seeds=1):
+    for test_params in get_test_params(n_tests=n_tests, n_seeds=n_seeds):
         run_test(test_params, wave=False)
 
 
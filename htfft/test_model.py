@@ -0,0 +1,472 @@
+from random import Random
+
+import numpy
+import pytest
+
+from htfft import helper, conversions, model, twiddles, floats
+from htfft.test_htfft import get_expected_discrepancy, get_expected_float_discrepancy
+
+
+def reference_butterfly(a, b, t, width, twiddle_width):
+    """
+    A slow scalar butterfly that does the bit slicing the same way
+    as butterfly.vhd.  Inputs and outputs are unsigned slvs.
+    """
+    def to_signed(value, n_bits):
+        return value - pow(2, n_bits) if value >= pow(2, n_bits-1) else value
+
+    def to_unsigned(value, n_bits):
+        return value % pow(2, n_bits)
+
+    def split(value, n_bits):
+        return (to_signed(value >> (n_bits//2), n_bits//2),
+                to_signed(value % pow(2, n_bits//2), n_bits//2))
+
+    def trim(expanded):
+        expanded_width = width//2 + twiddle_width//2
+        bits = conversions.int_to_str(to_unsigned(expanded, expanded_width), expanded_width)
+        # bits is MSB first, we want (WIDTH/2+TWIDDLE_WIDTH/2-2-1 downto TWIDDLE_WIDTH/2-2)
+        top = bits[2:2+width//2]
+        return to_signed(int(top, 2), width//2)
+
+    a_real, a_imag = split(a, width)
+    b_real, b_imag = split(b, width)
+    t_real, t_imag = split(t, twiddle_width)
+    bt_real = to_signed(to_unsigned(trim(b_real*t_real) - trim(b_imag*t_imag), width//2), width//2)
+    bt_imag = to_signed(to_unsigned(trim(b_real*t_imag) + trim(b_imag*t_real), width//2), width//2)
+    c = (a_real + bt_real, a_imag + bt_imag)
+    d = (a_real - bt_real, a_imag - bt_imag)
+    return c, d
+
+
+def reference_gauss_butterfly(a, b, t, width, twiddle_width):
+    """
+    A slow scalar version of the GAUSS butterfly that does the three
+    multiplications and the bit slicing the same way as butterfly.vhd.
+    Inputs are unsigned slvs (with the twiddle holding c, s-c and c+s)
+    and the outputs are signed components.
+    """
+    def to_signed(value, n_bits):
+        return value - pow(2, n_bits) if value >= pow(2, n_bits-1) else value
+
+    def split(value, n_bits):
+        return (to_signed(value >> (n_bits//2), n_bits//2),
+                to_signed(value % pow(2, n_bits//2), n_bits//2))
+
+    def trim(expanded):
+        top = (expanded >> (twiddle_width//2-2)) % pow(2, width//2)
+        return to_signed(top, width//2)
+
+    field_width = twiddle_width//2+1
+    t_c = to_signed(t >> (2*field_width), field_width)
+    t_s_minus_c = to_signed((t >> field_width) % pow(2, field_width), field_width)
+    t_c_plus_s = to_signed(t % pow(2, field_width), field_width)
+    a_real, a_imag = split(a, width)
+    b_real, b_imag = split(b, width)
+    m1 = t_c * (b_real + b_imag)
+    m2 = b_imag * t_c_plus_s
+    m3 = b_real * t_s_minus_c
+    bt_real = trim(m1 - m2)
+    bt_imag = trim(m1 + m3)
+    c = (a_real + bt_real, a_imag + bt_imag)
+    d = (a_real - bt_real, a_imag - bt_imag)
+    return c, d
+
+
+def get_test_params(n_tests, base_seed=0):
+    for test_index in range(n_tests):
+        seed = (base_seed + test_index) * 3571
+        rnd = Random(seed)
+        n = rnd.choice([4, 8, 16, 32, 64, 128, 256, 1024])
+        possible_spcc = [spcc for spcc in (2, 4, 8, 16, 32)
+                         if helper.logceil(spcc) <= helper.logceil(n)/2]
+        test_params = {
+            'seed': seed,
+            'n': n,
+            'spcc': rnd.choice(possible_spcc),
+            'input_width': rnd.choice([8, 16, 32]),
+            'n_vectors': 20,
+            }
+        yield test_params
+
+
+@pytest.mark.parametrize('test_params', get_test_params(n_tests=10))
+def test_butterfly(test_params):
+    rnd = Random(test_params['seed'])
+    width = test_params['input_width']
+    twiddle_width = width + rnd.randint(0, 4)*2
+    size = test_params['n']
+    a = [helper.random_complex(rnd, width) for index in range(size//2)]
+    b = [helper.random_complex(rnd, width) for index in range(size//2)]
+    a_ints = model.complex_to_ints(a, width)
+    b_ints = model.complex_to_ints(b, width)
+    t_ints = model.get_twiddles(size, twiddle_width)
+    c, d = model.butterfly(a_ints, b_ints, t_ints, width, twiddle_width)
+    for index in range(size//2):
+        t = conversions.complex_to_slv(helper.get_twiddle(index, size), twiddle_width)
+        expected_c, expected_d = reference_butterfly(
+            conversions.complex_to_slv(a[index], width),
+            conversions.complex_to_slv(b[index], width),
+            t, width, twiddle_width)
+        assert expected_c == (c[0][index], c[1][index])
+        assert expected_d == (d[0][index], d[1][index])
+
+
+@pytest.mark.parametrize('test_params', get_test_params(n_tests=10))
+def test_gauss_butterfly(test_params):
+    rnd = Random(test_params['seed'])
+    width = test_params['input_width']
+    size = test_params['n']
+    a = [helper.random_complex(rnd, width) for index in range(size//2)]
+    b = [helper.random_complex(rnd, width) for index in range(size//2)]
+    t_ints = model.get_twiddles(size, width)
+    t_strs = twiddles.get_twiddle_strs(size, width, gauss=True)
+    c, d = model.butterfly(model.complex_to_ints(a, width), model.complex_to_ints(b, width),
+                           t_ints, width, width, gauss=True)
+    for index in range(size//2):
+        expected_c, expected_d = reference_gauss_butterfly(
+            conversions.complex_to_slv(a[index], width),
+            conversions.complex_to_slv(b[index], width),
+            int(t_strs[index], 2), width, width)
+        assert expected_c == (c[0][index], c[1][index])
+        assert expected_d == (d[0][index], d[1][index])
+
+
+@pytest.mark.parametrize('test_params', get_test_params(n_tests=10))
+def test_htfft(test_params):
+    rnd = Random(test_params['seed'])
+    n = test_params['n']
+    input_width = test_params['input_width']
+    values = numpy.array([[helper.random_complex(rnd, input_width) for index in range(n)]
+                          for vector_index in range(test_params['n_vectors'])])
+    expected = numpy.fft.fft(values, axis=1)
+    for gauss in (False, True):
+        received = model.htfft_complex(values, n, test_params['spcc'], input_width, gauss=gauss) * n
+        discrepancy = numpy.sqrt(numpy.mean(numpy.abs(received - expected)**2, axis=1))
+        assert numpy.all(discrepancy < 2 * get_expected_discrepancy(input_width=input_width, n=n))
+
+
+@pytest.mark.parametrize('n, spcc', [(4, 2), (16, 4), (64, 8), (256, 16)])
+def test_output_order(n, spcc):
+    order = model.output_order(n, spcc)
+    assert sorted(order.tolist()) == list(range(n))
+    # The first word has the first spcc/2 bins of each half.
+    assert order[:spcc].tolist() == list(range(spcc//2)) + list(range(n//2, n//2+spcc//2))
+    rnd = Random(n)
+    values = numpy.array([[helper.random_complex(rnd, 16) for index in range(n)]])
+    natural = model.htfft_complex(values, n, spcc, 16)
+    permuted = model.htfft_complex(values, n, spcc, 16, natural_order=False)
+    assert numpy.array_equal(permuted, natural[:, order])
+
+
+@pytest.mark.parametrize('test_params', get_test_params(n_tests=5))
+def test_inverse_htfft(test_params):
+    rnd = Random(test_params['seed'])
+    n = test_params['n']
+    input_width = test_params['input_width']
+    values = numpy.array([[helper.random_complex(rnd, input_width) for index in range(n)]
+                          for vector_index in range(test_params['n_vectors'])])
+    expected = numpy.fft.ifft(values, axis=1) * n
+    received = model.htfft_complex(values, n, test_params['spcc'], input_width, inverse=True) * n
+    discrepancy = numpy.sqrt(numpy.mean(numpy.abs(received - expected)**2, axis=1))
+    assert numpy.all(discrepancy < 2 * get_expected_discrepancy(input_width=input_width, n=n))
+
+
+@pytest.mark.parametrize('test_params', get_test_params(n_tests=5))
+def test_htfft_real(test_params):
+    rnd = Random(test_params['seed'])
+    n = test_params['n']
+    spcc = test_params['spcc']
+    input_width = test_params['input_width']
+    values = numpy.array([[helper.random_complex(rnd, input_width) for index in range(n)]
+                          for vector_index in range(test_params['n_vectors'])])
+    x, y = model.complex_to_ints(values, input_width)
+    stage_widths, output_width, log_gain = helper.get_stage_widths(n, spcc, input_width)
+    x_split, y_split = model.htfft_real(x, y, n, spcc, input_width)
+    for received, real_values in ((x_split, values.real), (y_split, values.imag)):
+        received = model.ints_to_complex(received, output_width+2) * n
+        expected = model.packed_rfft(real_values)
+        discrepancy = numpy.sqrt(numpy.mean(numpy.abs(received - expected)**2, axis=1))
+        assert numpy.all(discrepancy < 2 * get_expected_discrepancy(input_width=input_width, n=n))
+
+
+@pytest.mark.parametrize('test_params', get_test_params(n_tests=10))
+def test_htfft_block_floating_point(test_params):
+    rnd = Random(test_params['seed'])
+    n = test_params['n']
+    spcc = test_params['spcc']
+    input_width = test_params['input_width']
+    n_vectors = test_params['n_vectors']
+    # Scale the vectors down by different amounts so they get different exponents.
+    scales = numpy.array([pow(2, -rnd.randint(0, input_width//2-3)) for index in range(n_vectors)])
+    values = numpy.array([[helper.random_complex(rnd, input_width) for index in range(n)]
+                          for vector_index in range(n_vectors)]) * scales[:, numpy.newaxis]
+    data = model.complex_to_ints(values, input_width)
+    output, exponents = model.htfft_block_floating_point(data, n, spcc, input_width)
+    # A vector is shifted up as far as it can be while its components still
+    # fit in input_width/2-1 bits.
+    max_value = pow(2, input_width//2-2)
+    for shift, fits in ((exponents, True), (exponents+1, False)):
+        shifted = [component << shift[:, numpy.newaxis] for component in data]
+        vector_fits = numpy.all([(component >= -max_value) & (component < max_value)
+                                 for component in shifted], axis=(0, 2))
+        if fits:
+            assert numpy.all(vector_fits | (exponents == 0))
+        else:
+            assert not numpy.any(vector_fits & (exponents < input_width//2-2))
+    stage_widths, output_width, log_gain = helper.get_stage_widths(
+        n, spcc, input_width, helper.get_block_floating_point_schedule(n, spcc))
+    received = model.ints_to_complex(output, output_width) * n / numpy.power(2.0, exponents)[:, numpy.newaxis]
+    expected = numpy.fft.fft(model.ints_to_complex(data, input_width), axis=1)
+    discrepancy = numpy.sqrt(numpy.mean(numpy.abs(received - expected)**2, axis=1))
+    # Removing an LSB before each stage makes the error grow faster with n
+    # but it shrinks with the exponent.
+    allowed = (4 * get_expected_discrepancy(input_width=input_width, n=n) * pow(1.25, helper.logceil(n)) /
+               numpy.power(2.0, exponents))
+    assert numpy.all(discrepancy < allowed)
+
+
+@pytest.mark.parametrize('test_params', get_test_params(n_tests=5))
+def test_htfft_smaller(test_params):
+    rnd = Random(test_params['seed'])
+    n = test_params['n']
+    spcc = test_params['spcc']
+    input_width = test_params['input_width']
+    stage_widths, output_width, log_gain = helper.get_stage_widths(n, spcc, input_width)
+    size = helper.get_smallest_n(spcc)
+    while size <= n:
+        values = numpy.array([[helper.random_complex(rnd, input_width) for index in range(size)]
+                              for vector_index in range(test_params['n_vectors'])])
+        data = model.complex_to_ints(values, input_width)
+        output = model.htfft_smaller(data, size, n, spcc, input_width)
+        # The output has the full width and is the FFT divided by the size.
+        received = model.ints_to_complex(output, output_width) * size
+        expected = numpy.fft.fft(values, axis=1)
+        discrepancy = numpy.sqrt(numpy.mean(numpy.abs(received - expected)**2, axis=1))
+        assert numpy.all(discrepancy < 2 * get_expected_discrepancy(input_width=input_width, n=size))
+        size *= 2
+
+
+@pytest.mark.parametrize('float_format', ['float16', 'float32'])
+def test_float_arithmetic(float_format):
+    rng = numpy.random.default_rng(len(float_format))
+    exponent_width, fraction_width = floats.get_format(float_format)
+    size = 10000
+    a = floats.from_floats(rng.normal(size=size) * numpy.exp2(rng.integers(-6, 6, size=size)), float_format)
+    b = floats.from_floats(rng.normal(size=size) * numpy.exp2(rng.integers(-6, 6, size=size)), float_format)
+    a_floats = floats.to_floats(a, float_format)
+    b_floats = floats.to_floats(b, float_format)
+    # The exact products fit in a double so a multiplication rounds once.
+    assert numpy.array_equal(floats.mult(a, b, float_format),
+                             floats.from_floats(a_floats * b_floats, float_format))
+    # No bits are lost when aligning operands whose exponents are close.
+    total = floats.add(a, b, float_format)
+    exact = a_floats + b_floats
+    a_sign, a_exponent, a_fraction = floats.split(a, float_format)
+    b_sign, b_exponent, b_fraction = floats.split(b, float_format)
+    close = numpy.abs(a_exponent - b_exponent) <= floats.GUARD_BITS
+    assert numpy.array_equal(total[close], floats.from_floats(exact[close], float_format))
+    # Otherwise the error is within a unit in the last place of the larger
+    # operand unless the result is too small and is flushed to zero.
+    smallest = floats.to_floats(pow(2, fraction_width), float_format)
+    largest = numpy.maximum(numpy.abs(a_floats), numpy.abs(b_floats))
+    error = numpy.abs(floats.to_floats(total, float_format) - exact)
+    assert numpy.all((error <= largest * pow(2, -fraction_width)) | (numpy.abs(exact) < smallest))
+    zeros = numpy.zeros(size, dtype=numpy.int64)
+    assert numpy.array_equal(floats.add(a, zeros, float_format), a)
+    assert numpy.array_equal(floats.add(zeros, a, float_format), a)
+    assert numpy.array_equal(floats.mult(a, zeros, float_format), zeros)
+    assert numpy.array_equal(floats.add(a, floats.negate(a, float_format), float_format), zeros)
+
+
+@pytest.mark.parametrize('test_params', get_test_params(n_tests=5))
+@pytest.mark.parametrize('float_format', ['float16', 'float32'])
+def test_float_htfft(test_params, float_format):
+    rnd = Random(test_params['seed'])
+    n = test_params['n']
+    spcc = test_params['spcc']
+    input_width = 2*floats.get_width(float_format)
+    values = numpy.array([[helper.random_complex(rnd, 16) for index in range(n)]
+                          for vector_index in range(test_params['n_vectors'])])
+    data = model.complex_to_floats(values, float_format)
+    output = model.htfft(data, n, spcc, input_width, float_format=float_format)
+    # The floating point output isn't scaled down by n.
+    received = model.floats_to_complex(output, float_format)
+    expected = numpy.fft.fft(model.floats_to_complex(data, float_format), axis=1)
+    discrepancy = numpy.sqrt(numpy.mean(numpy.abs(received - expected)**2, axis=1))
+    assert numpy.all(discrepancy < get_expected_float_discrepancy(float_format, n))
+    # Every level is the same whether it's unrolled or a stage.
+    assert numpy.array_equal(output, model.htfft(data, n, 2, input_width, float_format=float_format))
+    permuted = model.htfft(data, n, spcc, input_width, natural_order=False, inverse=True,
+                           float_format=float_format)
+    expected = numpy.fft.ifft(model.floats_to_complex(data, float_format), axis=1) * n
+    received = model.floats_to_complex(permuted, float_format)
+    discrepancy = numpy.sqrt(numpy.mean(numpy.abs(received - expected[:, model.output_order(n, spcc)])**2,
+                                        axis=1))
+    assert numpy.all(discrepancy < get_expected_float_discrepancy(float_format, n))
+
+
+def reference_reduce(value, width, msbs, lsbs, rounding):
+    """
+    A slow scalar version of htfft_pkg.reduce_width for one signed component
+    of bit-width `width`/2.
+    """
+    if rounding == 'round' and lsbs > 0:
+        value += pow(2, lsbs-1)
+    value = value // pow(2, lsbs)
+    output_width = width//2 - msbs - lsbs
+    if msbs > 0:
+        return max(-pow(2, output_width-2), min(pow(2, output_width-2), value))
+    return max(-pow(2, output_width-1), min(pow(2, output_width-1)-1, value))
+
+
+@pytest.mark.parametrize('test_params', get_test_params(n_tests=10))
+def test_reduce(test_params):
+    rnd = Random(test_params['seed'])
+    width = test_params['input_width']
+    msbs = rnd.randint(0, 2)
+    lsbs = rnd.randint(0, 2)
+    rounding = rnd.choice(['truncate', 'round'])
+    values = [rnd.randint(-pow(2, width//2-1), pow(2, width//2-1)-1) for index in range(100)]
+    data = (numpy.array(values, dtype=numpy.int64), numpy.array(values[::-1], dtype=numpy.int64))
+    real, imag = model.reduce(data, width, msbs, lsbs, rounding)
+    for index, value in enumerate(values):
+        assert real[index] == reference_reduce(value, width, msbs, lsbs, rounding)
+        assert imag[-1-index] == reference_reduce(value, width, msbs, lsbs, rounding)
+
+
+@pytest.mark.parametrize('test_params', get_test_params(n_tests=10))
+def test_htfft_width_schedule(test_params):
+    """
+    Removing two bits before the last stage should keep the error within that
+    of an FFT with the input width reduced by a bit per component.
+    """
+    rnd = Random(test_params['seed'])
+    n = test_params['n']
+    spcc = test_params['spcc']
+    input_width = test_params['input_width']
+    n_stages = helper.logceil(n//spcc)
+    width_schedule = [None] * (n_stages-1) + [{'lsbs': 1, 'rounding': 'round'}]
+    stage_widths, output_width, log_gain = helper.get_stage_widths(n, spcc, input_width, width_schedule)
+    assert output_width == input_width + 2*helper.logceil(n) - 2
+    assert log_gain == 0
+    values = numpy.array([[helper.random_complex(rnd, input_width) for index in range(n)]
+                          for vector_index in range(test_params['n_vectors'])])
+    received = model.htfft_complex(values, n, spcc, input_width, width_schedule) * n
+    expected = numpy.fft.fft(values, axis=1)
+    discrepancy = numpy.sqrt(numpy.mean(numpy.abs(received - expected)**2, axis=1))
+    assert numpy.all(discrepancy < 2 * get_expected_discrepancy(input_width=input_width-2, n=n))
+
+
+@pytest.mark.parametrize('input_width', [16, 32])
+@pytest.mark.parametrize('n, spcc', [(16, 4), (32, 2), (64, 4)])
+def test_htfft_width_schedule_saturation(n, spcc, input_width):
+    """
+    Removing two MSBs before the last stage saturates a large tone.  It must
+    saturate rather than wrap in the last stage's butterflies, so the tone
+    stays in its bin.
+    """
+    n_stages = helper.logceil(n//spcc)
+    width_schedule = [None] * (n_stages-1) + [{'msbs': 2}]
+    stage_widths, output_width, log_gain = helper.get_stage_widths(n, spcc, input_width, width_schedule)
+    assert log_gain == 2
+    values = 0.9 * (1+1j) / numpy.sqrt(2) * numpy.exp(2j*numpy.pi*numpy.arange(n)/n)[numpy.newaxis, :]
+    input_ints = model.complex_to_ints(values, input_width)
+    unreduced_width = stage_widths[-1][0]
+    top = pow(2, output_width//2-1)
+    real, imag = model.htfft(input_ints, n, spcc, input_width, width_schedule)
+    for component in (real, imag):
+        assert numpy.all(component[:, 1] > top//4)
+        assert numpy.all(numpy.abs(component[:, [0] + list(range(2, n))]) < top//4)
+    # The components saturate at half the range of the reduced width.
+    before = (numpy.array([pow(2, unreduced_width//2-3)]), numpy.array([-pow(2, unreduced_width//2-1)]))
+    reduced = model.reduce(before, unreduced_width, msbs=2, lsbs=0)
+    limit = pow(2, unreduced_width//2-4)
+    assert reduced[0][0] == limit
+    assert reduced[1][0] == -limit
+
+
+@pytest.mark.parametrize('width', [8, 16, 32])
+def test_trivial_butterfly(width):
+    """
+    The butterfly gives exactly a rotation by 1 or -j for those twiddles,
+    including at the extremes of the range where the negation wraps.
+    This is what lets trivial_butterfly.vhd skip the multipliers.
+    """
+    size = 4
+    rnd = Random(width)
+    top = pow(2, width//2-1)
+    values = [-top, top-1, 0, -1] + [rnd.randint(-top, top-1) for index in range(100)]
+    b = (numpy.array(values), numpy.array(values[::-1]))
+    a = (numpy.zeros(len(values), dtype=numpy.int64),) * 2
+    t_real, t_imag = model.get_twiddles(size, width)
+    for position, expected in ((0, b), (1, (b[1], model.wrap(-b[0], width//2)))):
+        t = (numpy.full(len(values), t_real[position]), numpy.full(len(values), t_imag[position]))
+        c, d = model.butterfly(a, b, t, width, width)
+        assert numpy.array_equal(c[0], expected[0])
+        assert numpy.array_equal(c[1], expected[1])
+
+
+@pytest.mark.parametrize('float_format', ['float16', 'float32'])
+def test_float_trivial_butterfly(float_format):
+    """
+    The float butterfly with twiddles of 1 and -j gives exactly the sums of
+    a with b rotated by a swap and negation.
+    This is what lets float_trivial_butterfly.vhd skip the multiplications.
+    """
+    size = 4
+    rng = numpy.random.default_rng(len(float_format))
+    n_values = 100
+    values = rng.normal(size=(4, n_values)) * numpy.exp2(rng.integers(-6, 6, size=(4, n_values)))
+    # Include zeros which the float arithmetic treats specially.
+    values[:, :4] = [[0, 1, 0, 0], [0, 0, 1, 0], [0, 0, 0, 1], [1, 0, 0, 0]]
+    a_real, a_imag, b_real, b_imag = floats.from_floats(values, float_format)
+    t_real, t_imag = twiddles.get_float_twiddle_ints(size, float_format)
+    minus_b_real = floats.negate(b_real, float_format)
+    for position, bt in ((0, (b_real, b_imag)), (1, (b_imag, minus_b_real))):
+        t = (numpy.full(n_values, t_real[position]), numpy.full(n_values, t_imag[position]))
+        c, d = model.float_butterfly((a_real, a_imag), (b_real, b_imag), t, float_format)
+        expected_c = [floats.add(a, b, float_format) for a, b in zip((a_real, a_imag), bt)]
+        expected_d = [floats.add(a, floats.negate(b, float_format), float_format)
+                      for a, b in zip((a_real, a_imag), bt)]
+        for component, expected in zip(c + d, expected_c + expected_d):
+            assert numpy.array_equal(component, expected)
+
+
+@pytest.mark.parametrize('test_params', get_test_params(n_tests=10))
+def test_htfft_radix22(test_params):
+    """
+    The radix-2^2 stages don't match the radix-2 stages bit for bit but give
+    an FFT that is just as precise.
+    """
+    rnd = Random(test_params['seed'])
+    n = test_params['n']
+    spcc = max(4, test_params['spcc'])
+    if helper.logceil(spcc)*2 > helper.logceil(n):
+        n = spcc*spcc
+    input_width = test_params['input_width']
+    stage_widths, output_width, log_gain = helper.get_stage_widths(n, spcc, input_width)
+    values = numpy.array([[helper.random_complex(rnd, input_width) for index in range(n)]
+                          for vector_index in range(test_params['n_vectors'])])
+    expected = numpy.fft.fft(values, axis=1)
+    data = model.complex_to_ints(values, input_width)
+    for gauss in (False, True):
+        received = model.ints_to_complex(
+            model.htfft(data, n, spcc, input_width, gauss=gauss, radix22=True), output_width) * n
+        discrepancy = numpy.sqrt(numpy.mean(numpy.abs(received - expected)**2, axis=1))
+        assert numpy.all(discrepancy < 2 * get_expected_discrepancy(input_width=input_width, n=n))
+
+
+@pytest.mark.parametrize('width', [8, 16, 32])
+def test_combine_radix22(width):
+    """
+    For a size of 4 the twiddles are all trivial so a radix-2^2 stage gives
+    exactly the result of the two radix-2 stages.
+    """
+    rnd = Random(width)
+    values = [helper.random_complex(rnd, width) for index in range(64)]
+    data = model.complex_to_ints(values, width)
+    expected = model.combine(model.combine(data, 2, width), 4, width+2)
+    received = model.combine_radix22(data, 4, width)
+    assert numpy.array_equal(expected[0], received[0])
+    assert numpy.array_equal(expected[1], received[1])
@@ -0,0 +1,29 @@
+import os
+import shutil
+
+from htfft import prebuilt
+
+basedir = os.path.abspath(os.path.dirname(__file__))
+
+
+def test_split_sources(tmp_path):
+    static_names = ['htfft_pkg.vhd', 'butterfly.vhd', 'memory.vhd']
+    filenames = []
+    for name in static_names:
+        filename = str(tmp_path / name)
+        shutil.copy(os.path.join(basedir, name), filename)
+        filenames.append(filename)
+    # A copy of a template is never static.
+    template_filename = str(tmp_path / 'stage.vhd')
+    shutil.copy(os.path.join(basedir, 'stage.vhd'), template_filename)
+    # A file with a static name but different contents isn't static.
+    modified_filename = str(tmp_path / 'shift_register.vhd')
+    with open(modified_filename, 'w') as f:
+        f.write('-- modified')
+    generated_filename = str(tmp_path / 'htfft_0_test.vhd')
+    with open(generated_filename, 'w') as f:
+        f.write('-- generated')
+    others = [template_filename, modified_filename, generated_filename]
+    static, generated = prebuilt.split_sources(filenames + others)
+    assert static == static_names
+    assert generated == others
@@ -5,73 +5,74 @@ import itertools
 from random import Random
 
 import pytest
+import numpy
 import cocotb
 from cocotb import clock, triggers
 
-from htfft import helper, conversions, htfft_gen
+from htfft import helper, conversions, model, htfft_gen
 import stage_gen
 
 basedir = os.path.abspath(os.path.dirname(__file__))
 
 
-async def send_input(rnd, dut, N, size, width, sent_queue):
+def get_input_words(values, size, width):
+    """
+    Packs a block of vectors into the words sent to i_data_a and i_data_b.
+    """
+    n_vectors, N = values.shape
+    L = N//size
+    chunked = values.reshape(n_vectors, 2*L, size//2)
+    a_indices = [index if index < L//2 else index + L//2 for index in range(L)]
+    b_indices = [index + L//2 if index < L//2 else index + L for index in range(L)]
+    words_a = conversions.complex_array_to_slv(chunked[:, a_indices].reshape(-1, size//2), width)
+    words_b = conversions.complex_array_to_slv(chunked[:, b_indices].reshape(-1, size//2), width)
+    return [(words_a[index*L: (index+1)*L], words_b[index*L: (index+1)*L])
+            for index in range(n_vectors)]
+
+
+async def send_input(rnd, dut, N, size, width, sent_queue, block_size=10):
     dut.i_reset = 1
     await triggers.RisingEdge(dut.clk)
-    while True:
-        pause_after = rnd.randint(0, 10)
-        values = [helper.random_complex(rnd, width) for i in range(N)]
-        sent_queue.append(values)
-        chunked_data = [values[index*size//2: (index+1)*size//2]
-                        for index in range(2*N//size)]
-        L = N//size
-        for input_index in range(L):
-            if input_index < L//2:
-                input_data_a = chunked_data[input_index]
-                input_data_b = chunked_data[input_index + L//2]
-            else:
-                input_data_a = chunked_data[input_index + L//2]
-                input_data_b = chunked_data[input_index + L]
-            dut.i_data_a <= conversions.list_of_complex_to_slv(input_data_a, width=width)
-            dut.i_data_b <= conversions.list_of_complex_to_slv(input_data_b, width=width)
-            if (pause_after == 0) and (input_index == L-1):
+    for block in helper.random_complex_blocks(rnd.getrandbits(32), width, N, block_size):
+        for values, (words_a, words_b) in zip(block, get_input_words(block, size, width)):
+            pause_after = rnd.randint(0, 10)
+            sent_queue.append(list(values))
+            L = N//size
+            for input_index in range(L):
+                dut.i_reset <= 0
+                dut.i_data_a <= words_a[input_index]
+                dut.i_data_b <= words_b[input_index]
+                if (pause_after == 0) and (input_index == L-1):
+                    dut.i_reset <= 1
+                await triggers.RisingEdge(dut.clk)
+            if pause_after > 0:
+                for i in range(pause_after-1):
+                    await triggers.RisingEdge(dut.clk)
                 dut.i_reset <= 1
-            await triggers.RisingEdge(dut.clk)
-        if pause_after > 0:
-            for i in range(pause_after-1):
                 await triggers.RisingEdge(dut.clk)
-            dut.i_reset <= 1
-            await triggers.RisingEdge(dut.clk)
 
 
-async def check_output(dut, N, size, width, sent_queue, n_vectors):
-    # Wait for the first o_reset 
+async def check_output(dut, N, size, width, sent_queue, n_vectors, gauss=False):
+    # Wait for the first o_reset
     for index in itertools.count():
         await triggers.RisingEdge(dut.clk)
         await triggers.ReadOnly()
         if str(dut.o_reset.value) == '1':
-            print('got it')
-            break
-        if index > 20:
-            assert 'Never got output reset signal'
-    for vector_index in itertools.count():
-        if vector_index == n_vectors:
             break
+        assert index < 2*N//size + 100, 'Never got the output reset signal.'
+    for vector_index in range(n_vectors):
         assert dut.o_reset.value.integer == 1
-        received_vector = []
+        received_a = []
+        received_b = []
         for output_index in range(N//size):
             await triggers.RisingEdge(dut.clk)
             await triggers.ReadOnly()
-            received_data_a = conversions.list_of_complex_from_slv(
-                int(dut.o_data_a.value), width=width, size=size//2)
-            received_data_a = [2 * x for x in received_data_a]
-            received_data_b = conversions.list_of_complex_from_slv(
-                int(dut.o_data_b.value), width=width, size=size//2)
-            received_data_b = [2 * x for x in received_data_b]
-            received_vector.append((received_data_a, received_data_b))
+            received_a.append(int(dut.o_data_a.value))
+            received_b.append(int(dut.o_data_b.value))
             if output_index != N//size - 1:
                 assert dut.o_reset.value.integer == 0
         input_data = sent_queue.popleft()
-        compare_output(input_data, received_vector, N, size)
+        compare_output(input_data, received_a + received_b, N, size, width, gauss)
         while True:
             if dut.o_reset.value.integer == 1:
                 break
@@ -79,40 +80,15 @@ async def check_output(dut, N, size, width, sent_queue, n_vectors):
             await triggers.ReadOnly()
 
 
-async def compare_output(input_data, received_vector, N, size):
-    expected_data = stage_model(input_data)
-    chunked_data = [expected_data[index*size//2: (index+1)*size//2]
-                    for index in range(2*N//size)]
-    L = N//size
-    assert len(received_vector) == L
-    for output_index, (received_a, received_b) in enumerate(received_vector):
-        expected_a = chunked_data[output_index]
-        expected_b = chunked_data[output_index + L]
-        check_equal(expected_a, received_a)
-        check_equal(expected_b, received_b)
-
-
-def check_equal(complexes_a, complexes_b):
-    for a, b in zip(complexes_a, complexes_b):
-        assert abs(a - b) < 1e-2
-
-
-def stage_model(input_data):
-    output_data = [None] * len(input_data)
-    N = len(input_data)
-    for index in range(N//2):
-        first_index = index
-        second_index = index + N//2
-        a = input_data[first_index]
-        b = input_data[second_index]
-        twiddle = helper.get_twiddle(index, N)
-        bt = b * twiddle
-        c = a + bt
-        d = a - bt
-        output_data[first_index] = c
-        output_data[second_index] = d
-    assert None not in output_data
-    return output_data
+def compare_output(input_data, received_slvs, N, size, width, gauss=False):
+    """
+    The output words of o_data_a hold the first half of the vector and
+    those of o_data_b the second half.  They must match the model exactly.
+    """
+    expected = model.stage(model.complex_to_ints(input_data, width), N, width, gauss)
+    received = model.ints_from_slv(received_slvs, width+2, size//2)
+    for expected_component, received_component in zip(expected, received):
+        assert numpy.array_equal(expected_component, received_component.reshape(N))
 
 
 @cocotb.test()
@@ -120,7 +96,7 @@ async def stage_test(dut):
     test_params = helper.get_test_params()
     seed = test_params['seed']
     rnd = Random(seed)
-    n_vectors = 2
+    n_vectors = test_params['n_vectors']
 
     cocotb.fork(clock.Clock(dut.clk, 2, 'ns').start())
 
@@ -131,7 +107,6 @@ async def stage_test(dut):
     # Number of samples (complex numbers) received every clock cycle.
     size = int(dut.size.value)
 
-    output_width = int(dut.output_width.value)
     sent_queue = collections.deque()
 
     cocotb.fork(send_input(
@@ -142,13 +117,14 @@ async def stage_test(dut):
         width=width,
         sent_queue=sent_queue,
     ))
-    cocotb.fork(check_output(
+    await cocotb.fork(check_output(
         dut=dut,
         N=N,
         size=size,
-        width=output_width,
+        width=width,
         sent_queue=sent_queue,
         n_vectors=n_vectors,
+        gauss=test_params['generation']['gauss'],
     ))
 
 
@@ -169,6 +145,9 @@ def get_test_params(n_tests, base_seed=0):
             'size': spcc,
             'width': width,
             'pipelines': htfft_gen.random_pipeline(rnd, spcc),
+            'gauss': rnd.choice([True, False]),
+            'compress_twiddles': rnd.choice([True, False]),
+            'twiddles_in_file': rnd.choice([True, False]),
             }
         n_vectors = 10
         test_params = {
@@ -0,0 +1,150 @@
+import re
+
+import numpy
+import pytest
+
+from htfft import helper, conversions, twiddles, stage_gen, floats
+
+
+@pytest.mark.parametrize('n', [2, 4, 8, 64, 1024, 4096])
+@pytest.mark.parametrize('width', [4, 8, 18, 32, 50, 62])
+def test_twiddle_tables(n, width):
+    expected_slvs = [conversions.complex_to_slv(helper.get_twiddle(position, n), width)
+                     for position in range(n//2)]
+    assert twiddles.get_twiddle_slvs(n, width).tolist() == expected_slvs
+    expected_strs = [conversions.int_to_str(slv, width) for slv in expected_slvs]
+    assert twiddles.get_twiddle_strs(n, width) == expected_strs
+    # Both the lazy and the cached tables.
+    for max_cached_n in (0, n):
+        assert list(twiddles.iter_twiddle_strs(
+            n, width, chunk_size=100, max_cached_n=max_cached_n)) == expected_strs
+
+
+@pytest.mark.parametrize('n', [2, 4, 64, 1024])
+@pytest.mark.parametrize('width', [4, 8, 32, 54])
+def test_gauss_twiddle_tables(n, width):
+    field_width = width//2+1
+    real, imag = twiddles.get_twiddle_ints(n, width)
+    expected_strs = [''.join(conversions.int_to_str(value % pow(2, field_width), field_width)
+                             for value in (c, s-c, c+s))
+                     for c, s in zip(real.tolist(), imag.tolist())]
+    assert twiddles.get_twiddle_strs(n, width, gauss=True) == expected_strs
+    for max_cached_n in (0, n):
+        assert list(twiddles.iter_twiddle_strs(
+            n, width, chunk_size=100, gauss=True, max_cached_n=max_cached_n)) == expected_strs
+
+
+@pytest.mark.parametrize('n', [2, 4, 8, 64, 1024])
+@pytest.mark.parametrize('width', [8, 32])
+def test_trivial(n, width):
+    real, imag = twiddles.get_twiddle_ints(n, width)
+    one = pow(2, width//2-2)
+    trivial_positions = [position for position, trivial in enumerate(twiddles.is_trivial(range(n//2), n))
+                         if trivial]
+    assert trivial_positions == sorted({0, n//4})
+    for position in trivial_positions:
+        assert (real[position], imag[position]) in ((one, 0), (0, -one))
+
+
+@pytest.mark.parametrize('n', [2, 4, 8, 64, 1024])
+@pytest.mark.parametrize('float_format', ['float16', 'float32'])
+def test_float_trivial(n, float_format):
+    real, imag = twiddles.get_float_twiddle_ints(n, float_format)
+    one = floats.from_floats(1.0, float_format)
+    minus_one = floats.negate(one, float_format)
+    assert (real[0], imag[0]) == (one, 0)
+    if n >= 4:
+        assert (real[n//4], imag[n//4]) == (0, minus_one)
+    if n >= 8:
+        half = floats.from_floats(numpy.sqrt(0.5), float_format)
+        assert (real[n//8], imag[n//8]) == (half, floats.negate(half, float_format))
+        assert real[3*n//8] == floats.negate(half, float_format)
+
+
+@pytest.mark.parametrize('n, size', [(4, 2), (8, 4), (16, 4), (64, 32), (64, 8)])
+def test_trivial_lanes(n, size):
+    expected = [lane for lane in range(size//2)
+                if all(twiddles.is_trivial(range(lane, n//2, size//2), n))]
+    assert twiddles.get_trivial_lanes(n, size) == expected
+
+
+def unfold(stored, width, rotate, gauss):
+    """
+    Does the same as the unfolding of a compressed table in stage.vhd.
+    """
+    if gauss:
+        field_width = width//2+1
+        c, s, s_minus_c, c_plus_s = [stored[index*field_width: (index+1)*field_width]
+                                     for index in range(4)]
+        if not rotate:
+            return c + s_minus_c + c_plus_s
+        minus_c_plus_s = (-int(c_plus_s, 2)) % pow(2, field_width)
+        return s + conversions.int_to_str(minus_c_plus_s, field_width) + s_minus_c
+    if not rotate:
+        return stored
+    c, s = stored[:width//2], stored[width//2:]
+    return s + conversions.int_to_str((-int(c, 2)) % pow(2, width//2), width//2)
+
+
+@pytest.mark.parametrize('n', [4, 8, 64, 1024])
+@pytest.mark.parametrize('width', [4, 8, 18, 32, 54])
+@pytest.mark.parametrize('gauss', [False, True])
+def test_folded_twiddle_tables(n, width, gauss):
+    assert twiddles.folding_is_exact(n, width, chunk_size=100)
+    stored = list(twiddles.iter_folded_twiddle_strs(n, width, chunk_size=100, gauss=gauss, max_cached_n=0))
+    assert stored == list(twiddles.iter_folded_twiddle_strs(n, width, gauss=gauss))
+    assert len(stored) == n//4
+    unfolded = ([unfold(value, width, False, gauss) for value in stored] +
+                [unfold(value, width, True, gauss) for value in stored])
+    assert unfolded == twiddles.get_twiddle_strs(n, width, gauss=gauss)
+
+
+@pytest.mark.parametrize('n, size', [(8, 4), (64, 8)])
+@pytest.mark.parametrize('compress_twiddles', [False, True])
+@pytest.mark.parametrize('gauss', [False, True])
+def test_twiddle_file(tmp_path, monkeypatch, n, size, compress_twiddles, gauss):
+    """
+    The twiddle file holds the same twiddles, in the same order, as the
+    aggregate in the VHDL.
+    """
+    monkeypatch.chdir(tmp_path)
+    inline_filenames = stage_gen.generate_stage(
+        n, size, 16, '_inline', gauss=gauss, compress_twiddles=compress_twiddles)
+    file_filenames = stage_gen.generate_stage(
+        n, size, 16, '_file', gauss=gauss, compress_twiddles=compress_twiddles,
+        twiddles_in_file=True)
+    assert [helper.is_data_file(filename) for filename in file_filenames] == [True, False]
+    with open(inline_filenames[-1], 'r') as f:
+        expected = re.findall(r'=> "([01]+)"', f.read())
+    with open(file_filenames[0], 'r') as f:
+        assert f.read().split() == expected
+    with open(file_filenames[-1], 'r') as f:
+        assert 'TWIDDLE_FILENAME: string := "{}"'.format(file_filenames[0]) in f.read()
+
+
+@pytest.mark.parametrize('n', [4, 16, 256])
+@pytest.mark.parametrize('width', [8, 34])
+@pytest.mark.parametrize('gauss', [False, True])
+def test_radix22_twiddles(n, width, gauss):
+    """
+    Each stored twiddle of stage_r22 holds the twiddles for W^3k, W^k and
+    W^2k, and W^2k is the twiddle of a stage combining FFTs of size n/4.
+    """
+    rotations = twiddles.get_radix22_twiddle_ints(n, width)
+    half_real, half_imag = twiddles.get_twiddle_ints(n//2, width)
+    assert rotations[2][0].tolist() == half_real[:n//4].tolist()
+    assert rotations[2][1].tolist() == half_imag[:n//4].tolist()
+    stored = list(twiddles.iter_radix22_twiddle_strs(n, width, gauss=gauss))
+    assert len(stored) == n//4
+    for position, value in enumerate(stored):
+        for field_index, power in enumerate((3, 1, 2)):
+            field = value[field_index*len(value)//3:(field_index+1)*len(value)//3]
+            if gauss:
+                real, imag = rotations[power][0][position], rotations[power][1][position]
+                mask = pow(2, width//2+1)-1
+                expected = ''.join(conversions.int_to_str(int(part) & mask, width//2+1)
+                                   for part in (real, imag-real, real+imag))
+            else:
+                expected = conversions.int_to_str(conversions.complex_to_slv(
+                    helper.get_twiddle(power*position, n), width), width)
+            assert field == expected
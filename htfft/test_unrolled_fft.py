@@ -4,11 +4,12 @@ from random import Random
 import collections
 
 import pytest
+import numpy
 from numpy import fft
 import cocotb
 from cocotb import clock, triggers
 
-from htfft import helper, conversions
+from htfft import helper, conversions, model
 from htfft import test_butterfly
 from htfft import unrolled_fft_gen, htfft_gen
 from htfft.test_htfft import get_expected_discrepancy
@@ -16,13 +17,13 @@ from htfft.test_htfft import get_expected_discrepancy
 basedir = os.path.abspath(os.path.dirname(__file__))
 
 
-async def send_data(rnd, dut, input_width, size, sent_data):
-    while True:
-        values = [helper.random_complex(rnd, input_width) for i in range(size)]
-        values_as_slv = conversions.list_of_complex_to_slv(values, input_width)
-        dut.i_data <= values_as_slv
-        sent_data.append(values)
-        await triggers.RisingEdge(dut.clk)
+async def send_data(seed, dut, input_width, size, sent_data, block_size):
+    for values in helper.random_complex_blocks(seed, input_width, size, block_size):
+        words = conversions.complex_array_to_slv(values, input_width)
+        for vector, word in zip(values, words):
+            dut.i_data <= word
+            sent_data.append(vector)
+            await triggers.RisingEdge(dut.clk)
 
 
 @cocotb.test()
@@ -30,7 +31,6 @@ async def unrolled_fft_test(dut):
     test_params = helper.get_test_params()
     seed = test_params['seed']
     generation_params = test_params['generation']
-    rnd = Random(seed)
     size = int(dut.size.value)
     input_width = int(dut.input_width.value)
     output_width = int(dut.output_width.value)
@@ -38,24 +38,31 @@ async def unrolled_fft_test(dut):
         generation_params['pipelines']['butterfly']) * helper.logceil(size)
     cocotb.fork(clock.Clock(dut.clk, 2, 'ns').start())
     expected_discrepancy = 2 * get_expected_discrepancy(input_width, size)
+    n_vectors = 10
 
     sent_data = collections.deque()
     await triggers.RisingEdge(dut.clk)
-    cocotb.fork(send_data(rnd, dut, input_width, size, sent_data))
+    cocotb.fork(send_data(seed, dut, input_width, size, sent_data, block_size=n_vectors))
     for i in range(latency):
         await triggers.RisingEdge(dut.clk)
-    for i in range(10):
+    received_slvs = []
+    sent_vectors = []
+    for i in range(n_vectors):
         await triggers.ReadOnly()
-        sent_vector = sent_data.popleft()
-        o_data = int(dut.o_data.value)
-        received = conversions.list_of_complex_from_slv(o_data, output_width, size)
-        scaled = [x * size for x in received]
-        expected = fft.fft(sent_vector)
-        assert len(scaled) == len(expected)
-        discrepancy = pow(sum(pow(abs(a-b), 2)
-                              for a, b in zip(scaled, expected))/size, 0.5)
-        assert discrepancy < 2 * expected_discrepancy
+        sent_vectors.append(sent_data.popleft())
+        received_slvs.append(int(dut.o_data.value))
         await  triggers.RisingEdge(dut.clk)
+    sent_vectors = numpy.array(sent_vectors)
+    # The model should match the hardware exactly.
+    expected_ints = model.unrolled_fft(model.complex_to_ints(sent_vectors, input_width), input_width,
+                                       generation_params['gauss'])
+    received_ints = model.ints_from_slv(received_slvs, output_width, size)
+    for expected_component, received_component in zip(expected_ints, received_ints):
+        assert numpy.array_equal(expected_component, received_component)
+    scaled = model.ints_to_complex(received_ints, output_width) * size
+    expected = fft.fft(sent_vectors, axis=1)
+    discrepancies = numpy.sqrt(numpy.mean(numpy.abs(scaled - expected)**2, axis=1))
+    assert numpy.all(discrepancies < 2 * expected_discrepancy)
 
 
 def get_test_params(n_tests, base_seed=0):
@@ -70,6 +77,8 @@ def get_test_params(n_tests, base_seed=0):
             'n': n,
             'input_width': input_width,
             'pipelines': htfft_gen.random_pipeline(rnd, n),
+            'gauss': rnd.choice([True, False]),
+            'twiddles_in_file': rnd.choice([True, False]),
             }
         test_params = {
             'seed': seed,
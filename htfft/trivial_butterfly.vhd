@@ -0,0 +1,144 @@
+library ieee;
+use ieee.std_logic_1164.all;
+use ieee.numeric_std.all;
+
+use work.htfft_pkg.all;
+
+-- A butterfly for twiddle factors that are always 1 or -j.
+-- It has the same generics, ports and latency as the butterfly entity and
+-- gives the same output for those twiddle factors, but it doesn't use any
+-- multipliers.
+-- The twiddle is -j when the sign bit of its imaginary part (or of c+s
+-- with GAUSS) is set and 1 otherwise.
+entity trivial_butterfly is
+  generic (
+    WIDTH: positive;
+    TWIDDLE_WIDTH: positive;
+    MULT_LATENCY: natural;
+    REG_I_P: boolean;
+    REG_Q_R: boolean;
+    REG_R_S: boolean;
+    REG_S_O: boolean;
+    GAUSS: boolean := false
+    );
+  port (
+    clk: in std_logic;
+    i_a: in std_logic_vector(WIDTH-1 downto 0);
+    i_b: in std_logic_vector(WIDTH-1 downto 0);
+    i_t: in std_logic_vector(twiddle_slv_width(TWIDDLE_WIDTH, GAUSS)-1 downto 0);
+    o_c: out std_logic_vector(WIDTH+2-1 downto 0);
+    o_d: out std_logic_vector(WIDTH+2-1 downto 0)
+  );
+end entity;
+
+architecture arch of trivial_butterfly is
+
+  function bool_to_int(value: boolean) return integer is
+  begin
+    if value then
+      return 1;
+    else
+      return 0;
+    end if;
+  end function;
+
+  function minus_j_bit return natural is
+  begin
+    if GAUSS then
+      -- The sign bit of c+s.
+      return TWIDDLE_WIDTH/2;
+    else
+      return TWIDDLE_WIDTH/2-1;
+    end if;
+  end function;
+
+  constant LATENCY_TO_S: natural := bool_to_int(REG_I_P) + bool_to_int(REG_Q_R) + bool_to_int(REG_R_S) +
+                                    MULT_LATENCY;
+
+  signal i_b_real: signed(WIDTH/2-1 downto 0);
+  signal i_b_imag: signed(WIDTH/2-1 downto 0);
+  signal i_minus_j: std_logic;
+  signal i_bt_real: signed(WIDTH/2-1 downto 0);
+  signal i_bt_imag: signed(WIDTH/2-1 downto 0);
+  signal i_bt: std_logic_vector(WIDTH-1 downto 0);
+
+  signal s_bt: std_logic_vector(WIDTH-1 downto 0);
+  signal s_bt_real: signed(WIDTH/2-1 downto 0);
+  signal s_bt_imag: signed(WIDTH/2-1 downto 0);
+  signal s_a: std_logic_vector(WIDTH-1 downto 0);
+  signal s_a_real: signed(WIDTH/2-1 downto 0);
+  signal s_a_imag: signed(WIDTH/2-1 downto 0);
+  signal s_c_real: signed(WIDTH/2+1-1 downto 0);
+  signal s_c_imag: signed(WIDTH/2+1-1 downto 0);
+  signal s_d_real: signed(WIDTH/2+1-1 downto 0);
+  signal s_d_imag: signed(WIDTH/2+1-1 downto 0);
+  signal s_c: std_logic_vector(WIDTH+2-1 downto 0);
+  signal s_d: std_logic_vector(WIDTH+2-1 downto 0);
+begin
+
+  assert WIDTH mod 2 = 0 severity failure;
+  -- The quantized twiddles are only exactly 1 and -j when the widths match.
+  assert WIDTH = TWIDDLE_WIDTH severity failure;
+
+  i_b_real <= signed(i_b(WIDTH-1 downto WIDTH/2));
+  i_b_imag <= signed(i_b(WIDTH/2-1 downto 0));
+  i_minus_j <= i_t(minus_j_bit);
+
+  -- Multiplying by -j swaps the components and negates the new imaginary
+  -- part.  The negation wraps in the same way as the multiplication in the
+  -- butterfly.
+  i_bt_real <= i_b_imag when i_minus_j = '1' else i_b_real;
+  i_bt_imag <= -i_b_real when i_minus_j = '1' else i_b_imag;
+  i_bt <= std_logic_vector(i_bt_real) & std_logic_vector(i_bt_imag);
+
+  delay_bt: entity work.shift_register
+    generic map (
+      WIDTH => WIDTH,
+      LENGTH => LATENCY_TO_S
+      )
+    port map (
+      clk => clk,
+      i_data => i_bt,
+      o_data => s_bt
+      );
+
+  delay_a: entity work.shift_register
+    generic map (
+      WIDTH => WIDTH,
+      LENGTH => LATENCY_TO_S
+      )
+    port map (
+      clk => clk,
+      i_data => i_a,
+      o_data => s_a
+      );
+
+  s_bt_real <= signed(s_bt(WIDTH-1 downto WIDTH/2));
+  s_bt_imag <= signed(s_bt(WIDTH/2-1 downto 0));
+  s_a_real <= signed(s_a(WIDTH-1 downto WIDTH/2));
+  s_a_imag <= signed(s_a(WIDTH/2-1 downto 0));
+
+  s_c_real <= resize(s_a_real, WIDTH/2+1) + resize(s_bt_real, WIDTH/2+1);
+  s_c_imag <= resize(s_a_imag, WIDTH/2+1) + resize(s_bt_imag, WIDTH/2+1);
+  s_c(WIDTH+2-1 downto WIDTH/2+1) <= std_logic_vector(s_c_real);
+  s_c(WIDTH/2+1-1 downto 0) <= std_logic_vector(s_c_imag);
+  s_d_real <= resize(s_a_real, WIDTH/2+1) - resize(s_bt_real, WIDTH/2+1);
+  s_d_imag <= resize(s_a_imag, WIDTH/2+1) - resize(s_bt_imag, WIDTH/2+1);
+  s_d(WIDTH+2-1 downto WIDTH/2+1) <= std_logic_vector(s_d_real);
+  s_d(WIDTH/2+1-1 downto 0) <= std_logic_vector(s_d_imag);
+
+  yes_reg_s_o: if REG_S_O generate
+    process(clk)
+    begin
+      if rising_edge(clk) then
+        o_c <= s_c;
+        o_d <= s_d;
+      end if;
+    end process;
+  end generate;
+  no_reg_s_o: if not REG_S_O generate
+    o_c <= s_c;
+    o_d <= s_d;
+  end generate;
+
+end architecture;
@@ -0,0 +1,247 @@
+"""
+Quantized twiddle factor tables shared by the generators and the model.
+
+The table for a butterfly combining two FFTs of size `n`/2 holds the
+twiddles for positions 0 to `n`/2-1.  Tables are computed with numpy and
+cached by (n, width) so stages, unrolled FFT levels and configurations
+generated in the same process reuse them.
+
+The values are bit-identical to
+`conversions.complex_to_slv(helper.get_twiddle(position, n), width)`.
+"""
+import functools
+
+import numpy
+
+from htfft import floats
+
+# Tables up to this size are computed whole and cached by (n, width).  The
+# generators compute larger ones lazily so their memory use doesn't grow
+# with n.
+MAX_CACHED_N = pow(2, 16)
+
+
+def quantize(positions, n, width):
+    """
+    Returns the signed (real, imag) components of the quantized twiddles at
+    the given positions.
+    """
+    assert width % 2 == 0
+    assert width < 64
+    # Same order of operations as helper.get_twiddle so the floats match.
+    values = numpy.exp(-2*numpy.pi*(0+1j)*(positions/n))
+    max_mag = pow(2, width//2-2)
+    # numpy.round rounds half to even like python's round.
+    real = numpy.round(values.real * max_mag).astype(numpy.int64)
+    imag = numpy.round(values.imag * max_mag).astype(numpy.int64)
+    return real, imag
+
+
+def quantize_float(positions, n, float_format):
+    """
+    Returns the bits of the (real, imag) components of the twiddles at the
+    given positions quantized to a float format (see floats.py).
+
+    The twiddles at multiples of `n`/8 are exact so that 1 and -j have a
+    zero component and can use the trivial butterfly.
+    """
+    positions = numpy.asarray(positions)
+    values = numpy.exp(-2*numpy.pi*(0+1j)*(positions/n))
+    half = numpy.sqrt(0.5)
+    exact = numpy.array([1, half-1j*half, -1j, -half-1j*half])
+    eighths = (8*positions) % n == 0
+    values = numpy.where(eighths, exact[(8*positions//n) % 4], values)
+    return floats.from_floats(values.real, float_format), floats.from_floats(values.imag, float_format)
+
+
+def to_slvs(real, imag, width):
+    """
+    Packs the components as unsigned integers in the same way as
+    `conversions.complex_to_slv`.
+    """
+    mask = pow(2, width//2)-1
+    return ((real & mask) << (width//2)) | (imag & mask)
+
+
+def to_strs(slvs, width):
+    """
+    Formats packed twiddles as strings of bits, MSB first, for use as
+    std_logic_vector literals in the templates.
+    """
+    shifts = numpy.arange(width-1, -1, -1)
+    chars = ((slvs[:, None] >> shifts) & 1).astype(numpy.uint8) + ord('0')
+    return [row.tobytes().decode() for row in chars]
+
+
+def to_gauss_strs(real, imag, width):
+    """
+    Formats the twiddles for a butterfly with GAUSS as strings of bits
+    holding c, s-c and c+s for a twiddle c+js.  Each has `width`/2+1 bits.
+    """
+    field_width = width//2+1
+    mask = pow(2, field_width)-1
+    fields = [to_strs(values & mask, field_width) for values in (real, imag-real, real+imag)]
+    return [''.join(parts) for parts in zip(*fields)]
+
+
+@functools.lru_cache(maxsize=64)
+def get_twiddle_ints(n, width):
+    """
+    Returns a (real, imag) tuple of int64 arrays with the signed components
+    of the quantized twiddles.  The arrays are read-only since they're shared.
+    """
+    real, imag = quantize(numpy.arange(n//2), n, width)
+    real.flags.writeable = False
+    imag.flags.writeable = False
+    return real, imag
+
+
+@functools.lru_cache(maxsize=64)
+def get_float_twiddle_ints(n, float_format):
+    """
+    Returns a (real, imag) tuple of int64 arrays with the bits of the
+    components of the twiddles quantized to a float format.
+    """
+    real, imag = quantize_float(numpy.arange(n//2), n, float_format)
+    real.flags.writeable = False
+    imag.flags.writeable = False
+    return real, imag
+
+
+@functools.lru_cache(maxsize=64)
+def get_radix22_twiddle_ints(n, width):
+    """
+    Returns the twiddles W^mk for m of 1, 2 and 3 and positions k from 0 to
+    `n`/4-1 that stage_r22 rotates by, as a dict from m to a (real, imag)
+    tuple of int64 arrays.  W^2k is the twiddle of a butterfly combining
+    FFTs of size `n`/4.
+    """
+    rotations = {}
+    for power in (1, 2, 3):
+        real, imag = quantize(power*numpy.arange(n//4), n, width)
+        real.flags.writeable = False
+        imag.flags.writeable = False
+        rotations[power] = real, imag
+    return rotations
+
+
+def iter_radix22_twiddle_strs(n, width, gauss=False):
+    """
+    Yields the twiddles for stage_r22 as strings of bits for positions 0 to
+    `n`/4-1.  Each holds W^3k, W^k and W^2k from the MSB, which are the
+    twiddles for P3, P2 and P1.
+    """
+    rotations = get_radix22_twiddle_ints(n, width)
+    if gauss:
+        fields = [to_gauss_strs(*rotations[power], width) for power in (3, 1, 2)]
+    else:
+        fields = [to_strs(to_slvs(*rotations[power], width), width) for power in (3, 1, 2)]
+    yield from (''.join(parts) for parts in zip(*fields))
+
+
+def get_twiddle_slvs(n, width):
+    return to_slvs(*get_twiddle_ints(n, width), width)
+
+
+def get_twiddle_strs(n, width, gauss=False):
+    if gauss:
+        return to_gauss_strs(*get_twiddle_ints(n, width), width)
+    return to_strs(get_twiddle_slvs(n, width), width)
+
+
+def iter_quantized_chunks(n, n_positions, width, chunk_size, max_cached_n, float_format=None):
+    """
+    Yields the (real, imag) components of the twiddles for positions 0 to
+    `n_positions`-1 in chunks.  Up to `max_cached_n` they are sliced from the
+    cached table, otherwise they're computed a chunk at a time and not cached
+    so memory use doesn't grow with `n`.
+    """
+    if float_format:
+        assert width == 2*floats.get_width(float_format)
+    if n <= max_cached_n:
+        if float_format:
+            real, imag = get_float_twiddle_ints(n, float_format)
+        else:
+            real, imag = get_twiddle_ints(n, width)
+        yield real[:n_positions], imag[:n_positions]
+        return
+    for start in range(0, n_positions, chunk_size):
+        positions = numpy.arange(start, min(start + chunk_size, n_positions))
+        if float_format:
+            yield quantize_float(positions, n, float_format)
+        else:
+            yield quantize(positions, n, width)
+
+
+def iter_twiddle_strs(n, width, chunk_size=4096, gauss=False, float_format=None,
+                      max_cached_n=MAX_CACHED_N):
+    """
+    Lazily yields the twiddles as strings of bits.  Tables with `n` up to
+    `max_cached_n` share the cache with the model and the other generators.
+    With a `float_format` each component is a float of width `width`/2.
+    """
+    assert not (float_format and gauss)
+    for real, imag in iter_quantized_chunks(n, n//2, width, chunk_size, max_cached_n, float_format):
+        if gauss:
+            yield from to_gauss_strs(real, imag, width)
+        else:
+            yield from to_strs(to_slvs(real, imag, width), width)
+
+
+def to_folded_gauss_strs(real, imag, width):
+    """
+    Formats the stored twiddles of a compressed table for a butterfly with
+    GAUSS.  They hold c, s, s-c and c+s so that the stage can select the
+    fields of the twiddle multiplied by -j without any adders.
+    """
+    field_width = width//2+1
+    mask = pow(2, field_width)-1
+    fields = [to_strs(values & mask, field_width)
+              for values in (real, imag, imag-real, real+imag)]
+    return [''.join(parts) for parts in zip(*fields)]
+
+
+def folding_is_exact(n, width, chunk_size=4096):
+    """
+    Whether every quantized twiddle at a position p+`n`/4 is exactly the
+    quantized twiddle at p multiplied by -j, so that a compressed table
+    holding only the positions below `n`/4 is bit-identical to the full one.
+    """
+    for start in range(0, n//4, chunk_size):
+        positions = numpy.arange(start, min(start + chunk_size, n//4))
+        real, imag = quantize(positions, n, width)
+        rotated_real, rotated_imag = quantize(positions + n//4, n, width)
+        if (not numpy.array_equal(rotated_real, imag) or
+                not numpy.array_equal(rotated_imag, -real)):
+            return False
+    return True
+
+
+def iter_folded_twiddle_strs(n, width, chunk_size=4096, gauss=False, max_cached_n=MAX_CACHED_N):
+    """
+    Lazily yields the twiddles for positions below `n`/4 as strings of bits.
+    These are all a compressed table stores.
+    """
+    for real, imag in iter_quantized_chunks(n, n//4, width, chunk_size, max_cached_n):
+        if gauss:
+            yield from to_folded_gauss_strs(real, imag, width)
+        else:
+            yield from to_strs(to_slvs(real, imag, width), width)
+
+
+def is_trivial(positions, n):
+    """
+    Whether the twiddles at the given positions are 1 or -j.  These are
+    exact when quantized so no multiplier is needed.
+    """
+    return (4*numpy.asarray(positions)) % n == 0
+
+
+def get_trivial_lanes(n, size):
+    """
+    The butterfly lanes of a stage combining FFTs of size `n`/2 with `size`
+    samples a clock cycle whose twiddles are all trivial.  Lane `i` uses the
+    twiddles at positions `i`, `i`+`size`/2, `i`+`size`, ...
+    """
+    positions = numpy.arange(n//2).reshape(n//size, size//2)
+    return [int(lane) for lane in numpy.flatnonzero(numpy.all(is_trivial(positions, n), axis=0))]
@@ -3,50 +3,86 @@ import os
 import jinja2
 from fusesoc.capi2.generator import Generator
 
-from htfft import helper, conversions
+from htfft import helper, floats
+from htfft.twiddles import iter_twiddle_strs, is_trivial
 from htfft import htfft_gen
 
 basedir = os.path.abspath(os.path.dirname(__file__))
 
 
-def generate_unrolled_fft_inner(size, input_width, suffix):
+def generate_unrolled_fft_inner(size, input_width, suffix, gauss=False, twiddles_in_file=False,
+                                float_format=None):
+    """
+    With a `float_format` the samples are floats and float_butterfly and
+    float_trivial_butterfly are used so the width doesn't grow.
+    """
     assert size == pow(2, helper.logceil(size))
 
     if size > 2:
-        smaller_filenames = generate_unrolled_fft_inner(size//2, input_width, suffix)
+        smaller_filenames = generate_unrolled_fft_inner(
+            size//2, input_width, suffix, gauss, twiddles_in_file, float_format)
     else:
         smaller_filenames = []
 
-    # Increasing the twiddle width with the other butterfly inputs.
-    # Doesn't seem to help much, but probably worth doing.
-    used_twiddle_width = input_width + 2*(helper.logceil(size)-1)
-
-    twiddles = [conversions.int_to_str(conversions.complex_to_slv(
-        helper.get_twiddle(position, size), used_twiddle_width), used_twiddle_width)
-                for position in range(size//2)]
+    trivial_twiddles = [bool(trivial) for trivial in is_trivial(range(size//2), size)]
+    if float_format:
+        assert not gauss
+        exponent_width, fraction_width = floats.get_format(float_format)
+        assert input_width == 2*floats.get_width(float_format)
+        output_width = input_width
+        intermed_width = input_width
+        used_twiddle_width = input_width
+    else:
+        exponent_width, fraction_width = None, None
+        output_width = input_width + 2*helper.logceil(size)
+        intermed_width = output_width - 2
+        # Increasing the twiddle width with the other butterfly inputs.
+        # Doesn't seem to help much, but probably worth doing.
+        used_twiddle_width = input_width + 2*(helper.logceil(size)-1)
+
+    twiddles = iter_twiddle_strs(size, used_twiddle_width, gauss=gauss, float_format=float_format)
+    twiddle_filename = 'unrolled_fft_inner_{}{}_twiddles.mem'.format(size, suffix)
+    if twiddles_in_file:
+        helper.write_twiddle_file(twiddle_filename, twiddles)
+        twiddle_filenames = [twiddle_filename]
+    else:
+        twiddle_filenames = []
     params = {
         'size': size,
         'input_width': input_width,
+        'output_width': output_width,
+        'intermed_width': intermed_width,
         'twiddle_width': used_twiddle_width,
         'suffix': suffix,
         'logceil_size': helper.logceil(size),
+        'gauss': gauss,
+        'float_format': float_format,
+        'exponent_width': exponent_width,
+        'fraction_width': fraction_width,
+        'twiddles_in_file': twiddles_in_file,
+        'twiddle_filename': twiddle_filename,
         'twiddles': twiddles,
+        'trivial_twiddles': trivial_twiddles,
         }
 
     template_filename = os.path.join(basedir, 'unrolled_fft_inner.vhd')
     with open(template_filename, 'r') as f:
         template_text = f.read()
         template = jinja2.Template(template_text)
-    formatted_text = template.render(**params)
     output_filename = 'unrolled_fft_inner_{}{}.vhd'.format(size, suffix)
-    with open(output_filename, 'w') as g:
-        g.write(formatted_text)
+    template.stream(**params).dump(output_filename)
 
-    return smaller_filenames + [output_filename]
+    return smaller_filenames + twiddle_filenames + [output_filename]
 
 
-def generate_unrolled_fft(size, input_width, suffix, pipelines):
-    filenames = generate_unrolled_fft_inner(size, input_width, suffix)
+def generate_unrolled_fft(size, input_width, suffix, pipelines, gauss=False, twiddles_in_file=False,
+                          float_format=None):
+    filenames = generate_unrolled_fft_inner(
+        size, input_width, suffix, gauss, twiddles_in_file, float_format)
+    if float_format:
+        output_width = input_width
+    else:
+        output_width = input_width + 2*helper.logceil(size)
     with open(os.path.join(basedir, 'unrolled_fft.vhd')) as f:
         template_text = f.read()
         template = jinja2.Template(template_text)
@@ -54,6 +90,7 @@ def generate_unrolled_fft(size, input_width, suffix, pipelines):
         'size': size,
         'logceil_size': helper.logceil(size),
         'input_width': input_width,
+        'output_width': output_width,
         'suffix': suffix,
         'pipelines': pipelines,
         }
@@ -62,7 +99,7 @@ def generate_unrolled_fft(size, input_width, suffix, pipelines):
     with open(output_filename, 'w') as g:
         g.write(formatted_text)
 
-    pipeline_filename = htfft_gen.make_pipeline_pkg(suffix, pipelines)
+    pipeline_filename = htfft_gen.make_pipeline_pkg(suffix, pipelines, float_format)
 
     return [pipeline_filename] + filenames + [output_filename]
 
@@ -75,11 +112,15 @@ class UnrolledFFTGenerator(Generator):
             input_width=self.config['input_width'],
             suffix=self.config['suffix'],
             pipelines=self.config['pipelines'],
+            gauss=self.config.get('gauss', False),
+            twiddles_in_file=self.config.get('twiddles_in_file', False),
+            float_format=self.config.get('float_format', None),
             )
-        self.add_files(output_filenames, file_type='vhdlSource')
+        helper.add_generated_files(self, output_filenames)
 
 
-def make_unrolled_fft_core(directory, suffix, n, input_width, pipelines):
+def make_unrolled_fft_core(directory, suffix, n, input_width, pipelines, gauss=False,
+                           twiddles_in_file=False, float_format=None):
     """
     Utility function for generating a core file from python.
     """
@@ -88,6 +129,9 @@ def make_unrolled_fft_core(directory, suffix, n, input_width, pipelines):
         'n': n,
         'input_width': input_width,
         'pipelines': pipelines,
+        'gauss': gauss,
+        'twiddles_in_file': twiddles_in_file,
+        'float_format': float_format,
         }
     template_filename = os.path.join(basedir, 'unrolled_fft.core.j2')
     with open(template_filename, 'r') as f:
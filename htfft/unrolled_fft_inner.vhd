@@ -1,6 +1,9 @@
 library ieee;
 use ieee.std_logic_1164.all;
 
+use std.textio.all;
+
+use work.htfft_pkg.all;
 use work.htfft{{suffix}}_pipeline.all;
 
 -- Because VHDL recursive instantiation is not well supported by
@@ -12,16 +15,18 @@ entity unrolled_fft_inner_{{size}}{{suffix}} is
     -- we can't rely on tool support for generic packages
     -- so just use std_logic_vector.  
     i_data: in std_logic_vector({{input_width}}*{{size}}-1 downto 0);
-    o_data: out std_logic_vector(({{input_width}}+2*{{logceil_size}})*{{size}}-1 downto 0)
+    o_data: out std_logic_vector({{output_width}}*{{size}}-1 downto 0)
     );
 end entity;
 
 architecture arch of unrolled_fft_inner_{{size}}{{suffix}} is
   constant INPUT_WIDTH: positive := {{input_width}};
-  constant OUTPUT_WIDTH: positive := INPUT_WIDTH + 2*{{logceil_size}};
-  constant INTERMED_WIDTH: positive := OUTPUT_WIDTH - 2;
+  -- Each level adds 2 bits except with floating point samples.
+  constant OUTPUT_WIDTH: positive := {{output_width}};
+  constant INTERMED_WIDTH: positive := {{intermed_width}};
   constant SIZE: positive := {{size}};
   constant TWIDDLE_WIDTH: positive := {{twiddle_width}};
+  constant GAUSS: boolean := {{'true' if gauss else 'false'}};
 
   subtype t_smaller_input is std_logic_vector(INPUT_WIDTH*SIZE/2-1 downto 0);
   type array_of_smaller_input is array(natural range <>) of t_smaller_input;
@@ -37,12 +42,40 @@ architecture arch of unrolled_fft_inner_{{size}}{{suffix}} is
   type array_of_bfoutput is array(natural range <>) of t_bfoutput;
   signal a_dataarray: array_of_bfinput(SIZE-1 downto 0);
   signal o_dataarray: array_of_bfoutput(SIZE-1 downto 0);
-  subtype t_twiddle is std_logic_vector(TWIDDLE_WIDTH-1 downto 0);
+  subtype t_twiddle is std_logic_vector(twiddle_slv_width(TWIDDLE_WIDTH, GAUSS)-1 downto 0);
   type array_of_twiddles is array(natural range <>) of t_twiddle;
 
+  -- Butterflies with a twiddle of 1 or -j don't need multipliers.
+  type array_of_booleans is array(natural range <>) of boolean;
+  constant TRIVIAL_TWIDDLES: array_of_booleans(SIZE/2-1 downto 0) := ({% for trivial in trivial_twiddles %}
+    {{loop.index0}} => {{'true' if trivial else 'false'}}{% if not loop.last %},{% endif %}{% endfor %}
+  );
+
+{% if twiddles_in_file %}
+  -- The twiddles are read from a file with a twiddle on each line, written
+  -- as bits with the MSB first.
+  constant TWIDDLE_FILENAME: string := "{{twiddle_filename}}";
+
+  impure function read_twiddles return array_of_twiddles is
+    file twiddle_file: text open read_mode is TWIDDLE_FILENAME;
+    variable twiddle_line: line;
+    variable twiddle: bit_vector(t_twiddle'range);
+    variable twiddles: array_of_twiddles(SIZE/2-1 downto 0);
+  begin
+    for index in 0 to SIZE/2-1 loop
+      readline(twiddle_file, twiddle_line);
+      read(twiddle_line, twiddle);
+      twiddles(index) := to_stdlogicvector(twiddle);
+    end loop;
+    return twiddles;
+  end function;
+
+  constant LOCAL_TWIDDLES: array_of_twiddles(SIZE/2-1 downto 0) := read_twiddles;
+{% else %}
   constant LOCAL_TWIDDLES: array_of_twiddles(SIZE/2-1 downto 0) := ({% for twiddle in twiddles %}
     {{loop.index0}} => "{{twiddle}}"{% if not loop.last %},{% endif %}{% endfor %}
   );
+{% endif %}
     
 begin
   {% if size > 2 %}
@@ -65,24 +98,97 @@ begin
   loop_butterflys: for bf_index in 0 to SIZE/2-1 generate
     a_dataarray(bf_index) <= a_datachunked(0)((bf_index+1)*INTERMED_WIDTH-1 downto bf_index*INTERMED_WIDTH);
     a_dataarray(bf_index+SIZE/2) <= a_datachunked(1)((bf_index+1)*INTERMED_WIDTH-1 downto bf_index*INTERMED_WIDTH);
-    bf: entity work.butterfly
-      generic map (
-        WIDTH => INTERMED_WIDTH,
-        TWIDDLE_WIDTH => TWIDDLE_WIDTH,
-        MULT_LATENCY => MULT_LATENCY,
-        REG_I_P => BUTTERFLY_I_P,
-        REG_Q_R => BUTTERFLY_Q_R,
-        REG_R_S => BUTTERFLY_R_S,
-        REG_S_O => BUTTERFLY_S_O
-      )
-      port map (
-        clk => clk,
-        i_a => a_dataarray(bf_index),
-        i_b => a_dataarray(bf_index+SIZE/2),
-        i_t => LOCAL_TWIDDLES(bf_index),
-        o_c => o_dataarray(bf_index),
-        o_d => o_dataarray(bf_index+SIZE/2)
-        );
+    {% if float_format %}
+    nontrivial: if not TRIVIAL_TWIDDLES(bf_index) generate
+      bf: entity work.float_butterfly
+        generic map (
+          EXPONENT_WIDTH => {{exponent_width}},
+          FRACTION_WIDTH => {{fraction_width}},
+          MULT_LATENCY => MULT_LATENCY,
+          ADD_LATENCY => ADD_LATENCY,
+          REG_I_P => BUTTERFLY_I_P,
+          REG_Q_R => BUTTERFLY_Q_R,
+          REG_R_S => BUTTERFLY_R_S,
+          REG_S_O => BUTTERFLY_S_O
+        )
+        port map (
+          clk => clk,
+          i_a => a_dataarray(bf_index),
+          i_b => a_dataarray(bf_index+SIZE/2),
+          i_t => LOCAL_TWIDDLES(bf_index),
+          o_c => o_dataarray(bf_index),
+          o_d => o_dataarray(bf_index+SIZE/2)
+          );
+    end generate;
+    -- The twiddle is constant so the selection between 1 and -j in the
+    -- trivial butterfly is optimized away.
+    trivial: if TRIVIAL_TWIDDLES(bf_index) generate
+      bf: entity work.float_trivial_butterfly
+        generic map (
+          EXPONENT_WIDTH => {{exponent_width}},
+          FRACTION_WIDTH => {{fraction_width}},
+          MULT_LATENCY => MULT_LATENCY,
+          ADD_LATENCY => ADD_LATENCY,
+          REG_I_P => BUTTERFLY_I_P,
+          REG_Q_R => BUTTERFLY_Q_R,
+          REG_R_S => BUTTERFLY_R_S,
+          REG_S_O => BUTTERFLY_S_O
+        )
+        port map (
+          clk => clk,
+          i_a => a_dataarray(bf_index),
+          i_b => a_dataarray(bf_index+SIZE/2),
+          i_t => LOCAL_TWIDDLES(bf_index),
+          o_c => o_dataarray(bf_index),
+          o_d => o_dataarray(bf_index+SIZE/2)
+          );
+    end generate;
+    {% else %}
+    nontrivial: if not TRIVIAL_TWIDDLES(bf_index) generate
+      bf: entity work.butterfly
+        generic map (
+          WIDTH => INTERMED_WIDTH,
+          TWIDDLE_WIDTH => TWIDDLE_WIDTH,
+          MULT_LATENCY => MULT_LATENCY,
+          REG_I_P => BUTTERFLY_I_P,
+          REG_Q_R => BUTTERFLY_Q_R,
+          REG_R_S => BUTTERFLY_R_S,
+          REG_S_O => BUTTERFLY_S_O,
+          GAUSS => GAUSS
+        )
+        port map (
+          clk => clk,
+          i_a => a_dataarray(bf_index),
+          i_b => a_dataarray(bf_index+SIZE/2),
+          i_t => LOCAL_TWIDDLES(bf_index),
+          o_c => o_dataarray(bf_index),
+          o_d => o_dataarray(bf_index+SIZE/2)
+          );
+    end generate;
+    -- The twiddle is constant so the selection between 1 and -j in the
+    -- trivial butterfly is optimized away.
+    trivial: if TRIVIAL_TWIDDLES(bf_index) generate
+      bf: entity work.trivial_butterfly
+        generic map (
+          WIDTH => INTERMED_WIDTH,
+          TWIDDLE_WIDTH => TWIDDLE_WIDTH,
+          MULT_LATENCY => MULT_LATENCY,
+          REG_I_P => BUTTERFLY_I_P,
+          REG_Q_R => BUTTERFLY_Q_R,
+          REG_R_S => BUTTERFLY_R_S,
+          REG_S_O => BUTTERFLY_S_O,
+          GAUSS => GAUSS
+        )
+        port map (
+          clk => clk,
+          i_a => a_dataarray(bf_index),
+          i_b => a_dataarray(bf_index+SIZE/2),
+          i_t => LOCAL_TWIDDLES(bf_index),
+          o_c => o_dataarray(bf_index),
+          o_d => o_dataarray(bf_index+SIZE/2)
+          );
+    end generate;
+    {% endif %}
     o_data((bf_index+1)*OUTPUT_WIDTH-1 downto bf_index*OUTPUT_WIDTH) <=
       std_logic_vector(o_dataarray(bf_index));
     o_data((bf_index+SIZE/2+1)*OUTPUT_WIDTH-1 downto (bf_index+SIZE/2)*OUTPUT_WIDTH) <=
@@ -0,0 +1,130 @@
+library ieee;
+use ieee.std_logic_1164.all;
+use ieee.numeric_std.all;
+
+use work.htfft_pkg.all;
+
+-- Buffers words from a valid/ready stream until a whole vector of WORDS
+-- words has arrived, and then passes the vector on without any gaps.
+--
+-- The HTFFT needs the words of a vector on consecutive clock cycles and the
+-- vectors either back to back or separated by at least MIN_GAP clock
+-- cycles.  There is space for two vectors so that one can be received while
+-- the other is being sent.  A vector is only started when i_enable is high.
+--
+-- o_first and o_data follow o_start by two clock cycles.
+entity vector_buffer is
+  generic (
+    WIDTH: positive;
+    -- Must be a power of two.
+    WORDS: positive;
+    MIN_GAP: natural;
+    STYLE: string := "auto"
+    );
+  port (
+    clk: in std_logic;
+    reset: in std_logic;
+    i_valid: in std_logic;
+    i_ready: out std_logic;
+    i_data: in std_logic_vector(WIDTH-1 downto 0);
+    i_enable: in std_logic;
+    o_start: out std_logic;
+    o_first: out std_logic;
+    o_data: out std_logic_vector(WIDTH-1 downto 0)
+    );
+end entity;
+
+architecture arch of vector_buffer is
+
+  constant DEPTH: positive := 2*WORDS;
+  constant ADDRESS_WIDTH: positive := logceil(DEPTH);
+
+  signal write_pointer: unsigned(ADDRESS_WIDTH downto 0) := (others => '0');
+  signal read_pointer: unsigned(ADDRESS_WIDTH downto 0) := (others => '0');
+  signal ready: std_logic;
+  signal write_valid: std_logic;
+  signal write_last: std_logic;
+
+  -- The number of complete vectors that haven't been started.
+  signal n_complete: unsigned(1 downto 0) := (others => '0');
+  signal reading: std_logic := '0';
+  signal read_last: std_logic;
+  signal start: std_logic;
+  signal gap_count: unsigned(logceil(MIN_GAP+1) downto 0) := (others => '0');
+
+begin
+
+  assert DEPTH = 2**ADDRESS_WIDTH severity failure;
+
+  ready <= '0' when write_pointer - read_pointer = DEPTH else '1';
+  write_valid <= i_valid and ready;
+  write_last <= '1' when (write_valid = '1') and
+                (write_pointer(ADDRESS_WIDTH-2 downto 0) = WORDS-1) else
+                '0';
+
+  read_last <= '1' when (reading = '1') and
+               (read_pointer(ADDRESS_WIDTH-2 downto 0) = WORDS-1) else
+               '0';
+  start <= '1' when (n_complete /= 0) and (i_enable = '1') and (gap_count = 0) and
+           ((reading = '0') or (read_last = '1')) else
+           '0';
+
+  mem: entity work.memory
+    generic map (
+      WIDTH => WIDTH,
+      DEPTH => DEPTH,
+      ADDRESS_CLASH => "OLD",
+      STYLE => STYLE
+      )
+    port map (
+      clk => clk,
+      write_valid => write_valid,
+      write_address => write_pointer(ADDRESS_WIDTH-1 downto 0),
+      write_data => i_data,
+      toread_valid => reading,
+      toread_address => read_pointer(ADDRESS_WIDTH-1 downto 0),
+      fromread_data => o_data
+      );
+
+  process(clk)
+  begin
+    if rising_edge(clk) then
+      if write_valid = '1' then
+        write_pointer <= write_pointer + 1;
+      end if;
+      if reading = '1' then
+        read_pointer <= read_pointer + 1;
+      end if;
+      if (write_last = '1') and (start = '0') then
+        n_complete <= n_complete + 1;
+      elsif (write_last = '0') and (start = '1') then
+        n_complete <= n_complete - 1;
+      end if;
+      if start = '1' then
+        reading <= '1';
+      elsif read_last = '1' then
+        reading <= '0';
+        gap_count <= to_unsigned(MIN_GAP, gap_count'length);
+      elsif gap_count /= 0 then
+        gap_count <= gap_count - 1;
+      end if;
+      if (reading = '1') and (read_pointer(ADDRESS_WIDTH-2 downto 0) = 0) then
+        o_first <= '1';
+      else
+        o_first <= '0';
+      end if;
+      if reset = '1' then
+        write_pointer <= (others => '0');
+        read_pointer <= (others => '0');
+        n_complete <= (others => '0');
+        reading <= '0';
+        gap_count <= (others => '0');
+        o_first <= '0';
+      end if;
+    end if;
+  end process;
+
+  i_ready <= ready;
+  o_start <= start;
+
+end architecture;